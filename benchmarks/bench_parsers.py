@@ -0,0 +1,147 @@
+"""
+Офлайн бенчмарк парсерів на збережених відповідях (benchmarks/fixtures).
+
+1. Чисті парсери core.parsing - пропускна здатність і p50/p95 на кожен парсер.
+2. check_all проти локального сервера-замінника (benchmarks/standin.py) на 10/100/1000
+   мангах - час, манг/сек, p50/p95 затримки манги і пік RSS (разом з дочірніми процесами).
+   --page-uses порівнює пул вкладок з різним PAGE_MAX_USES (1 - нова вкладка на кожну мангу).
+
+Запуск:
+  python benchmarks/bench_parsers.py                       # API сайти, без браузера
+  python benchmarks/bench_parsers.py --browser             # + com-x, mangabuff, mangalib (Playwright)
+  python benchmarks/bench_parsers.py --sizes 10,100 --latency 0.05:0.3 --fail 0.05
+  python benchmarks/bench_parsers.py --browser --sizes 100 --page-uses 1,20
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin import StandIn, SITES, API_SITES, FIXTURES_DIR
+from core import parsing
+from core.logger import get_logger
+
+# Парсер: файл з відповіддю
+PURE_PARSERS = [
+    (parsing.comx_chapter, "comx.html"),
+    (parsing.honeymanga_chapter, "honeymanga.json"),
+    (parsing.zenko_chapter, "zenko.json"),
+    (parsing.mangainua_hash, "mangainua_page.html"),
+    (parsing.mangainua_chapter, "mangainua_chapters.html"),
+]
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def bench_pure(repeat: int) -> None:
+    print(f"{'парсер':<22}{'розмір':>10}{'парсів/с':>11}{'MB/с':>9}{'p50':>10}{'p95':>10}")
+    for func, name in PURE_PARSERS:
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            payload = f.read()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(payload)
+            samples.append(time.perf_counter() - start)
+        total = sum(samples)
+        print(
+            f"{func.__name__:<22}{len(payload) / 1024:>8.0f}KB{repeat / total:>11.0f}"
+            f"{len(payload) * repeat / total / 1e6:>9.1f}"
+            f"{_percentile(samples, 0.5) * 1000:>8.2f}ms{_percentile(samples, 0.95) * 1000:>8.2f}ms"
+        )
+
+
+class _RssSampler:
+    """Пік RSS процесу і його дочірніх процесів (браузер) з опитуванням кожні interval сек."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._task: asyncio.Task | None = None
+
+    def _rss(self) -> int:
+        total = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, self._rss())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def bench_check_all(sizes: list[int], sites: list[str], latency: tuple[float, float], failure_rate: float,
+                          page_uses: list[int]) -> None:
+    from core import parser_playwright
+    from core.parser_playwright import check_all
+
+    server = await StandIn(latency=latency, failure_rate=failure_rate).start()
+    server.use_standin()
+    print(f"\nСервер-замінник {server.base_url}, сайти: {', '.join(sites)}")
+    print(f"{'вкладка':>8}{'манг':>6}{'час':>9}{'манг/с':>9}{'p50':>9}{'p95':>9}{'помилок':>9}{'пік RSS':>10}")
+    try:
+        for uses, n in itertools.product(page_uses or [parser_playwright.PAGE_MAX_USES], sizes):
+            parser_playwright.PAGE_MAX_USES = uses
+            site_cycle = itertools.cycle(sites)
+            manga = {f"Манга {i}": server.url(next(site_cycle), i + 1) for i in range(n)}
+            details: dict[str, dict] = {}
+            with _RssSampler() as rss:
+                start = time.perf_counter()
+                results = await check_all(manga, details=details)
+                elapsed = time.perf_counter() - start
+            latencies = [d["latency"] for d in details.values() if d.get("latency") is not None]
+            failed = sum(1 for chapter in results.values() if chapter == "невідомо")
+            print(
+                f"{uses:>8}{n:>6}{elapsed:>8.1f}s{n / elapsed:>9.1f}"
+                f"{_percentile(latencies, 0.5):>8.2f}s{_percentile(latencies, 0.95):>8.2f}s"
+                f"{failed:>9}{rss.peak / 1024 / 1024:>8.0f}MB"
+            )
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000", help="кількість манг для check_all через кому")
+    parser.add_argument("--browser", action="store_true", help="включити браузерні сайти (потрібен Playwright)")
+    parser.add_argument("--latency", default="0.02:0.1", help="затримка сервера мін:макс в секундах")
+    parser.add_argument("--fail", type=float, default=0.0, help="частка відповідей 503")
+    parser.add_argument("--page-uses", default="", help="PAGE_MAX_USES для порівняння через кому, напр. 1,20")
+    parser.add_argument("--repeat", type=int, default=200, help="повторів на чистий парсер")
+    args = parser.parse_args()
+
+    # Лог кожної манги спотворює час і засмічує вивід
+    get_logger().setLevel(logging.WARNING)
+
+    sites = list(SITES) if args.browser else sorted(API_SITES)
+    low, high = (float(x) for x in args.latency.split(":"))
+    bench_pure(args.repeat)
+    page_uses = [int(n) for n in args.page_uses.split(",") if n]
+    asyncio.run(bench_check_all([int(n) for n in args.sizes.split(",")], sites, (low, high), args.fail, page_uses))
+
+
+if __name__ == "__main__":
+    main()
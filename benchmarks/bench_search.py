@@ -0,0 +1,73 @@
+"""
+Мікробенчмарк inline пошуку: лінійний прохід (як було в inline_search) проти SearchIndex.
+
+Запуск:
+  python benchmarks/bench_search.py [кількість_назв]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.search import SearchIndex
+
+_WORDS_UK = ["Ван", "Піс", "Атака", "титанів", "Магічна", "битва", "Клинок", "демонів",
+             "Соло", "левелінг", "Наруто", "Берсерк", "Відьмак", "Повернення", "героя"]
+_WORDS_EN = ["One", "Piece", "Attack", "Titan", "Jujutsu", "Kaisen", "Demon", "Slayer",
+             "Solo", "Leveling", "Naruto", "Berserk", "Return", "Hero", "Tower"]
+
+QUERIES = ["", "н", "на", "нар", "naruto", "ван піс", "atak", "титан", "leveling", "xyzzy"]
+
+
+def _make_titles(n: int) -> list[str]:
+    rnd = random.Random(42)
+    titles = set()
+    while len(titles) < n:
+        words = _WORDS_UK if rnd.random() < 0.5 else _WORDS_EN
+        titles.add(" ".join(rnd.sample(words, rnd.randint(1, 4))) + f" {rnd.randint(1, 99999)}")
+    return sorted(titles)
+
+
+def _linear_scan(titles: list[str], query: str) -> list[str]:
+    query_text = query.strip().lower()
+    matches = [t for t in titles if query_text in t.lower()] if query_text else titles
+    return matches[:50]
+
+
+def _measure(func, repeat: int = 50) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    titles = _make_titles(n)
+
+    start = time.perf_counter()
+    index = SearchIndex(titles)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Назв: {n}, побудова індексу: {build_ms:.1f} ms\n")
+
+    print(f"{'запит':<12}{'scan avg':>10}{'scan p95':>10}{'index avg':>11}{'index p95':>11}{'знайдено':>10}")
+    for q in QUERIES:
+        scan_avg, scan_p95 = _measure(lambda: _linear_scan(titles, q))
+        idx_avg, idx_p95 = _measure(lambda: index.search(q, limit=50))
+        found = len(index.search(q))
+        print(f"{q!r:<12}{scan_avg:>8.2f}ms{scan_p95:>8.2f}ms{idx_avg:>9.2f}ms{idx_p95:>9.2f}ms{found:>10}")
+
+    start = time.perf_counter()
+    index.add("Нова манга 1")
+    index.remove("Нова манга 1")
+    print(f"\nІнкрементальне додавання + видалення: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Бенчмарк холодного старту: час імпорту модулів бота і які важкі пакети вони тягнуть.
+
+Кожен замір - окремий процес Python, як при перезапуску контейнера.
+Для бота показується розклад python -X importtime по пакетах верхнього рівня.
+Playwright і aiohttp не повинні завантажуватись при імпорті бота - тільки
+на першій перевірці (core.checker._local_check_func).
+
+Запуск:
+  python benchmarks/bench_startup.py                # 5 запусків на модуль
+  python benchmarks/bench_startup.py --runs 10 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ["bot", "worker", "core.checker", "core.parser_playwright"]
+HEAVY = ["playwright", "aiohttp", "motor", "pymongo", "telegram", "psutil", "core.parser_playwright"]
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+# Без .env config падає на імпорті - для заміру імпорту підходять будь-які значення
+_ENV = {"TELEGRAM_TOKEN": "0:bench", "TELEGRAM_CHAT_ID": "0", **os.environ}
+
+
+def _probe(module: str) -> dict | None:
+    code = _PROBE.format(root=ROOT, module=module, heavy=HEAVY)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_ENV, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ["?"])[-1]
+        print(f"  {module}: не імпортується - {error}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_imports(runs: int) -> None:
+    print(f"{'модуль':<26}{'мін':>9}{'медіана':>10}  важкі пакети в sys.modules")
+    for module in TARGETS:
+        samples = []
+        for _ in range(runs):
+            sample = _probe(module)
+            if sample is None:
+                break
+            samples.append(sample)
+        if len(samples) < runs:
+            continue
+        seconds = [sample["seconds"] * 1000 for sample in samples]
+        loaded = ", ".join(samples[-1]["loaded"]) or "-"
+        print(f"{module:<26}{min(seconds):>7.0f}ms{statistics.median(seconds):>8.0f}ms  {loaded}")
+
+
+def bench_importtime(module: str, top: int) -> None:
+    """Час прямих імпортів модуля з python -X importtime, згрупований по пакетах."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import {module}"],
+        cwd=ROOT, env=_ENV, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative)))
+    # Відступ показує вкладеність: модуль і його прямі імпорти на один рівень глибше
+    depth = next((indent for indent, name, _ in rows if name == module), None)
+    packages: dict[str, int] = {}
+    for indent, name, micros in rows:
+        if depth is not None and indent == depth + 2:
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + micros
+    print(f"\npython -X importtime: {module}, найдорожчі пакети")
+    for package, micros in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {package:<28}{micros / 1000:>8.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="запусків на модуль")
+    parser.add_argument("--top", type=int, default=10, help="пакетів у розкладі importtime")
+    args = parser.parse_args()
+
+    bench_imports(args.runs)
+    bench_importtime("bot", args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Навантажувальний тест отримання оновлень Telegram: webhook проти long polling.
+
+Для кожного режиму запускає bot.py окремим процесом проти сервера-замінника Bot API
+(benchmarks/fake_telegram.py), з SQLite в тимчасовій папці замість MongoDB, і міряє:
+  - простій: CPU процесу бота і запити до Bot API за --idle секунд без оновлень
+  - навантаження: --updates команд від --concurrency користувачів одночасно,
+    затримка від доставки оновлення до відповіді бота (p50/p95/max) і оновлень/сек
+Команди - невідомі боту (/bench), відповідь на них не звертається до сховища,
+тому вимірюється саме доставка і обробка оновлень.
+У режимі webhook додатково перевіряється, що запит з чужим секретом відхиляється.
+
+Запуск:
+  python benchmarks/bench_updates.py
+  python benchmarks/bench_updates.py --modes webhook --updates 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_telegram import FakeTelegram
+
+BENCH_CHAT_ID = 1
+START_TIMEOUT = 60
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _bot_env(api: FakeTelegram, mode: str, data_dir: str) -> dict:
+    port = _free_port()
+    return {
+        **os.environ,
+        "TELEGRAM_TOKEN": "100000:bench",
+        "TELEGRAM_CHAT_ID": str(BENCH_CHAT_ID),
+        "TELEGRAM_API_URL": api.base_url,
+        "REPOSITORY_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(data_dir, "bench.db"),
+        "CHECK_INTERVAL_MINUTES": "0",
+        "CHECK_WORKERS": "false",
+        "METRICS_PORT": "0",
+        "LOG_LEVEL": "WARNING",
+        "WEBHOOK_URL": f"http://127.0.0.1:{port}" if mode == "webhook" else "",
+        "WEBHOOK_LISTEN": "127.0.0.1",
+        "WEBHOOK_PORT": str(port),
+    }
+
+
+async def _wait_ready(api: FakeTelegram, mode: str, bot: subprocess.Popen) -> None:
+    ready = api.webhook_set if mode == "webhook" else api.polled
+    deadline = time.monotonic() + START_TIMEOUT
+    while not ready.is_set():
+        if bot.poll() is not None:
+            raise RuntimeError(f"bot.py завершився з кодом {bot.returncode}")
+        if time.monotonic() > deadline:
+            raise RuntimeError("bot.py не запустився")
+        await asyncio.sleep(0.1)
+    # Перші оновлення прогрівають обробники
+    for _ in range(3):
+        await api.request(BENCH_CHAT_ID + 1, "/bench")
+
+
+async def _load(api: FakeTelegram, updates: int, concurrency: int) -> tuple[list[float], float]:
+    latencies: list[float] = []
+    per_user = max(1, updates // concurrency)
+
+    async def user(chat_id: int) -> None:
+        for _ in range(per_user):
+            latencies.append(await api.request(chat_id, "/bench"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(1000 + n) for n in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def bench_mode(mode: str, updates: int, concurrency: int, idle: float) -> dict:
+    api = await FakeTelegram().start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        bot = subprocess.Popen([sys.executable, "bot.py"], cwd=ROOT, env=_bot_env(api, mode, data_dir))
+        try:
+            await _wait_ready(api, mode, bot)
+            process = psutil.Process(bot.pid)
+
+            cpu_before, calls_before = sum(process.cpu_times()[:2]), api.api_calls
+            await asyncio.sleep(idle)
+            idle_cpu = sum(process.cpu_times()[:2]) - cpu_before
+            idle_calls = api.api_calls - calls_before
+
+            rejected = None
+            if mode == "webhook":
+                rejected = await api.deliver(api.command(BENCH_CHAT_ID + 1, "/bench"), secret="wrong")
+
+            latencies, elapsed = await _load(api, updates, concurrency)
+            rss = process.memory_info().rss / 1024 / 1024
+        finally:
+            bot.send_signal(signal.SIGTERM)
+            try:
+                # Сервер-замінник має відповідати на запити бота під час зупинки
+                await asyncio.to_thread(bot.wait, 15)
+            except subprocess.TimeoutExpired:
+                bot.kill()
+            await api.stop()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rate": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+        "max": latencies[-1] * 1000,
+        "idle_cpu": idle_cpu,
+        "idle_calls": idle_calls,
+        "rss": rss,
+        "rejected": rejected,
+        "webhook": api.webhook,
+    }
+
+
+def _print(results: list[dict], idle: float) -> None:
+    print(
+        f"\n{'режим':<9}{'онов/с':>9}{'p50':>9}{'p95':>9}{'max':>9}"
+        f"{'CPU простою':>14}{'запитів API':>13}{'RSS':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<9}{r['rate']:>9.0f}{r['p50']:>7.1f}ms{r['p95']:>7.1f}ms{r['max']:>7.1f}ms"
+            f"{r['idle_cpu'] * 1000:>11.0f}ms{r['idle_calls']:>13}{r['rss']:>7.0f}MB"
+        )
+    print(f"(простій - {idle:g} с без оновлень)")
+    for r in results:
+        if r["webhook"]:
+            print(
+                f"webhook: allowed_updates={r['webhook'].get('allowed_updates')}, "
+                f"max_connections={r['webhook'].get('max_connections')}, "
+                f"запит з чужим секретом -> {r['rejected']}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="polling,webhook", help="режими через кому")
+    parser.add_argument("--updates", type=int, default=1000, help="оновлень під навантаженням")
+    parser.add_argument("--concurrency", type=int, default=20, help="користувачів одночасно")
+    parser.add_argument("--idle", type=float, default=15, help="секунд простою для заміру CPU")
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(bench_mode(mode.strip(), args.updates, args.concurrency, args.idle))
+        for mode in args.modes.split(",")
+    ]
+    _print(results, args.idle)
+
+
+if __name__ == "__main__":
+    main()
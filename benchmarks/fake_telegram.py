@@ -0,0 +1,201 @@
+"""
+Локальний aiohttp сервер-замінник Telegram Bot API для навантажувальних тестів бота.
+
+Бот запускається з TELEGRAM_API_URL=http://127.0.0.1:PORT і ходить сюди замість
+api.telegram.org. Сервер відповідає на методи, які бот викликає при старті (getMe,
+setWebhook, deleteWebhook, setMyCommands) і у відповідь користувачу (sendMessage,
+answerCallbackQuery, ...), а оновлення доставляє так само, як Telegram:
+  webhook - POST на адресу з setWebhook із заголовком секрету, не більше
+            max_connections запитів одночасно
+  polling - з черги у відповідь на getUpdates (long polling з timeout)
+request() надсилає повідомлення від користувача і чекає першу відповідь бота в цей чат.
+
+Окремий запуск (для ручної перевірки):
+  python benchmarks/fake_telegram.py [порт]
+"""
+import asyncio
+import itertools
+import json
+import socket
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "Manga", "username": "manga_bench_bot"}
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeTelegram:
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        # Параметри останнього setWebhook: url, secret_token, allowed_updates, max_connections
+        self.webhook: dict | None = None
+        # {метод: кількість викликів}
+        self.calls: dict[str, int] = {}
+        self.webhook_set = asyncio.Event()
+        self.polled = asyncio.Event()
+        self._updates: asyncio.Queue[dict] = asyncio.Queue()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        # {chat_id: future першої відповіді бота}
+        self._waiting: dict[int, asyncio.Future] = {}
+        self._connections: asyncio.Semaphore | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def api_calls(self) -> int:
+        return sum(self.calls.values())
+
+    # Bot API
+
+    async def _params(self, request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        # Бібліотека передає складні значення JSON рядками у формі
+        params = {}
+        for name, value in (await request.post()).items():
+            try:
+                params[name] = json.loads(value)
+            except (TypeError, ValueError):
+                params[name] = value
+        return params
+
+    def _answer(self, chat_id) -> None:
+        future = self._waiting.pop(int(chat_id), None) if chat_id is not None else None
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+    def _message(self, chat_id: int, text: str, sender: dict) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Bench"},
+            "from": sender,
+            "text": text,
+        }
+
+    async def _set_webhook(self, params: dict):
+        self.webhook = params
+        self._connections = asyncio.Semaphore(int(params.get("max_connections", 40)))
+        self.webhook_set.set()
+        return True
+
+    async def _delete_webhook(self, params: dict):
+        self.webhook = None
+        return True
+
+    async def _get_updates(self, params: dict):
+        self.polled.set()
+        limit = int(params.get("limit", 100))
+        try:
+            updates = [await asyncio.wait_for(self._updates.get(), float(params.get("timeout", 0)) or 0.001)]
+        except asyncio.TimeoutError:
+            return []
+        while len(updates) < limit and not self._updates.empty():
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    async def _send_message(self, params: dict):
+        self._answer(params.get("chat_id"))
+        return self._message(int(params["chat_id"]), str(params.get("text", "")), BOT_USER)
+
+    async def _answer_callback_query(self, params: dict):
+        return True
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = await self._params(request)
+        handlers = {
+            "getme": lambda _: BOT_USER,
+            "setwebhook": self._set_webhook,
+            "deletewebhook": self._delete_webhook,
+            "getupdates": self._get_updates,
+            "sendmessage": self._send_message,
+            "editmessagetext": self._send_message,
+            "answercallbackquery": self._answer_callback_query,
+        }
+        handler = handlers.get(method.lower())
+        result = True if handler is None else handler(params)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return web.json_response({"ok": True, "result": result})
+
+    # Оновлення
+
+    def command(self, chat_id: int, text: str) -> dict:
+        """Оновлення з командою від користувача chat_id (він же чат)."""
+        sender = {"id": chat_id, "is_bot": False, "first_name": "Bench"}
+        message = self._message(chat_id, text, sender)
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    async def deliver(self, update: dict, secret: str | None = None) -> int:
+        """Доставляє оновлення боту. Для webhook повертає HTTP статус відповіді бота."""
+        if self.webhook is None:
+            self._updates.put_nowait(update)
+            return 200
+        if secret is None:
+            secret = self.webhook.get("secret_token")
+        headers = {SECRET_HEADER: secret} if secret else {}
+        async with self._connections:
+            async with self._session.post(self.webhook["url"], json=update, headers=headers) as response:
+                return response.status
+
+    async def request(self, chat_id: int, text: str, timeout: float = 30) -> float:
+        """Надсилає команду і чекає першу відповідь бота в цей чат. Повертає секунди."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[chat_id] = future
+        start = time.perf_counter()
+        try:
+            status = await self.deliver(self.command(chat_id, text))
+            if status != 200:
+                raise RuntimeError(f"webhook відповів {status}")
+            return await asyncio.wait_for(future, timeout) - start
+        finally:
+            self._waiting.pop(chat_id, None)
+
+    # Сервер
+
+    async def start(self) -> "FakeTelegram":
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._method)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        # Порт 0 - вільний порт від ОС
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", self.port))
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock).start()
+        self._session = aiohttp.ClientSession()
+        return self
+
+    async def stop(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _main(port: int):
+    server = await FakeTelegram(port=port).start()
+    print(f"Сервер-замінник Bot API: {server.base_url}")
+    print(f"  TELEGRAM_API_URL={server.base_url} python bot.py")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8081))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,79 @@
+"""
+Відтворення записаної перевірки (CHECK_RECORD_DIR) без мережі.
+
+Парсери отримують записані відповіді з оригінальними затримками (поділеними на --speed),
+в кінці результати порівнюються з тими, що були отримані під час запису.
+
+Запуск:
+  python benchmarks/replay.py data/records/check-20260220-100000-1.jsonl.gz
+  python benchmarks/replay.py запис.jsonl.gz --speed 0   # без затримок - чистий час парсингу
+  python benchmarks/replay.py /tmp/standin.jsonl.gz --record 50   # записати 50 манг з сервера-замінника
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import recorder
+from core.logger import get_logger
+from core.parser_playwright import check_all
+
+
+async def _replay(path: str, speed: float) -> int:
+    with recorder.replaying(path, speed) as replayer:
+        manga = replayer.meta.get("manga", {})
+        expected = replayer.meta.get("results", {})
+        print(f"Запис: {path}, манг: {len(manga)}, швидкість: {speed or 'без затримок'}")
+        details: dict[str, dict] = {}
+        start = time.perf_counter()
+        results = await check_all(manga, details=details)
+        elapsed = time.perf_counter() - start
+
+    diff = {t: (expected.get(t), c) for t, c in results.items() if expected.get(t) != c}
+    print(f"Час: {elapsed:.1f}s, відповідей без запису: {replayer.missing}")
+    slowest = sorted(details.items(), key=lambda item: item[1].get("latency") or 0, reverse=True)[:5]
+    for title, detail in slowest:
+        print(f"  {detail.get('latency', 0):>6.2f}s  {detail.get('method')}  {title}")
+    if diff:
+        print(f"\n❌ Результати відрізняються ({len(diff)}):")
+        for title, (was, now) in diff.items():
+            print(f"  {title}: запис {was!r}, відтворення {now!r}")
+        return 1
+    print("✅ Результати збігаються із записом")
+    return 0
+
+
+async def _record_standin(path: str, count: int) -> None:
+    """Запис перевірки проти benchmarks/standin.py - для прикладу і перевірки самого відтворення."""
+    from benchmarks.standin import StandIn, API_SITES
+
+    server = await StandIn(latency=(0.02, 0.2)).start()
+    server.use_standin()
+    sites = sorted(API_SITES)
+    manga = {f"Манга {i}": server.url(sites[i % len(sites)], i + 1) for i in range(count)}
+    try:
+        with recorder.recording(path):
+            await check_all(manga)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="файл запису .jsonl.gz")
+    parser.add_argument("--speed", type=float, default=1.0, help="прискорення затримок (0 - без затримок)")
+    parser.add_argument("--record", type=int, metavar="N", help="спочатку записати N манг з тестового сервера")
+    args = parser.parse_args()
+
+    get_logger().setLevel(logging.WARNING)
+    if args.record:
+        asyncio.run(_record_standin(args.path, args.record))
+    sys.exit(asyncio.run(_replay(args.path, args.speed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Локальний aiohttp сервер-замінник сайтів манги для бенчмарків без мережі.
+
+Віддає збережені відповіді з benchmarks/fixtures з налаштовуваною затримкою
+і часткою помилок (503). Адреси сторінок містять домен сайту в шляху
+(http://127.0.0.1:PORT/com-x.life/...), тому check_all вибирає той самий парсер,
+що і для справжнього посилання. use_standin() підставляє адреси API в парсери
+і реєструє відображення таких адрес в домен для гістограм таймінгів.
+
+Окремий запуск (для ручної перевірки):
+  python benchmarks/standin.py [порт]
+"""
+import asyncio
+import os
+import random
+import socket
+import sys
+import uuid
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Сайт: шаблон посилання на мангу (номер підставляється в {n})
+SITES = {
+    "com-x.life": "/com-x.life/{n}-manga.html",
+    "mangabuff.ru": "/mangabuff.ru/manga/manga-{n}",
+    "mangalib.me": "/mangalib.me/ru/manga/manga-{n}",
+    "honey-manga.com.ua": "/honey-manga.com.ua/book/{uuid}",
+    "zenko.online": "/zenko.online/titles/{n}",
+    "manga.in.ua": "/manga.in.ua/mangas/manga/{n}-manga.html",
+}
+API_SITES = {"honey-manga.com.ua", "zenko.online", "manga.in.ua"}
+
+
+def _fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+class StandIn:
+    """latency - (мін, макс) затримка відповіді в секундах, failure_rate - частка відповідей 503."""
+
+    def __init__(self, latency: tuple[float, float] = (0.0, 0.0), failure_rate: float = 0.0,
+                 port: int = 0, seed: int = 42):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.port = port
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.requests = 0
+        self.failures = 0
+        self._fixtures = {
+            name: _fixture(name) for name in os.listdir(FIXTURES_DIR) if not name.startswith(".")
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def url(self, site: str, n: int) -> str:
+        return self.base_url + SITES[site].format(n=n, uuid=uuid.UUID(int=n))
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        self.requests += 1
+        low, high = self.latency
+        if high > 0:
+            await asyncio.sleep(self._random.uniform(low, high))
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return await handler(request)
+
+    def _serve(self, name: str, content_type: str):
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(body=self._fixtures[name], content_type=content_type, charset="utf-8")
+        return handler
+
+    def _app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        html, json_type = "text/html", "application/json"
+        app.router.add_get("/com-x.life/{tail:.*}", self._serve("comx.html", html))
+        app.router.add_get("/mangabuff.ru/{tail:.*}", self._serve("mangabuff.html", html))
+        app.router.add_get("/mangalib.me/{tail:.*}", self._serve("mangalib.html", html))
+        app.router.add_post("/api/honey/chapter/cursor-list", self._serve("honeymanga.json", json_type))
+        app.router.add_get("/api/zenko/titles/{id}/chapters", self._serve("zenko.json", json_type))
+        app.router.add_get("/manga.in.ua/mangas/{tail:.*}", self._serve("mangainua_page.html", html))
+        app.router.add_post("/api/mangainua/controller.php", self._serve("mangainua_chapters.html", html))
+        return app
+
+    async def start(self) -> "StandIn":
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        # Порт 0 - вільний порт від ОС
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", self.port))
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock).start()
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        from core import timing
+        timing.set_domain_resolver(None)
+
+    def domain_of(self, url: str) -> str | None:
+        """http://127.0.0.1:PORT/com-x.life/123-manga.html -> com-x.life, чужа адреса -> None."""
+        if not url.startswith(self.base_url + "/"):
+            return None
+        return url[len(self.base_url) + 1:].split("/", 1)[0] or None
+
+    def use_standin(self) -> None:
+        """Перенаправляє API парсерів на цей сервер, домени гістограм беруться зі шляху."""
+        from core import parser_playwright, timing
+        timing.set_domain_resolver(self.domain_of)
+        parser_playwright.HONEYMANGA_API_URL = f"{self.base_url}/api/honey/chapter/cursor-list"
+        parser_playwright.ZENKO_API_URL = f"{self.base_url}/api/zenko"
+        parser_playwright.MANGAINUA_AJAX_URL = f"{self.base_url}/api/mangainua/controller.php"
+
+
+async def _main(port: int):
+    server = await StandIn(port=port).start()
+    print(f"Сервер-замінник: {server.base_url}")
+    for site in SITES:
+        print(f"  {site:<20} {server.url(site, 1)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
+    except KeyboardInterrupt:
+        pass
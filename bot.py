@@ -14,14 +14,15 @@ import functools
 import asyncio
 import time
 import datetime
+import hashlib
 
-import psutil
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import telegram
 from telegram import Update, Message, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
 from telegram.ext import (
+    SimpleUpdateProcessor,
     ApplicationBuilder, CommandHandler, MessageHandler,
     CallbackQueryHandler, ConversationHandler, ContextTypes, filters, InlineQueryHandler
 )
@@ -29,69 +30,173 @@ from telegram.warnings import PTBUserWarning
 
 warnings.filterwarnings("ignore", message=".*CallbackQueryHandler.*", category=PTBUserWarning)
 
-from config.config import TOKEN, CHAT_ID
-from core.repository import get_repository, AbstractRepository
-from core.checker import run_check
+from config.config import (
+    TOKEN, CHAT_ID, ALLOWED_USERS, CHECK_INTERVAL_MINUTES, CHECK_DUE_ONLY, CHECK_LOCK_TTL, LEADER_TTL,
+    CHECK_RESUME_MAX_AGE_HOURS, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS, TELEGRAM_API_URL,
+)
+from core.repository import get_repository, close_shared, AbstractRepository, Lease, LeaderElector
+from core.checker import run_check, run_check_many, INTERRUPTED_REPORT, LEASE_LOST_REPORT
+from core import leakwatch, metrics
+from core.cadence import estimate_interval
+from core.governor import MEMORY_LIMIT_MB, MEMORY_SOFT_PERCENT
+from core.loopwatch import LoopWatch, LOOP_WATCH
+from core.profiler import Profiler, PROFILE_MAX_SECONDS
+from core.sampler import Sampler, process, total_ram_mb, HOUR, DAY
+from core.timing import RunTimings, PHASE_LABELS
 from core.logger import get_logger
-from core.parser_playwright import _shutdown_event
+from core.shutdown import shutdown_event
+from core.search import SearchIndex
+from core.jobs import CHECK_WORKERS, get_job_queue, remote_check_all
+from core.parsing import close_parse_pool
 
 log = get_logger("bot").info
 
 _BOT_START_TIME = time.time()
-_process = psutil.Process()
-_process.cpu_percent()
-_RAM_PEAK_MB: float = 0.0
+# Історія RAM, CPU, з'єднань і лагу циклу подій для /stats і метрик
+_sampler = Sampler()
+# Блокування циклу подій зі стеками і час обробників Telegram
+_loopwatch = LoopWatch()
+
+
+def _ram_peak_mb() -> float:
+    summary = _sampler.summary("total_mb", DAY)
+    return summary["peak"] if summary else 0.0
+
+
+def _collect_ram_metrics() -> None:
+    # Останній замір семплера - scrape не обходить дерево процесів вдруге
+    total = _sampler.latest("total_mb")
+    rss = _sampler.latest("rss_mb")
+    if total is None:
+        rss, total = process().memory_info().rss / 1024 / 1024, total_ram_mb()
+    metrics.RAM_BYTES.set(rss * 1024 * 1024, scope="process")
+    metrics.RAM_BYTES.set(total * 1024 * 1024, scope="total")
 
-def _get_total_ram_mb() -> float:
-    """RAM Python процесу + всі дочірні процеси (Chromium тощо)."""
-    try:
-        total = _process.memory_info().rss
-        for child in _process.children(recursive=True):
-            try:
-                total += child.memory_info().rss
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        return total / 1024 / 1024
-    except Exception:
-        return _process.memory_info().rss / 1024 / 1024
 
+metrics.register_collector(_collect_ram_metrics)
 
-async def _memory_monitor():
-    """Фонова задача - кожні 5 секунд оновлює пікове значення RAM."""
-    global _RAM_PEAK_MB
-    while True:
+
+def _update_type(update: object) -> str:
+    if not isinstance(update, Update):
+        return "other"
+    for name in ("callback_query", "inline_query", "message", "edited_message", "chosen_inline_result"):
+        if getattr(update, name) is not None:
+            return name
+    return "other"
+
+
+class _TimedUpdateProcessor(SimpleUpdateProcessor):
+    """Обробка кожного оновлення вимірюється в metrics.HANDLER_LATENCY за типом оновлення."""
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        start = time.perf_counter()
         try:
-            ram_mb = await asyncio.to_thread(_get_total_ram_mb)
-            if ram_mb > _RAM_PEAK_MB:
-                _RAM_PEAK_MB = ram_mb
-        except Exception as e:
-            log(f"⚠️ Моніторинг RAM: помилка вимірювання: {e}")
-        await asyncio.sleep(5)
+            await coroutine
+        finally:
+            metrics.HANDLER_LATENCY.observe(time.perf_counter() - start, update_type=_update_type(update))
 
 
 UNKNOWN_MSG = "Вибач але не можу зрозуміти твого запиту, виклич команду /start для початку роботи."
 
+
+async def _get_repo(context: ContextTypes.DEFAULT_TYPE, user_id: str) -> AbstractRepository:
+    """Повертає репозиторій користувача, створює його при першому зверненні.
+    Репозиторії - легкі види над спільним клієнтом БД, тому створюються на вимогу.
+    Замість context можна передати Application - потрібен тільки bot_data."""
+    repos = context.bot_data["repos"]
+    setups = context.bot_data["repo_setups"]
+    if user_id not in repos:
+        repo = get_repository(user_id=user_id)
+        repos[user_id] = repo
+        setups[user_id] = asyncio.ensure_future(repo.setup())
+    try:
+        await setups[user_id]
+    except Exception:
+        # Наступне звернення спробує ще раз
+        repos.pop(user_id, None)
+        setups.pop(user_id, None)
+        raise
+    return repos[user_id]
+
 # TTL кеш для inline пошуку - щоб не бити MongoDB на кожен символ
-# Структура: {user_id: {"data": {...}, "updated_at": float}}
+# Разом з даними зберігається пошуковий індекс назв, який оновлюється
+# інкрементально при додаванні/видаленні манги
+# Структура: {user_id: {"data": {...}, "index": SearchIndex, "updated_at": float}}
 _MANGA_CACHE: dict[str, dict] = {}
 _CACHE_TTL = 60  # секунд
 
+# Версія даних користувача - збільшується при кожній зміні списку або глав.
+# Входить в next_offset inline відповідей і визначає cache_time
+# Структура: {user_id: {"version": int, "changed_at": float}}
+_DATA_VERSIONS: dict[str, dict] = {}
+
+# Готові InlineQueryResultArticle - перевикористовуються поки не змінилась глава
+# Структура: {user_id: {(title, chapter): InlineQueryResultArticle}}
+_INLINE_RESULTS: dict[str, dict[tuple[str, str], InlineQueryResultArticle]] = {}
+_INLINE_PAGE_SIZE = 50  # максимум Telegram на одну відповідь
+_INLINE_CACHE_TIME = 30  # секунд, для даних що давно не змінювались
+
 
-async def _get_cached_manga(context: ContextTypes.DEFAULT_TYPE, user_id: str) -> dict:
-    """Повертає список манг з кешу для user_id, або завантажує з MongoDB якщо кеш застарів."""
+async def _get_cached_entry(context: ContextTypes.DEFAULT_TYPE, user_id: str) -> dict:
+    """Повертає запис кешу для user_id, або завантажує з MongoDB і будує індекс якщо кеш застарів."""
     now = time.time()
     entry = _MANGA_CACHE.get(user_id)
-    if not entry or now - entry["updated_at"] > _CACHE_TTL:
-        repo: AbstractRepository = context.bot_data["repos"][user_id]
+    fresh = entry is not None and now - entry["updated_at"] <= _CACHE_TTL
+    metrics.CACHE_REQUESTS.inc(cache="manga", result="hit" if fresh else "miss")
+    if not fresh:
+        repo: AbstractRepository = await _get_repo(context, user_id)
         data = await repo.load()
-        _MANGA_CACHE[user_id] = {"data": data.get("manga", {}), "updated_at": now}
-    return _MANGA_CACHE[user_id]["data"]
+        manga = data.get("manga", {})
+        if entry:
+            # Індекс не перебудовується з нуля - індексується тільки різниця назв
+            entry["index"].sync(manga)
+            entry.update(data=manga, updated_at=now)
+            _prune_inline_results(user_id, manga)
+        else:
+            _MANGA_CACHE[user_id] = {"data": manga, "index": SearchIndex(manga), "updated_at": now}
+    return _MANGA_CACHE[user_id]
 
 
 def _invalidate_manga_cache(user_id: str):
-    """Примусово скидає кеш для user_id - викликати після додавання або видалення манги."""
+    """Примусово скидає кеш для user_id - викликати коли змінились глави (після перевірки)."""
     if user_id in _MANGA_CACHE:
         _MANGA_CACHE[user_id]["updated_at"] = 0.0
+    _bump_data_version(user_id)
+
+
+def _get_data_version(user_id: str) -> dict:
+    return _DATA_VERSIONS.setdefault(user_id, {"version": 1, "changed_at": _BOT_START_TIME})
+
+
+def _bump_data_version(user_id: str):
+    entry = _get_data_version(user_id)
+    entry["version"] += 1
+    entry["changed_at"] = time.time()
+
+
+def _cache_add_manga(user_id: str, title: str, url: str):
+    """Додає мангу в кеш та індекс без повного перезавантаження з БД."""
+    entry = _MANGA_CACHE.get(user_id)
+    if entry:
+        old = entry["data"].get(title)
+        if old:
+            # Повторне додавання - готовий результат зі старою главою більше не актуальний
+            _INLINE_RESULTS.get(user_id, {}).pop((title, old.get("last_chapter", "невідомо")), None)
+        entry["data"][title] = {"url": url, "last_chapter": "невідомо"}
+        entry["index"].add(title)
+    _bump_data_version(user_id)
+
+
+def _cache_remove_manga(user_id: str, title: str):
+    """Видаляє мангу з кешу та індексу без повного перезавантаження з БД."""
+    entry = _MANGA_CACHE.get(user_id)
+    if entry:
+        info = entry["data"].pop(title, None)
+        entry["index"].remove(title)
+        if info:
+            _INLINE_RESULTS.get(user_id, {}).pop((title, info.get("last_chapter", "невідомо")), None)
+    _bump_data_version(user_id)
 
 
 # Стани діалогів
@@ -108,7 +213,7 @@ def _make_owner_guard(conv: bool):
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            if str(update.effective_user.id) != str(CHAT_ID):
+            if str(update.effective_user.id) not in ALLOWED_USERS:
                 if update.callback_query:
                     await update.callback_query.answer("⛔ Немає доступу.", show_alert=True)
                 else:
@@ -152,6 +257,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             InlineKeyboardButton("➕ Додати", callback_data="start_add"),
             InlineKeyboardButton("🗑 Видалити", callback_data="start_remove"),
         ],
+        [InlineKeyboardButton("📈 Історія", callback_data="start_history")],
     ])
     await update.effective_message.reply_text(
         "Привіт! Я слідкую за новими главами манги.",
@@ -201,7 +307,7 @@ def _build_status_page(manga: dict, last_check: str, page: int) -> tuple[str, In
 
 
 async def _show_status(message: Message, context: ContextTypes.DEFAULT_TYPE):
-    repo: AbstractRepository = context.bot_data["repos"][str(message.chat_id)]
+    repo: AbstractRepository = await _get_repo(context, str(message.chat_id))
     data = await repo.load()
     manga = data.get("manga", {})
     if not manga:
@@ -222,7 +328,7 @@ async def cb_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     last_check = context.user_data.get("status_last_check", "ніколи")
     if not manga:
         # Кеш відсутній (наприклад після перезапуску бота) - завантажуємо з БД
-        repo: AbstractRepository = context.bot_data["repos"][str(update.effective_user.id)]
+        repo: AbstractRepository = await _get_repo(context, str(update.effective_user.id))
         data = await repo.load()
         manga = data.get("manga", {})
         last_check = data.get("last_check_date", "ніколи")
@@ -241,31 +347,141 @@ async def cb_start_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # Перевірка
 
+@_loopwatch.timed
 async def _run_check_command(message: Message, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(message.chat_id)
-    if context.user_data.get("check_running"):
-        await message.reply_text("⏳ Перевірка вже виконується, зачекай...")
+    repo: AbstractRepository = await _get_repo(context, user_id)
+    # Блокування в БД, а не в пам'яті - діє для всіх реплік і переживає перезапуск
+    lease = Lease(repo, f"check:{user_id}", ttl=CHECK_LOCK_TTL)
+    if not await lease.acquire():
+        if lease.error is not None:
+            await message.reply_text("⚠️ Сховище зараз недоступне - перевірку не запущено, спробуй пізніше.")
+        else:
+            await message.reply_text("⏳ Перевірка вже виконується, зачекай...")
         return
     context.user_data["check_running"] = True
     try:
-        repo: AbstractRepository = context.bot_data["repos"][user_id]
         # Завантажуємо дані один раз - передаємо в run_check щоб уникнути подвійного запиту
         data = await repo.load()
         manga = data.get("manga", {})
         if not manga:
             await message.reply_text("Список манг порожній.")
             return
-        ram_before = _get_total_ram_mb()
+        ram_before = await asyncio.to_thread(total_ram_mb)
         log(f"📊 RAM до перевірки: {ram_before:.1f} MB")
         await message.reply_text(f"🔍 Перевіряю {len(manga)} манг, зачекай...")
-        report_text = await run_check(repo=repo, preloaded_data=data)
-        ram_after = _get_total_ram_mb()
-        log(f"📊 RAM після перевірки: {ram_after:.1f} MB | пік сесії: {_RAM_PEAK_MB:.1f} MB")
+        report_text = await run_check(
+            repo=repo, preloaded_data=data, check_func=context.bot_data.get("check_func"), lease=lease
+        )
+        ram_after = await asyncio.to_thread(total_ram_mb)
+        log(f"📊 RAM після перевірки: {ram_after:.1f} MB | пік за добу: {_ram_peak_mb():.1f} MB")
         _invalidate_manga_cache(user_id)
         context.user_data.pop("status_manga", None)
         await message.reply_text(report_text, disable_web_page_preview=True)
     finally:
         context.user_data.pop("check_running", None)
+        await lease.release()
+
+
+async def _run_scheduled_check(app):
+    """Один цикл автоматичної перевірки всіх користувачів з дедуплікацією посилань."""
+    owner_repo = await _get_repo(app, str(CHAT_ID))
+    user_ids = [uid for uid in await owner_repo.list_user_ids() if uid in ALLOWED_USERS]
+
+    repos: dict[str, AbstractRepository] = {}
+    leases: dict[str, Lease] = {}
+    try:
+        for uid in user_ids:
+            repo = await _get_repo(app, uid)
+            lease = Lease(repo, f"check:{uid}", ttl=CHECK_LOCK_TTL)
+            # Зайнято - користувач вже перевіряє вручну (на будь-якій репліці)
+            if not await lease.acquire():
+                continue
+            repos[uid], leases[uid] = repo, lease
+            app.user_data[int(uid)]["check_running"] = True
+        if not repos:
+            return
+        reports = await run_check_many(
+            repos, check_func=app.bot_data.get("check_func"), leases=leases, due_only=CHECK_DUE_ONLY
+        )
+    finally:
+        for uid, lease in leases.items():
+            app.user_data[int(uid)].pop("check_running", None)
+            await lease.release()
+
+    for uid, (report_text, new_count) in reports.items():
+        _invalidate_manga_cache(uid)
+        app.user_data[int(uid)].pop("status_manga", None)
+        if not new_count:
+            continue
+        try:
+            await app.bot.send_message(chat_id=int(uid), text=report_text, disable_web_page_preview=True)
+        except Exception as e:
+            log(f"⚠️ Не вдалось надіслати звіт {uid}: {e}")
+
+
+async def _resume_interrupted_checks(app):
+    """Фонова задача при старті - продовжує перевірки, перервані перезапуском бота.
+    Вже збережені результати повторно не перевіряються."""
+    owner_repo = await _get_repo(app, str(CHAT_ID))
+    max_age = datetime.timedelta(hours=CHECK_RESUME_MAX_AGE_HOURS)
+    for uid in await owner_repo.list_user_ids():
+        if uid not in ALLOWED_USERS:
+            continue
+        try:
+            repo = await _get_repo(app, uid)
+            run = await repo.get_unfinished_check_run()
+            if run is None:
+                continue
+            age = datetime.datetime.now(datetime.timezone.utc) - run["started_at"]
+            if age > max_age:
+                log(f"ℹ️ Перервана перевірка {uid} застаріла ({age}) - не продовжуємо")
+                continue
+            lease = Lease(repo, f"check:{uid}", ttl=CHECK_LOCK_TTL)
+            # Зайнято - перевірку вже продовжує інша репліка
+            if not await lease.acquire():
+                continue
+            app.user_data[int(uid)]["check_running"] = True
+            try:
+                report_text = await run_check(
+                    repo=repo, check_func=app.bot_data.get("check_func"), lease=lease, resume=run
+                )
+            finally:
+                app.user_data[int(uid)].pop("check_running", None)
+                await lease.release()
+            if report_text == INTERRUPTED_REPORT:
+                return
+            if report_text == LEASE_LOST_REPORT:
+                # Перевірку продовжила інша репліка - звіт надішле вона
+                continue
+            _invalidate_manga_cache(uid)
+            app.user_data[int(uid)].pop("status_manga", None)
+            await app.bot.send_message(
+                chat_id=int(uid),
+                text=f"🔄 Перевірку, перервану перезапуском, завершено\n\n{report_text}",
+                disable_web_page_preview=True,
+            )
+        except Exception as e:
+            log(f"❌ Не вдалось продовжити перевірку {uid}: {e}")
+
+
+async def _check_scheduler(app):
+    """Фонова задача - автоматична перевірка кожні CHECK_INTERVAL_MINUTES хвилин.
+    Звіт надсилається тільки користувачам в яких є нові глави.
+    Працює тільки на репліці-лідері - інші репліки чекають поки лідер зникне."""
+    elector = LeaderElector(await _get_repo(app, str(CHAT_ID)), ttl=LEADER_TTL)
+    try:
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL_MINUTES * 60)
+            try:
+                if not await elector.is_leader():
+                    log("⏰ Автоматична перевірка: лідер - інша репліка, пропускаємо")
+                    continue
+                await _run_scheduled_check(app)
+            except Exception as e:
+                log(f"❌ Автоматична перевірка: помилка: {e}")
+    finally:
+        await elector.resign()
 
 
 @owner_only
@@ -275,6 +491,92 @@ async def cb_start_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await _run_check_command(update.effective_message, context)
 
 
+# Історія глав
+
+# Скільки подій показувати - запити до історії завжди обмеженого розміру
+HISTORY_LIMIT = 10
+
+
+def _format_event(event: dict) -> str:
+    when = datetime.datetime.fromtimestamp(event["detected_at"]).strftime("%d.%m.%Y %H:%M")
+    parts = [when]
+    if event.get("method"):
+        parts.append(event["method"])
+    if event.get("latency") is not None:
+        parts.append(f"{event['latency']:.1f}с")
+    return " · ".join(parts)
+
+
+def _build_history_feed(events: list[dict]) -> tuple[str, InlineKeyboardMarkup, list[str]]:
+    lines = ["📈 Останні нові глави\n"]
+    titles: list[str] = []
+    for event in events:
+        lines.append(f"• {event['title']} - глава {event['chapter']}")
+        lines.append(f"  {_format_event(event)}\n")
+        if event["title"] not in titles:
+            titles.append(event["title"])
+    # Індекс замість назви - callback_data обмежена 64 байтами
+    rows = [[InlineKeyboardButton(f"📖 {title[:40]}", callback_data=f"history:{i}")] for i, title in enumerate(titles)]
+    return "\n".join(lines), InlineKeyboardMarkup(rows), titles
+
+
+def _build_title_history(title: str, events: list[dict]) -> tuple[str, InlineKeyboardMarkup]:
+    lines = [f"📖 {title}\n"]
+    interval = estimate_interval([e["detected_at"] for e in events])
+    if interval is not None:
+        lines.append(f"Глави виходять приблизно раз на {interval / 86400:.1f} дн.\n")
+    for event in events:
+        lines.append(f"• Глава {event['chapter']} - {_format_event(event)}")
+    if not events:
+        lines.append("Нових глав ще не знайдено.")
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("◀️ Назад", callback_data="history:feed")]])
+    return "\n".join(lines), keyboard
+
+
+async def _history_feed_page(context: ContextTypes.DEFAULT_TYPE, user_id: str) -> tuple[str, InlineKeyboardMarkup] | None:
+    repo: AbstractRepository = await _get_repo(context, user_id)
+    events = await repo.get_history_feed(HISTORY_LIMIT)
+    if not events:
+        return None
+    text, keyboard, titles = _build_history_feed(events)
+    context.user_data["history_titles"] = titles
+    return text, keyboard
+
+
+@owner_only
+async def cb_start_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    page = await _history_feed_page(context, str(update.effective_user.id))
+    if page is None:
+        await update.effective_message.reply_text("Історія порожня - нові глави ще не знаходились.")
+        return
+    text, keyboard = page
+    await update.effective_message.reply_text(text, reply_markup=keyboard)
+
+
+@owner_only
+async def cb_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    user_id = str(update.effective_user.id)
+    arg = query.data.split(":", 1)[1]
+    titles = context.user_data.get("history_titles", [])
+
+    if arg == "feed" or not arg.isdigit() or int(arg) >= len(titles):
+        # Список назв втрачено (перезапуск бота) - показуємо стрічку заново
+        page = await _history_feed_page(context, user_id)
+        if page is None:
+            await query.edit_message_text("Історія порожня - нові глави ще не знаходились.")
+            return
+        text, keyboard = page
+    else:
+        title = titles[int(arg)]
+        repo: AbstractRepository = await _get_repo(context, user_id)
+        text, keyboard = _build_title_history(title, await repo.get_title_history(title, HISTORY_LIMIT))
+    await query.edit_message_text(text, reply_markup=keyboard)
+
+
 # Діалог: Додати мангу
 
 @owner_only_conv
@@ -288,7 +590,7 @@ async def cb_start_add(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def add_title(update: Update, context: ContextTypes.DEFAULT_TYPE):
     title = update.effective_message.text.strip()
     user_id = str(update.effective_user.id)
-    repo: AbstractRepository = context.bot_data["repos"][user_id]
+    repo: AbstractRepository = await _get_repo(context, user_id)
     data = await repo.load()
     if title in data["manga"]:
         await update.effective_message.reply_text(f"⚠️ «{title}» вже є в списку.")
@@ -314,9 +616,9 @@ async def add_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not title:
         return ConversationHandler.END
     user_id = str(update.effective_user.id)
-    repo: AbstractRepository = context.bot_data["repos"][user_id]
+    repo: AbstractRepository = await _get_repo(context, user_id)
     await repo.add_manga(title, url)
-    _invalidate_manga_cache(user_id)
+    _cache_add_manga(user_id, title, url)
     context.user_data.pop("status_manga", None)
     await update.effective_message.reply_text(f"✅ «{title}» додано!")
     return ConversationHandler.END
@@ -328,7 +630,7 @@ async def add_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cb_start_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    repo: AbstractRepository = context.bot_data["repos"][str(update.effective_user.id)]
+    repo: AbstractRepository = await _get_repo(context, str(update.effective_user.id))
     data = await repo.load()
     if not data["manga"]:
         await update.effective_message.reply_text("Список манг порожній.")
@@ -341,7 +643,7 @@ async def cb_start_remove(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def remove_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query_text = update.effective_message.text.strip().lower()
-    repo: AbstractRepository = context.bot_data["repos"][str(update.effective_user.id)]
+    repo: AbstractRepository = await _get_repo(context, str(update.effective_user.id))
     data = await repo.load()
     matches = [t for t in data["manga"] if query_text in t.lower()]
 
@@ -408,7 +710,7 @@ async def remove_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cb_remove_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
-    if str(query.from_user.id) != str(CHAT_ID):
+    if str(query.from_user.id) not in ALLOWED_USERS:
         return ConversationHandler.END
     action = query.data.split(":", 1)[1]
     pending = context.user_data.pop("remove_pending", None)
@@ -416,9 +718,9 @@ async def cb_remove_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if action == "yes" and pending:
         user_id = str(query.from_user.id)
-        repo: AbstractRepository = context.bot_data["repos"][user_id]
+        repo: AbstractRepository = await _get_repo(context, user_id)
         await repo.remove_manga(pending)
-        _invalidate_manga_cache(user_id)
+        _cache_remove_manga(user_id, pending)
         context.user_data.pop("status_manga", None)
         await query.edit_message_text(f"🗑 «{pending}» видалено зі списку.")
     else:
@@ -450,59 +752,140 @@ async def handle_unknown_text(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # Inline пошук
 
+def _inline_cache_time(user_id: str, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """cache_time для inline відповіді.
+    Щойно змінені дані ймовірно зміняться знову (діалоги, перевірка) - кешуємо коротко,
+    стабільні дані - до _INLINE_CACHE_TIME."""
+    if context.user_data.get("check_running"):
+        return 0
+    age = time.time() - _get_data_version(user_id)["changed_at"]
+    return max(0, min(_INLINE_CACHE_TIME, int(age)))
+
+
+def _inline_result(user_id: str, title: str, info: dict) -> InlineQueryResultArticle:
+    """Повертає готовий результат для (title, chapter) або створює новий."""
+    chapter = info.get("last_chapter", "невідомо")
+    results = _INLINE_RESULTS.setdefault(user_id, {})
+    result = results.get((title, chapter))
+    metrics.CACHE_REQUESTS.inc(cache="inline_result", result="hit" if result is not None else "miss")
+    if result is None:
+        url = info.get("url", "")
+        result = InlineQueryResultArticle(
+            # Стабільний id - однаковий для манги на будь-якій сторінці видачі
+            id=hashlib.md5(title.encode()).hexdigest(),
+            title=title,
+            description=f"Глава: {chapter}",
+            input_message_content=InputTextMessageContent(
+                message_text=f"📖 {title}\n\nГлава: {chapter}\n{url}",
+                disable_web_page_preview=True,
+            ),
+        )
+        results[(title, chapter)] = result
+    return result
+
+
+def _prune_inline_results(user_id: str, manga: dict):
+    """Прибирає готові результати для видалених манг і застарілих глав."""
+    results = _INLINE_RESULTS.get(user_id)
+    if not results:
+        return
+    for title, chapter in list(results):
+        info = manga.get(title)
+        if info is None or info.get("last_chapter", "невідомо") != chapter:
+            del results[(title, chapter)]
+
+
+def _parse_inline_offset(offset: str) -> tuple[int | None, int]:
+    """offset має формат "версія:позиція" -> (версія, позиція).
+    Порожній або пошкоджений - перша сторінка без версії."""
+    try:
+        version, position = offset.split(":", 1)
+        return int(version), max(0, int(position))
+    except ValueError:
+        return None, 0
+
+
 async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.inline_query
     user_id = str(query.from_user.id)
-    if user_id not in context.bot_data["repos"]:
+    if user_id not in ALLOWED_USERS:
         await query.answer([], cache_time=0)
         return
 
-    query_text = (query.query or "").strip().lower()
-    manga = await _get_cached_manga(context, user_id)
+    entry = await _get_cached_entry(context, user_id)
+    manga = entry["data"]
+    version, start = _parse_inline_offset(query.offset)
+    if query.offset and version != _get_data_version(user_id)["version"]:
+        # Список змінився між сторінками - стара позиція пропустила б або повторила назви,
+        # а перша сторінка додалась би до вже показаних. Порожня відповідь без next_offset
+        # зупиняє догортування, наступний запит клієнта почнеться з першої сторінки
+        await query.answer([], cache_time=0, is_personal=True, next_offset="")
+        return
+    # +1 щоб дізнатись чи є наступна сторінка
+    titles = entry["index"].search(query.query or "", limit=start + _INLINE_PAGE_SIZE + 1)
+    page = titles[start:start + _INLINE_PAGE_SIZE]
+
+    results = [_inline_result(user_id, title, manga[title]) for title in page if title in manga]
+
+    next_offset = ""
+    if len(titles) > start + _INLINE_PAGE_SIZE:
+        # Версія в offset - сторінки закешовані Telegram до зміни даних не перевикористовуються
+        next_offset = f"{_get_data_version(user_id)['version']}:{start + _INLINE_PAGE_SIZE}"
+
+    await query.answer(
+        results,
+        cache_time=_inline_cache_time(user_id, context),
+        is_personal=True,
+        next_offset=next_offset,
+    )
 
-    matches = {t: info for t, info in manga.items() if query_text in t.lower()} if query_text else manga
 
-    results = []
-    for i, (title, info) in enumerate(list(matches.items())[:50]):
-        chapter = info.get("last_chapter", "невідомо")
-        url = info.get("url", "")
-        results.append(
-            InlineQueryResultArticle(
-                id=str(i),
-                title=title,
-                description=f"Глава: {chapter}",
-                input_message_content=InputTextMessageContent(
-                    message_text=f"📖 {title}\n\nГлава: {chapter}\n{url}",
-                    disable_web_page_preview=True,
-                ),
-            )
-        )
+# /stats helpers
 
-    await query.answer(results, cache_time=0, is_personal=True)
+# (поле семплера, назва, одиниця, формат)
+_STATS_SERIES = (
+    ("total_mb", "RAM з Chromium", "MB", "{:.0f}"),
+    ("cpu", "CPU", "%", "{:.0f}"),
+    ("lag_ms", "Лаг циклу", "мс", "{:.0f}"),
+    ("connections", "З'єднання", "", "{:.0f}"),
+)
 
 
+def _format_window(seconds: float, label: str) -> list[str]:
+    lines = [f"За {label} (мін / сер / p95 / пік):"]
+    for field, name, unit, fmt in _STATS_SERIES:
+        summary = _sampler.summary(field, seconds)
+        if summary is None:
+            continue
+        values = " / ".join(fmt.format(summary[k]) for k in ("min", "avg", "p95", "peak"))
+        lines.append(f"  {name}: {values} {unit}".rstrip())
+        lines.append(f"  {_sampler.sparkline(field, seconds)}")
+    return lines
+
 
-# /stats helpers
 def _get_stats_process() -> str:
-    KOYEB_LIMIT_MB = 512
-    ram_mb = _get_total_ram_mb()
-    ram_warning = " ⚠️" if ram_mb > KOYEB_LIMIT_MB * 0.8 else ""
-    cpu = _process.cpu_percent(interval=0.5)
-    ram_mb_proc = _process.memory_info().rss / 1024 / 1024
     uptime = str(datetime.timedelta(seconds=int(time.time() - _BOT_START_TIME)))
-    status = _process.status()
-    return "\n".join([
-        "⚙️ Процес бота",
-        f"  Статус: {status}",
-        f"  RAM (процес): {ram_mb_proc:.1f} MB",
-        f"  RAM (з Chromium): {ram_mb:.1f} MB / ліміт {KOYEB_LIMIT_MB} MB{ram_warning}",
-        f"  RAM пік (з Chromium): {_RAM_PEAK_MB:.1f} MB",
-        f"  CPU: {cpu:.1f}%",
-        f"  Uptime: {uptime}",
-    ])
+    lines = ["⚙️ Процес бота", f"  Статус: {process().status()}", f"  Uptime: {uptime}"]
+    ram_mb = _sampler.latest("total_mb")
+    if ram_mb is None:
+        lines.append("  Показники ще збираються - перший замір через кілька секунд.")
+        return "\n".join(lines)
+    ram_warning = " ⚠️" if ram_mb > MEMORY_LIMIT_MB * MEMORY_SOFT_PERCENT / 100 else ""
+    lines += [
+        f"  RAM (процес): {_sampler.latest('rss_mb'):.1f} MB",
+        f"  RAM (з Chromium): {ram_mb:.1f} MB / ліміт {MEMORY_LIMIT_MB} MB{ram_warning}",
+        f"  CPU: {_sampler.latest('cpu'):.1f}%",
+        f"  Лаг циклу подій: {_sampler.latest('lag_ms'):.0f} мс",
+        "",
+        *_format_window(HOUR, "1 год"),
+        "",
+        *_format_window(DAY, "24 год"),
+    ]
+    return "\n".join(lines)
 
 
 def _get_stats_server() -> str:
+    import psutil
     boot_time = datetime.datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
     users = psutil.users()
     users_str = ", ".join(u.name for u in users) if users else "немає"
@@ -514,11 +897,10 @@ def _get_stats_server() -> str:
 
 
 def _get_stats_network() -> str:
+    import psutil
     net = psutil.net_io_counters()
-    try:
-        conns = len([c for c in psutil.net_connections() if c.pid == _process.pid])
-    except psutil.AccessDenied:
-        conns = "н/д"
+    conns = _sampler.latest("connections")
+    conns = "н/д" if conns is None else f"{conns:.0f}"
     return "\n".join([
         "🌐 Мережа",
         f"  Надіслано: {net.bytes_sent / 1024 / 1024:.1f} MB",
@@ -527,11 +909,88 @@ def _get_stats_network() -> str:
     ])
 
 
+# Скільки останніх перевірок зводити в розділі "⏱ Перевірки"
+STATS_TIMING_RUNS = 10
+
+
+def _get_stats_checks(runs: list[list[dict]]) -> str:
+    if not runs:
+        return "⏱ Перевірки\n  Ще немає завершених перевірок з таймінгами."
+    timings = RunTimings()
+    for run in runs:
+        timings.merge(run)
+    lines = [f"⏱ Перевірки (останні {len(runs)})", "", "Найповільніші домени (сумарно, на мангу):"]
+    for domain, total, titles in timings.domains()[:5]:
+        per_title = f", {total / titles:.1f} с/манга ({titles})" if titles else ""
+        lines.append(f"  {domain}: {total:.0f} с{per_title}")
+    lines += ["", "Найповільніші фази (p95 · середнє · макс):"]
+    for domain, phase, h in timings.slowest(5):
+        lines.append(
+            f"  {domain} · {PHASE_LABELS.get(phase, phase)}: "
+            f"{h.quantile(0.95):.1f} · {h.mean:.1f} · {h.max:.1f} с"
+        )
+    return "\n".join(lines)
+
+
+def _get_stats_slow() -> str:
+    lines = ["🐢 Повільне"]
+    if not LOOP_WATCH:
+        return "\n".join(lines + ["  Стеження вимкнено (LOOP_WATCH=false)."])
+    lag = _loopwatch.lag
+    lines.append(
+        f"  Лаг циклу подій: p95 {lag.quantile(0.95) * 1000:.0f} мс, макс {lag.max * 1000:.0f} мс "
+        f"({lag.count} замірів)"
+    )
+    lines += ["", f"Блокування циклу > {_loopwatch.threshold * 1000:.0f} мс (разів · макс · сумарно):"]
+    stalls = _loopwatch.worst_stalls(5)
+    if not stalls:
+        lines.append("  Не було.")
+    for location, stall in stalls:
+        lines.append(f"  {location}")
+        lines.append(f"    {stall['count']} · {stall['max'] * 1000:.0f} мс · {stall['total']:.1f} с")
+        lines += [f"      {frame}" for frame in stall["stack"][-3:]]
+    lines += ["", "Найповільніші обробники (викликів · p95 · макс):"]
+    handlers = _loopwatch.slowest_handlers(5)
+    if not handlers:
+        lines.append("  Ще не викликались.")
+    for name, h in handlers:
+        lines.append(f"  {name}: {h.count} · {h.quantile(0.95):.2f} · {h.max:.2f} с")
+    return "\n".join(lines)
+
+
+def _get_stats_leaks() -> str:
+    lines = ["🧪 Витоки"]
+    if not leakwatch.LEAK_WATCH:
+        return "\n".join(lines + ["  Вимкнено (LEAK_WATCH=true - порівнювати пам'ять між перевірками)."])
+    runs = leakwatch.runs()
+    if not runs:
+        return "\n".join(lines + ["  Ще немає перевірок з порівнянням пам'яті."])
+    lines.append(f"  Пам'ять Python після останніх {len(runs)} перевірок:")
+    lines.append("  " + " → ".join(f"{run['traced_mb']:.1f}" for run in runs) + " MB")
+    found = leakwatch.suspects()
+    lines += ["", "Ростуть після кожної перевірки:"]
+    if not found["sites"] and not found["types"]:
+        lines.append("  Немає." if len(runs) >= 3 else "  Потрібно щонайменше 3 перевірки.")
+    for site, size in found["sites"][:5]:
+        lines.append(f"  {site}: +{size / 1024:.0f} KB")
+    for name, count in found["types"][:5]:
+        lines.append(f"  {name}: +{count} об'єктів")
+    last = runs[-1]
+    if last["site_diff"]:
+        lines += ["", "Остання перевірка, найбільше нової пам'яті:"]
+        lines += [f"  {site}: +{size / 1024:.0f} KB" for site, size in last["site_diff"][:5]]
+    return "\n".join(lines)
+
+
 def _stats_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup([[
         InlineKeyboardButton("⚙️ Процес", callback_data="stats:process"),
         InlineKeyboardButton("🖥 Сервер", callback_data="stats:server"),
         InlineKeyboardButton("🌐 Мережа", callback_data="stats:network"),
+    ], [
+        InlineKeyboardButton("⏱ Перевірки", callback_data="stats:checks"),
+        InlineKeyboardButton("🐢 Повільне", callback_data="stats:slow"),
+        InlineKeyboardButton("🧪 Витоки", callback_data="stats:leaks"),
     ]])
 
 
@@ -553,9 +1012,17 @@ async def cb_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
     section = query.data.split(":")[1]
     if section == "process":
-        text = await asyncio.to_thread(_get_stats_process)
+        # Тільки історія семплера - без замірів в обробнику
+        text = _get_stats_process()
     elif section == "server":
         text = await asyncio.to_thread(_get_stats_server)
+    elif section == "slow":
+        text = _get_stats_slow()
+    elif section == "leaks":
+        text = _get_stats_leaks()
+    elif section == "checks":
+        repo = await _get_repo(context, str(update.effective_user.id))
+        text = _get_stats_checks(await repo.get_check_timings(STATS_TIMING_RUNS))
     else:
         text = await asyncio.to_thread(_get_stats_network)
     try:
@@ -564,6 +1031,67 @@ async def cb_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
 
+# /profile
+
+PROFILE_USAGE = (
+    "/profile - профіль однієї перевірки твого списку\n"
+    f"/profile N - профіль роботи бота за N секунд (до {PROFILE_MAX_SECONDS})"
+)
+
+
+async def _run_profile(message: Message, context: ContextTypes.DEFAULT_TYPE, seconds: int | None):
+    """Фонова задача - обробники бота працюють далі і теж потрапляють в профіль."""
+    profiler = Profiler()
+    await asyncio.to_thread(profiler.start)
+    try:
+        if seconds:
+            await message.reply_text(f"🔬 Профілюю роботу бота {seconds} с...")
+            await asyncio.sleep(seconds)
+        else:
+            await message.reply_text("🔬 Профілюю одну перевірку...")
+            await _run_check_command(message, context)
+    finally:
+        report = await asyncio.to_thread(profiler.stop)
+    target = f"вікно {seconds} с" if seconds else "одна перевірка"
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    await message.reply_document(
+        document=f"Профіль: {target}\n{report}".encode(),
+        filename=f"profile-{stamp}.txt",
+        caption=f"🔬 Профіль ({target}, {profiler.duration:.0f} с): гарячі функції і місця виділення пам'яті",
+    )
+
+
+@admin_only
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = update.effective_message
+    running = context.bot_data.get("profile_task")
+    if running is not None and not running.done():
+        await message.reply_text("⏳ Профілювання вже виконується, зачекай...")
+        return
+    seconds = None
+    if context.args:
+        try:
+            seconds = int(context.args[0])
+        except ValueError:
+            await message.reply_text(PROFILE_USAGE)
+            return
+        if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+            await message.reply_text(PROFILE_USAGE)
+            return
+
+    async def run():
+        try:
+            await _run_profile(message, context, seconds)
+        except Exception as e:
+            log(f"❌ Профілювання: помилка: {e}")
+            try:
+                await message.reply_text(f"⚠️ Профілювання не вдалось: {e}")
+            except Exception:
+                pass
+
+    context.bot_data["profile_task"] = asyncio.create_task(run())
+
+
 # Запуск
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -583,19 +1111,30 @@ def _handle_signal(sig, frame):
     log(f"⚠️ Отримано сигнал {sig} - завершуємо бота...")
     try:
         loop = asyncio.get_running_loop()
-        loop.call_soon_threadsafe(_shutdown_event.set)
+        loop.call_soon_threadsafe(shutdown_event.set)
     except RuntimeError:
         pass
     raise SystemExit(0)
 
 
+# Типи оновлень, для яких є обробники - решту Telegram не надсилає зовсім
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.INLINE_QUERY]
+
+
 def run_bot():
     signal.signal(signal.SIGINT, _handle_signal)
     signal.signal(signal.SIGTERM, _handle_signal)
 
-    repo = get_repository(user_id=CHAT_ID)
-    app = ApplicationBuilder().token(TOKEN).build()
-    app.bot_data["repos"] = {str(CHAT_ID): repo}
+    builder = ApplicationBuilder().token(TOKEN)
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+    if metrics.ENABLED:
+        # Як за замовчуванням - оновлення по одному, але з вимірюванням часу обробки
+        builder = builder.concurrent_updates(_TimedUpdateProcessor(1))
+    app = builder.build()
+    # Репозиторії користувачів створюються на вимогу в _get_repo
+    app.bot_data["repos"] = {}
+    app.bot_data["repo_setups"] = {}
 
     add_conv = ConversationHandler(
         entry_points=[CallbackQueryHandler(cb_start_add, pattern=r"^start_add$")],
@@ -622,45 +1161,96 @@ def run_bot():
 
     app.add_handler(CommandHandler("start", cmd_start))
     app.add_handler(CommandHandler("stats", cmd_stats))
+    app.add_handler(CommandHandler("profile", cmd_profile))
     app.add_handler(add_conv)
     app.add_handler(remove_conv)
     app.add_handler(CallbackQueryHandler(cb_status, pattern=r"^status:"))
     app.add_handler(CallbackQueryHandler(cb_stats, pattern=r"^stats:"))
     app.add_handler(CallbackQueryHandler(cb_start_status, pattern=r"^start_status$"))
     app.add_handler(CallbackQueryHandler(cb_start_check, pattern=r"^start_check$"))
+    app.add_handler(CallbackQueryHandler(cb_start_history, pattern=r"^start_history$"))
+    app.add_handler(CallbackQueryHandler(cb_history, pattern=r"^history:"))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_unknown_text))
     app.add_handler(MessageHandler(filters.COMMAND, cmd_unknown))
     app.add_handler(InlineQueryHandler(inline_search))
     app.add_error_handler(error_handler)
+    if LOOP_WATCH:
+        _loopwatch.instrument(app)
 
     async def on_shutdown(app):
-        task = app.bot_data.get("monitor_task")
-        if task and not task.done():
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-        log("🛑 Моніторинг RAM зупинено")
-        for r in app.bot_data["repos"].values():
-            r.close()
+        background = (
+            "resume_task", "scheduler_task", "sampler_task", "loopwatch_task", "profile_task", "commands_task",
+        )
+        for name in background:
+            task = app.bot_data.get(name)
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        log("🛑 Збір показників процесу зупинено")
+        if app.bot_data.get("metrics_runner") is not None:
+            await app.bot_data["metrics_runner"].cleanup()
+        # Черги записів в Atlas дописуються паралельно для всіх користувачів, до закриття клієнтів
+        await asyncio.gather(*(r.close() for r in app.bot_data["repos"].values()))
+        await close_shared()
+        close_parse_pool()
         log("🛑 З'єднання з MongoDB закрито")
 
+    async def _set_commands(app):
+        try:
+            await app.bot.set_my_commands([
+                ("start", "Меню"),
+                ("stats", "Статистика сервера"),
+                ("profile", "Профіль CPU і пам'яті"),
+            ])
+        except Exception as e:
+            log(f"⚠️ Не вдалось встановити меню команд: {e}")
+
     async def on_startup(app):
-        for r in app.bot_data["repos"].values():
-            await r.setup()
-        await app.bot.set_my_commands([
-            ("start", "Меню"),
-            ("stats", "Статистика сервера"),
-        ])
-        app.bot_data["monitor_task"] = asyncio.create_task(_memory_monitor())
-        log("🔍 Фоновий моніторинг RAM запущено")
+        if CHECK_WORKERS:
+            # Перевірки виконують окремі процеси worker.py - бот тільки ставить задачі
+            queue = get_job_queue()
+            await queue.setup()
+            app.bot_data["check_func"] = functools.partial(remote_check_all, queue)
+            log("👷 Перевірки передаються воркерам через чергу jobs")
+        # Меню команд - запит до Telegram не затримує початок отримання оновлень
+        app.bot_data["commands_task"] = asyncio.create_task(_set_commands(app))
+        app.bot_data["sampler_task"] = asyncio.create_task(_sampler.run())
+        log(f"🔍 Фоновий збір показників процесу кожні {_sampler.interval:g} сек запущено")
+        if LOOP_WATCH:
+            app.bot_data["loopwatch_task"] = asyncio.create_task(_loopwatch.run())
+            log(f"🐢 Стеження за блокуванням циклу подій > {_loopwatch.threshold * 1000:.0f} мс запущено")
+        if metrics.ENABLED:
+            try:
+                app.bot_data["metrics_runner"] = await metrics.start_server()
+            except OSError as e:
+                log(f"⚠️ Сервер метрик не запущено: {e}")
+        app.bot_data["resume_task"] = asyncio.create_task(_resume_interrupted_checks(app))
+        if CHECK_INTERVAL_MINUTES > 0:
+            app.bot_data["scheduler_task"] = asyncio.create_task(_check_scheduler(app))
+            log(f"⏰ Автоматична перевірка кожні {CHECK_INTERVAL_MINUTES} хв")
 
     app.post_init = on_startup
     app.post_shutdown = on_shutdown
 
     try:
-        app.run_polling()
+        if WEBHOOK_URL:
+            # Оновлення приходять відразу POST запитом - без постійного long polling з'єднання.
+            # Одна репліка: стан діалогів і user_data тільки в пам'яті процесу (див. README, Webhook)
+            log(f"🌐 Webhook {WEBHOOK_URL}/{WEBHOOK_PATH}, слухаємо {WEBHOOK_LISTEN}:{WEBHOOK_PORT}")
+            app.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+            )
+        else:
+            app.run_polling(allowed_updates=ALLOWED_UPDATES)
     except SystemExit:
         log("🛑 Бот завершено коректно.")
     except Exception as e:
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from dotenv import load_dotenv
 
@@ -8,4 +9,40 @@ TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
 if not TOKEN or not CHAT_ID:
-    raise ValueError("Не знайдено TELEGRAM_TOKEN або TELEGRAM_CHAT_ID в .env файлі")
\ No newline at end of file
+    raise ValueError("Не знайдено TELEGRAM_TOKEN або TELEGRAM_CHAT_ID в .env файлі")
+
+# Режим багатьох користувачів: додаткові Telegram ID через кому.
+# CHAT_ID завжди має доступ і залишається адміністратором (/stats)
+ALLOWED_USERS = {str(CHAT_ID)} | {
+    uid.strip() for uid in os.getenv("ALLOWED_USERS", "").split(",") if uid.strip()
+}
+
+# Автоматична перевірка всіх користувачів кожні N хвилин (0 - вимкнено)
+CHECK_INTERVAL_MINUTES = int(os.getenv("CHECK_INTERVAL_MINUTES", "0"))
+# Автоматична перевірка тільки тих манг, яким вже час за історією виходу глав (core.cadence).
+# Ручна перевірка завжди перевіряє весь список
+CHECK_DUE_ONLY = os.getenv("CHECK_DUE_ONLY", "true").lower() == "true"
+
+# TTL розподілених блокувань (секунди): перевірки користувача і лідерства планувальника.
+# Блокування продовжується кожну третину TTL, після падіння репліки звільняється через TTL
+CHECK_LOCK_TTL = int(os.getenv("CHECK_LOCK_TTL", "120"))
+LEADER_TTL = int(os.getenv("LEADER_TTL", "60"))
+
+# Перервану перевірку (перезапуск, деплой) продовжуємо при старті, якщо вона
+# почалась не раніше ніж N годин тому - старіші результати вже неактуальні
+CHECK_RESUME_MAX_AGE_HOURS = int(os.getenv("CHECK_RESUME_MAX_AGE_HOURS", "12"))
+
+# Webhook замість long polling: з WEBHOOK_URL Telegram сам надсилає оновлення POST запитом
+# на WEBHOOK_URL/WEBHOOK_PATH, бот слухає WEBHOOK_LISTEN:WEBHOOK_PORT (порожній - polling)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+# Telegram передає його в заголовку кожного запиту, чужі запити відхиляються.
+# Без явного значення виводиться з токена - не змінюється між перезапусками
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "") or hashlib.sha256(f"webhook:{TOKEN}".encode()).hexdigest()[:32]
+# Скільки одночасних з'єднань Telegram відкриває до webhook (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Адреса Bot API (локальний сервер telegram-bot-api або бенчмарк benchmarks/fake_telegram.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
@@ -0,0 +1,152 @@
+"""
+Дисковий кеш скриптів сайтів для браузерних парсерів (BROWSER_CACHE_DIR).
+
+Кожна вкладка перехоплює всі запити (page.route) - з перехопленням Chromium
+не використовує свій HTTP кеш, тому постійний профіль (launch_persistent_context)
+нічого б не дав: скрипти mangalib і com-x завантажувались би заново в кожному батчі.
+Замість цього маршрут вкладки віддає GET запити скриптів з цього кешу,
+а при промаху завантажує їх через route.fetch() і зберігає.
+
+Файл запису - JSON рядок з адресою, статусом і заголовками, далі тіло.
+Загальний розмір обмежений BROWSER_CACHE_MB - при перевищенні видаляються
+записи, до яких найдовше не зверталися. Запис старший за BROWSER_CACHE_TTL_HOURS
+вважається відсутнім - скрипти без версії в адресі оновлюються хоча б так.
+Робота з файлами виконується в потоці.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core import metrics
+from core.logger import get_logger
+
+log = get_logger("browser_cache").info
+
+BROWSER_CACHE_DIR = os.getenv("BROWSER_CACHE_DIR", "")
+BROWSER_CACHE_MB = float(os.getenv("BROWSER_CACHE_MB", "200"))
+BROWSER_CACHE_TTL_HOURS = float(os.getenv("BROWSER_CACHE_TTL_HOURS", "24"))
+ENABLED = bool(BROWSER_CACHE_DIR)
+
+CACHED_RESOURCES = {"script"}
+# Заголовки, що віддаються з кешу - решта (cookie, дати) для скрипта не потрібні
+_KEEP_HEADERS = ("content-type", "access-control-allow-origin")
+
+
+class DiskCache:
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # {ключ: [розмір, час останнього звернення]}
+        self._index: dict[str, list] | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def _load_index(self) -> dict[str, list]:
+        if self._index is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._index = {}
+            for entry in os.scandir(self.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    self._index[entry.name] = [stat.st_size, stat.st_mtime]
+            self._size = sum(size for size, _ in self._index.values())
+        return self._index
+
+    def _remove(self, key: str) -> None:
+        size, _ = self._index.pop(key, (0, 0))
+        self._size -= size
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def get(self, url: str) -> tuple[int, dict, bytes] | None:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        with self._lock:
+            if key not in self._load_index():
+                return None
+            try:
+                with open(self._file(key), "rb") as f:
+                    meta = json.loads(f.readline())
+                    body = f.read()
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            if meta.get("url") != url or time.time() - meta.get("stored_at", 0) > self.ttl:
+                self._remove(key)
+                return None
+            now = time.time()
+            self._index[key][1] = now
+            # Час звернення в mtime - після перезапуску витіснення продовжується з тим самим порядком
+            os.utime(self._file(key), (now, now))
+        return meta["status"], meta["headers"], body
+
+    def put(self, url: str, status: int, headers: dict, body: bytes) -> None:
+        key = hashlib.sha1(url.encode()).hexdigest()
+        meta = json.dumps({"url": url, "status": status, "headers": headers, "stored_at": time.time()})
+        data = meta.encode() + b"\n" + body
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            index = self._load_index()
+            tmp = self._file(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._file(key))
+            if key in index:
+                self._size -= index[key][0]
+            index[key] = [len(data), time.time()]
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                evicted = 0
+                for old in sorted(index, key=lambda k: index[k][1]):
+                    if self._size <= self.max_bytes * 0.9:
+                        break
+                    self._remove(old)
+                    evicted += 1
+                log(f"🗄 Кеш браузера: витіснено {evicted} записів, {self._size / 1024 / 1024:.1f} MB")
+
+
+_cache: DiskCache | None = None
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(BROWSER_CACHE_DIR, int(BROWSER_CACHE_MB * 1024 * 1024), BROWSER_CACHE_TTL_HOURS * 3600)
+    return _cache
+
+
+def cacheable(request) -> bool:
+    return ENABLED and request.method == "GET" and request.resource_type in CACHED_RESOURCES
+
+
+async def fulfill(route) -> None:
+    """Віддає запит скрипта з кешу або з мережі, зберігаючи відповідь."""
+    cache = _get_cache()
+    url = route.request.url
+    entry = await asyncio.to_thread(cache.get, url)
+    if entry is not None:
+        status, headers, body = entry
+        metrics.CACHE_REQUESTS.inc(cache="browser", result="hit")
+        await route.fulfill(status=status, headers=headers, body=body)
+        return
+    metrics.CACHE_REQUESTS.inc(cache="browser", result="miss")
+    response = await route.fetch()
+    body = await response.body()
+    headers = response.headers
+    if response.status == 200 and "no-store" not in headers.get("cache-control", "") and "set-cookie" not in headers:
+        kept = {name: headers[name] for name in _KEEP_HEADERS if name in headers}
+        try:
+            await asyncio.to_thread(cache.put, url, response.status, kept, body)
+        except OSError as e:
+            log(f"⚠️ Кеш браузера: не вдалось зберегти {url}: {e}")
+    await route.fulfill(response=response, body=body)
@@ -0,0 +1,77 @@
+"""
+Адаптивна частота перевірки манги за історією виходу глав.
+
+Для кожної манги зберігаються:
+  released_at   - час (epoch) останніх змін глави, не більше RELEASE_HISTORY_SIZE
+  checked_at    - час останньої успішної перевірки
+  tracked_since - з якого часу манга відстежується
+
+Інтервал між главами - медіана проміжків released_at. Період перевірки - частка
+інтервалу, але коли наближається очікувана глава - перевіряємо кожен цикл.
+Манги без нових глав довше ніж STALE_FACTOR інтервалів (або взагалі без історії)
+перевіряються все рідше, до CADENCE_MAX_HOURS.
+"""
+import os
+import statistics
+import time
+
+# Найчастіше і найрідше манга перевіряється в режимі "тільки на часі"
+CADENCE_MIN_HOURS = float(os.getenv("CADENCE_MIN_HOURS", "1"))
+CADENCE_MAX_HOURS = float(os.getenv("CADENCE_MAX_HOURS", "72"))
+
+# Період перевірки - така частка очікуваного інтервалу між главами
+CHECK_FRACTION = 0.25
+# З якої частки інтервалу після останньої глави чекаємо нову - перевіряємо кожен цикл
+EXPECTED_FROM = 0.75
+# Стільки інтервалів без глав - манга вважається покинутою
+STALE_FACTOR = 3.0
+# Допуск для is_due - цикл планувальника не має пропускати мангу через пару хвилин
+DUE_SLACK_SECONDS = 300
+
+_HOUR = 3600.0
+
+
+def estimate_interval(released_at: list[float]) -> float | None:
+    """Медіана проміжків між главами в секундах. None - менше двох відомих глав."""
+    if len(released_at) < 2:
+        return None
+    times = sorted(released_at)
+    return statistics.median(b - a for a, b in zip(times, times[1:]))
+
+
+def check_period(info: dict, now: float | None = None) -> float:
+    """Скільки секунд можна не перевіряти мангу після останньої перевірки."""
+    now = time.time() if now is None else now
+    min_period, max_period = CADENCE_MIN_HOURS * _HOUR, CADENCE_MAX_HOURS * _HOUR
+    released = info.get("released_at") or []
+    interval = estimate_interval(released)
+    last_event = max(released) if released else info.get("tracked_since")
+
+    if interval is None:
+        if last_event is None:
+            # Нічого не відомо - перевіряємо кожен цикл
+            return min_period
+        # Одна глава або жодної: чим довше тиша, тим рідше
+        return min(max(CHECK_FRACTION * (now - last_event), min_period), max_period)
+
+    since = now - max(released)
+    if since > STALE_FACTOR * interval:
+        period = CHECK_FRACTION * since
+    elif since >= EXPECTED_FROM * interval:
+        period = min_period
+    else:
+        period = CHECK_FRACTION * interval
+    return min(max(period, min_period), max_period)
+
+
+def next_due(info: dict, now: float | None = None) -> float:
+    """Час (epoch) наступної перевірки. Ще не перевірена манга - одразу."""
+    checked = info.get("checked_at")
+    if checked is None:
+        return 0.0
+    return checked + check_period(info, now)
+
+
+def is_due(info: dict, now: float | None = None) -> bool:
+    now = time.time() if now is None else now
+    return next_due(info, now) <= now + DUE_SLACK_SECONDS
@@ -3,14 +3,39 @@
 Використовує Dependency Injection через AbstractRepository.
 """
 from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import asyncio
 import time
+import uuid
+from typing import Awaitable, Callable
 
-from core.parser_playwright import check_all
+from core import cadence, leakwatch, metrics, timing
+from core.shutdown import shutdown_event
 from core.logger import get_logger
-from core.repository import AbstractRepository
+from core.repository import AbstractRepository, Lease, LeaseLost
 
 log = get_logger("checker").info
 
+# check_func(manga_dict, on_result=..., details=...) -> {title: глава}, як check_all
+CheckFunc = Callable[..., Awaitable[dict[str, str]]]
+
+INTERRUPTED_REPORT = "🛑 Перевірку перервано перезапуском бота - вона продовжиться автоматично."
+LEASE_LOST_REPORT = "⚠️ Перевірку перервано: її продовжила інша копія бота"
+# Як часто перевіряти, чи блокування перевірки ще дійсне
+LEASE_WATCH_INTERVAL = 1.0
+
+
+def _fence(lease: Lease | None) -> int | None:
+    """Токен блокування для записів перевірки - сховище відхиляє записи зі старішим токеном."""
+    return lease.token if lease is not None else None
+
+
+def _local_check_func() -> CheckFunc:
+    """check_all цього процесу. Playwright і aiohttp імпортуються при першій перевірці,
+    а не при старті бота - і зовсім не імпортуються, якщо перевіряють воркери."""
+    from core.parser_playwright import check_all
+    return check_all
+
 
 def _normalize_chapter(value: str) -> str:
     """Нормалізує номер глави до єдиного формату для коректного порівняння.
@@ -25,20 +50,52 @@ def _normalize_chapter(value: str) -> str:
         return value.strip()
 
 
-async def run_check(repo: AbstractRepository, preloaded_data: dict | None = None) -> str:
-    _start = time.monotonic()
-    # Якщо дані вже завантажені, не робити зайвий запит до MongoDB
-    data = preloaded_data if preloaded_data is not None else await repo.load()
-    manga_urls = {title: info["url"] for title, info in data["manga"].items()}
-    old_chapters = {title: info["last_chapter"] for title, info in data["manga"].items()}
+# Параметри запиту які не впливають на сторінку манги
+_TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "ref"}
+
+
+def canonicalize_url(url: str) -> str:
+    """Ключ для дедуплікації однакових посилань різних користувачів.
+
+    "https://WWW.Site.com/manga/1/?utm_source=x#top" -> "https://site.com/manga/1"
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit((parts.scheme.lower(), host, path, query, ""))
+
 
-    results = await check_all(manga_urls)
+async def _apply_results(
+    repo: AbstractRepository,
+    data: dict,
+    results: dict[str, str],
+    lease: Lease | None = None,
+    checked_at: float | None = None,
+    details: dict | None = None,
+) -> tuple[str, int]:
+    """Порівнює результати перевірки зі збереженими главами, записує нові.
+    Якщо блокування перевірки втрачено (його забрала інша репліка) - записи припиняються,
+    запис, відхилений сховищем за токеном (LeaseLost), теж означає втрату блокування.
+    checked_at - час початку перевірки, записується успішно перевіреним мангам.
+    details - {title: {"method", "latency"}} з check_all, йдуть в історію глав.
+    Повертає текст звіту і кількість нових глав."""
+    old_chapters = {title: info["last_chapter"] for title, info in data["manga"].items()}
 
     new_lines = []
     error_lines = []
+    checked = []
 
     try:
         for title, new_chapter in results.items():
+            if lease is not None and not lease.valid:
+                log("  ⚠️ Блокування перевірки втрачено - припиняємо записи")
+                error_lines.append(LEASE_LOST_REPORT)
+                break
+
             if title not in data["manga"]:
                 log(f"  ℹ️ {title} - видалена під час перевірки, пропускаємо")
                 continue
@@ -50,6 +107,7 @@ async def run_check(repo: AbstractRepository, preloaded_data: dict | None = None
             if new_chapter == "невідомо":
                 error_lines.append(f"⚠️ {title} - не вдалося перевірити\n  {url}")
                 continue
+            checked.append(title)
 
             if new_chapter != old_chapter:
                 # Захист від помилкових сповіщень коли сайт повертає некоректний номер
@@ -61,10 +119,24 @@ async def run_check(repo: AbstractRepository, preloaded_data: dict | None = None
                     pass
 
                 new_lines.append(f"✅ {title} - нова глава: {new_chapter}  (була: {old_chapter})\n  {url}")
-                await repo.update_chapter(title, new_chapter)
+                # Перша глава після додавання - не вихід нової, в історію не йде
+                is_release = old_chapter != "невідомо"
+                with timing.span("db", timing.resolve_domain(url)):
+                    try:
+                        await repo.update_chapter(title, new_chapter, record_release=is_release, fence=_fence(lease))
+                    except LeaseLost as e:
+                        log(f"  ⚠️ {title}: запис відхилено ({e}) - блокування перевірки вже в іншої копії")
+                        lease.lost = True
+                        new_lines.pop()
+                        error_lines.append(LEASE_LOST_REPORT)
+                        break
+                    if is_release:
+                        await _record_history(repo, title, new_chapter, (details or {}).get(title, {}))
     finally:
         # Дата оновлюється завжди - навіть якщо частина манг впала з помилкою
-        await repo.set_last_check_date(datetime.now().strftime("%Y-%m-%d"))
+        if lease is None or lease.valid:
+            await repo.set_last_check_date(datetime.now().strftime("%Y-%m-%d"))
+            await repo.set_checked_at(checked, checked_at or time.time(), fence=_fence(lease))
 
     report_lines = [f"📚 Звіт за {datetime.now().strftime('%d.%m.%Y')}\n"]
 
@@ -77,6 +149,273 @@ async def run_check(repo: AbstractRepository, preloaded_data: dict | None = None
         report_lines.append("")
         report_lines.extend(error_lines)
 
+    return "\n".join(report_lines), len(new_lines)
+
+
+async def _record_history(repo: AbstractRepository, title: str, chapter: str, detail: dict) -> None:
+    # Історія - допоміжні дані, її помилка не має зупиняти запис глав
+    try:
+        await repo.add_chapter_history(title, chapter, time.time(), detail.get("method"), detail.get("latency"))
+    except Exception as e:
+        log(f"  ⚠️ {title}: не вдалось записати історію: {e}")
+
+
+def _all_urls(data: dict) -> dict[str, str]:
+    return {title: info["url"] for title, info in data["manga"].items()}
+
+
+def _due_urls(data: dict, now: float) -> dict[str, str]:
+    urls = {title: info["url"] for title, info in data["manga"].items() if cadence.is_due(info, now)}
+    skipped = len(data["manga"]) - len(urls)
+    if skipped:
+        log(f"  ⏭ Ще не час перевіряти {skipped} з {len(data['manga'])} манг")
+    return urls
+
+
+async def _start_run(repo: AbstractRepository, titles: list[str], lease: Lease | None = None) -> str | None:
+    """Створює запис перевірки для чекпоінтів. Не вдалось - перевірка йде без них."""
+    run_id = uuid.uuid4().hex
+    try:
+        await repo.start_check_run(run_id, titles, fence=_fence(lease))
+    except Exception as e:
+        log(f"  ⚠️ Не вдалось створити запис перевірки: {e} - продовжуємо без чекпоінтів")
+        return None
+    return run_id
+
+
+async def _finish_run(
+    repo: AbstractRepository,
+    run_id: str | None,
+    timings: timing.RunTimings | None = None,
+    lease: Lease | None = None,
+) -> None:
+    if run_id is None or (lease is not None and not lease.valid):
+        return
+    try:
+        await repo.finish_check_run(run_id, timings.to_list() if timings is not None else None, fence=_fence(lease))
+    except Exception as e:
+        log(f"  ⚠️ Не вдалось завершити запис перевірки {run_id}: {e}")
+
+
+async def _check_while_held(check: Awaitable[dict[str, str]], leases: list[Lease]) -> dict[str, str] | None:
+    """Виконує перевірку поки дійсне хоч одне з блокувань. Всі втрачено - скасовує її,
+    щоб нові манги не завантажувались паралельно з реплікою, що забрала блокування.
+    Повертає None, якщо перевірку скасовано."""
+    task = asyncio.ensure_future(check)
+    if not leases:
+        return await task
+
+    async def _watch():
+        while any(lease.valid for lease in leases):
+            await asyncio.sleep(LEASE_WATCH_INTERVAL)
+
+    watch = asyncio.create_task(_watch())
+    try:
+        await asyncio.wait({task, watch}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        log("  ⚠️ Блокування перевірки втрачено - зупиняємо перевірку")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return None
+    finally:
+        watch.cancel()
+        if not task.done():
+            task.cancel()
+
+
+async def _save_result(repo: AbstractRepository, run_id: str, title: str, chapter: str, lease: Lease | None) -> None:
+    try:
+        await repo.save_check_result(run_id, title, chapter, fence=_fence(lease))
+    except LeaseLost as e:
+        log(f"  ⚠️ {title}: чекпоінт відхилено ({e}) - блокування перевірки вже в іншої копії")
+        lease.lost = True
+
+
+async def run_check(
+    repo: AbstractRepository,
+    preloaded_data: dict | None = None,
+    check_func: CheckFunc | None = None,
+    lease: Lease | None = None,
+    resume: dict | None = None,
+    due_only: bool = False,
+) -> str:
+    """check_func - функція перевірки {title: url} -> {title: глава}.
+    За замовчуванням check_all в цьому процесі, для воркерів - core.jobs.remote_check_all.
+    lease - блокування перевірки користувача: записи робляться тільки поки воно дійсне,
+    після втрати перевірка зупиняється і повертає LEASE_LOST_REPORT.
+    resume - перервана перевірка з repo.get_unfinished_check_run(): манги з уже
+    збереженим результатом повторно не перевіряються.
+    due_only - тільки манги, яким за core.cadence вже час перевірки.
+    Таймінги фаз (core.timing) зберігаються разом із записом перевірки.
+    З LEAK_WATCH пам'ять до і після перевірки порівнюється core.leakwatch."""
+    async with leakwatch.watching():
+        with timing.collecting() as timings:
+            return await _run_check(repo, preloaded_data, check_func, lease, resume, due_only, timings)
+
+
+async def _run_check(
+    repo: AbstractRepository,
+    preloaded_data: dict | None,
+    check_func: CheckFunc | None,
+    lease: Lease | None,
+    resume: dict | None,
+    due_only: bool,
+    timings: timing.RunTimings,
+) -> str:
+    _start = time.monotonic()
+    checked_at = time.time()
+    # Якщо дані вже завантажені, не робити зайвий запит до MongoDB
+    data = preloaded_data if preloaded_data is not None else await repo.load()
+    manga_urls = _due_urls(data, checked_at) if due_only else _all_urls(data)
+
+    if resume is not None:
+        run_id = resume["run_id"]
+        # Манги видалені після перерваної перевірки пропускаються
+        results = {t: c for t, c in resume["results"].items() if t in manga_urls}
+        pending = {t: manga_urls[t] for t in resume["titles"] if t in manga_urls and t not in results}
+        log(f"🔄 Продовжуємо перевірку {run_id}: готово {len(results)}, залишилось {len(pending)}")
+    else:
+        run_id = await _start_run(repo, list(manga_urls), lease)
+        results, pending = {}, manga_urls
+
+    async def _checkpoint(title: str, chapter: str):
+        if run_id is not None and (lease is None or lease.valid):
+            with timing.span("db", timing.resolve_domain(manga_urls[title])):
+                await _save_result(repo, run_id, title, chapter, lease)
+
+    details: dict[str, dict] = {}
+    if pending:
+        checked = await _check_while_held(
+            (check_func or _local_check_func())(pending, on_result=_checkpoint, details=details),
+            [lease] if lease is not None else [],
+        )
+        if checked is None:
+            return LEASE_LOST_REPORT
+        results.update(checked)
+    if shutdown_event.is_set():
+        # Запис перевірки лишається незавершеним - після перезапуску вона продовжиться
+        log("🛑 Перевірку перервано зупинкою бота - результати збережено")
+        return INTERRUPTED_REPORT
+    report, _ = await _apply_results(repo, data, results, lease, checked_at, details)
+    await _finish_run(repo, run_id, timings, lease)
+
+    elapsed = time.monotonic() - _start
+    metrics.CHECK_DURATION.observe(elapsed, kind="single")
+    log(f"⏱ Перевірка завершена за {elapsed:.1f} сек", extra={"phase": "check", "duration": round(elapsed, 2)})
+    return report
+
+
+async def run_check_many(
+    repos: dict[str, AbstractRepository],
+    check_func: CheckFunc | None = None,
+    leases: dict[str, Lease] | None = None,
+    due_only: bool = False,
+) -> dict[str, tuple[str, int]]:
+    """Перевірка для багатьох користувачів за один прохід.
+
+    Посилання всіх користувачів канонізуються і дедуплікуються - кожна унікальна
+    манга завантажується один раз, результат розсилається всім підписникам.
+    due_only - тільки манги, яким за core.cadence вже час перевірки.
+    Повертає {user_id: (звіт, кількість нових глав)}.
+    """
+    async with leakwatch.watching():
+        with timing.collecting() as timings:
+            return await _run_check_many(repos, check_func, leases, due_only, timings)
+
+
+async def _run_check_many(
+    repos: dict[str, AbstractRepository],
+    check_func: CheckFunc | None,
+    leases: dict[str, Lease] | None,
+    due_only: bool,
+    timings: timing.RunTimings,
+) -> dict[str, tuple[str, int]]:
+    _start = time.monotonic()
+    checked_at = time.time()
+    user_ids = list(repos)
+    loaded = await asyncio.gather(*(repos[uid].load() for uid in user_ids), return_exceptions=True)
+    datas = {}
+    for uid, data in zip(user_ids, loaded):
+        if isinstance(data, Exception):
+            log(f"  ❌ Не вдалось завантажити манги {uid}: {data}")
+            continue
+        datas[uid] = data
+
+    # {канонічний url: url для завантаження}, {канонічний url: [(user_id, title)]}
+    unique_urls: dict[str, str] = {}
+    subscribers: dict[str, list[tuple[str, str]]] = {}
+    for uid, data in datas.items():
+        for title, info in data["manga"].items():
+            if due_only and not cadence.is_due(info, checked_at):
+                continue
+            key = canonicalize_url(info["url"])
+            unique_urls.setdefault(key, info["url"])
+            subscribers.setdefault(key, []).append((uid, title))
+
+    total = sum(len(subs) for subs in subscribers.values())
+    log(f"👥 Користувачів: {len(datas)}, манг: {total}, унікальних посилань: {len(unique_urls)}")
+    if not unique_urls:
+        return {}
+
+    # Окремий запис перевірки на кожного користувача - перервану перевірку
+    # кожен продовжує сам через run_check(resume=...)
+    user_titles: dict[str, list[str]] = {}
+    for subs in subscribers.values():
+        for uid, title in subs:
+            user_titles.setdefault(uid, []).append(title)
+    active = list(user_titles)
+    run_ids = dict(zip(active, await asyncio.gather(
+        *(_start_run(repos[uid], user_titles[uid], leases.get(uid) if leases else None) for uid in active)
+    )))
+
+    async def _checkpoint(key: str, chapter: str):
+        for uid, title in subscribers[key]:
+            lease = leases.get(uid) if leases else None
+            if run_ids.get(uid) is not None and (lease is None or lease.valid):
+                with timing.span("db", timing.resolve_domain(key)):
+                    await _save_result(repos[uid], run_ids[uid], title, chapter, lease)
+
+    # Канонічний url виступає "назвою" - check_all повертає результат по ньому
+    details: dict[str, dict] = {}
+    # Спільний прохід зупиняється, коли блокування втратили всі користувачі
+    results = await _check_while_held(
+        (check_func or _local_check_func())(unique_urls, on_result=_checkpoint, details=details),
+        [leases[uid] for uid in active if leases and uid in leases],
+    )
+    if results is None:
+        return {}
+    if shutdown_event.is_set():
+        log("🛑 Перевірку перервано зупинкою бота - результати збережено")
+        return {}
+
+    user_results: dict[str, dict[str, str]] = {uid: {} for uid in active}
+    user_details: dict[str, dict[str, dict]] = {uid: {} for uid in active}
+    for key, subs in subscribers.items():
+        for uid, title in subs:
+            user_results[uid][title] = results.get(key, "невідомо")
+            if key in details:
+                user_details[uid][title] = details[key]
+
+    reports = {}
+    for uid in active:
+        try:
+            lease = leases.get(uid) if leases else None
+            reports[uid] = await _apply_results(
+                repos[uid], datas[uid], user_results[uid], lease, checked_at, user_details[uid]
+            )
+            # Таймінги спільного проходу - в записі перевірки кожного користувача
+            await _finish_run(repos[uid], run_ids.get(uid), timings, lease)
+        except Exception as e:
+            log(f"  ❌ Не вдалось зберегти результати для {uid}: {e}")
+
     elapsed = time.monotonic() - _start
-    log(f"⏱ Перевірка завершена за {elapsed:.1f} сек")
-    return "\n".join(report_lines)
\ No newline at end of file
+    metrics.CHECK_DURATION.observe(elapsed, kind="many")
+    log(
+        f"⏱ Перевірка {len(datas)} користувачів завершена за {elapsed:.1f} сек",
+        extra={"phase": "check", "duration": round(elapsed, 2)},
+    )
+    return reports
@@ -0,0 +1,130 @@
+"""
+Регулятор паралельності браузера за тиском пам'яті.
+
+Поки йде браузерна перевірка, регулятор кожні GOVERNOR_INTERVAL секунд міряє
+RAM процесу разом з Chromium і змінює кількість одночасних вкладок:
+  нижче MEMORY_SOFT_PERCENT - 10%  ліміт росте на 1 до MAX_CONCURRENT_PAGES
+  між м'якою і жорсткою межею       ліміт зменшується на 1 (не нижче 1)
+  вище MEMORY_HARD_PERCENT          нові вкладки не відкриваються, поки
+                                    відкриті не закриються; якщо пам'ять не
+                                    звільнилась і вкладок немає - контекст
+                                    браузера перезапускається (recycle),
+                                    далі перевірка йде по одній вкладці
+Так перевірка завершується з найбільшою паралельністю, яку витримує контейнер,
+замість OOM kill на MEMORY_LIMIT_MB.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+from core import metrics
+from core.logger import get_logger
+from core.sampler import total_ram_mb
+
+log = get_logger("governor").info
+
+MEMORY_LIMIT_MB = int(os.getenv("MEMORY_LIMIT_MB", "512"))
+MEMORY_SOFT_PERCENT = float(os.getenv("MEMORY_SOFT_PERCENT", "75"))
+MEMORY_HARD_PERCENT = float(os.getenv("MEMORY_HARD_PERCENT", "90"))
+GOVERNOR_INTERVAL = float(os.getenv("GOVERNOR_INTERVAL", "2"))
+# false - фіксована паралельність MAX_CONCURRENT_PAGES як раніше
+MEMORY_GOVERNOR = os.getenv("MEMORY_GOVERNOR", "true").lower() == "true"
+
+PAGE_LIMIT = metrics.Gauge("manga_browser_page_limit", "Поточний ліміт одночасних вкладок (регулятор пам'яті)")
+
+
+class PageGovernor:
+    """Замінник asyncio.Semaphore для вкладок браузера зі змінним лімітом.
+
+    async with governor: ... - одна вкладка. recycle - корутина перезапуску
+    контексту браузера, встановлюється батчем на час свого життя."""
+
+    def __init__(self, max_pages: int, limit_mb: float = MEMORY_LIMIT_MB,
+                 soft_percent: float = MEMORY_SOFT_PERCENT, hard_percent: float = MEMORY_HARD_PERCENT,
+                 interval: float = GOVERNOR_INTERVAL, measure: Callable[[], float] = total_ram_mb):
+        self.max_pages = max_pages
+        self.limit = max_pages
+        self.active = 0
+        # Вкладки відкриті за весь час і на момент останнього перезапуску контексту
+        self.opened = 0
+        self._opened_at_recycle = 0
+        self.limit_mb = limit_mb
+        self.soft = soft_percent / 100
+        self.hard = hard_percent / 100
+        self.interval = interval
+        self.measure = measure
+        self.recycle: Callable[[], Awaitable[None]] | None = None
+        self._changed = asyncio.Condition()
+        self._task: asyncio.Task | None = None
+        PAGE_LIMIT.set(self.limit)
+
+    async def __aenter__(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            self.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
+
+    async def _set_limit(self, limit: int, ram_mb: float) -> None:
+        if limit == self.limit:
+            return
+        action = "пауза нових вкладок" if limit == 0 else f"вкладок {self.limit} -> {limit}"
+        log(f"  🧠 Пам'ять {ram_mb:.0f}/{self.limit_mb} MB: {action}")
+        async with self._changed:
+            self.limit = limit
+            self._changed.notify_all()
+        PAGE_LIMIT.set(limit)
+
+    async def adjust(self, ram_mb: float) -> None:
+        usage = ram_mb / self.limit_mb
+        if usage >= self.hard:
+            if self.active > 0:
+                # Відкриті вкладки закриються і звільнять пам'ять
+                await self._set_limit(0, ram_mb)
+                return
+            # Повторний перезапуск без нових вкладок пам'ять не звільнить
+            if self.recycle is not None and self.limit <= 1 and self.opened > self._opened_at_recycle:
+                # Пауза до перезапуску - жодна вкладка не відкриється в старому контексті
+                await self._set_limit(0, ram_mb)
+                if self.active > 0:
+                    return
+                log(f"  ♻️ Пам'ять {ram_mb:.0f}/{self.limit_mb} MB без відкритих вкладок - перезапуск контексту браузера")
+                self._opened_at_recycle = self.opened
+                try:
+                    await self.recycle()
+                except Exception as e:
+                    log(f"  ⚠️ Перезапуск контексту не вдався: {e}")
+            # Мінімум одна вкладка - перевірка має завершитись навіть під тиском
+            await self._set_limit(1, ram_mb)
+        elif usage >= self.soft:
+            await self._set_limit(max(1, self.limit - 1), ram_mb)
+        elif usage < self.soft - 0.1:
+            await self._set_limit(min(self.max_pages, self.limit + 1), ram_mb)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                ram_mb = await asyncio.to_thread(self.measure)
+            except Exception as e:
+                log(f"  ⚠️ Регулятор пам'яті: помилка заміру: {e}")
+                continue
+            await self.adjust(ram_mb)
+
+    def start(self) -> None:
+        if MEMORY_GOVERNOR and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
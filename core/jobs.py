@@ -0,0 +1,205 @@
+"""
+Черга перевірок в MongoDB для окремих процесів-воркерів (worker.py).
+
+Бот тільки ставить задачу і чекає результат, браузерну роботу виконують воркери
+на будь-якій кількості машин.
+
+Колекція jobs:
+  {"_id": ObjectId, "status": "queued" | "running" | "done" | "failed",
+   "manga": [{"title": "...", "url": "..."}],
+   "results": [{"title": "...", "chapter": "199", "method": "api", "latency": 0.4}],
+   "worker": "host:pid", "lease_expires": datetime, "attempts": 1,
+   "timings": [...],  # гістограми фаз перевірки воркера (core.timing)
+   "created_at": datetime, "finished_at": datetime, "error": "..."}
+
+Воркер забирає задачу атомарним find_one_and_update і продовжує оренду (lease)
+heartbeat'ом. Якщо воркер впав - оренда закінчується і задачу забирає інший воркер,
+перевіряючи тільки манги без результату.
+"""
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from core import timing
+from core.logger import get_logger
+from core.repository import get_mongo_client
+
+log = get_logger("jobs").info
+
+CHECK_WORKERS = os.getenv("CHECK_WORKERS", "false").lower() == "true"
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "3600"))
+# Скільки зберігати завершені задачі (TTL індекс)
+JOB_RETENTION_SECONDS = 24 * 3600
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+
+    def __init__(self, collection, lease_seconds: int = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.col = collection
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+
+    async def setup(self) -> None:
+        await self.col.create_index([("status", 1), ("created_at", 1)])
+        await self.col.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+    # Сторона бота
+
+    async def enqueue(self, manga: dict[str, str]):
+        result = await self.col.insert_one({
+            "status": "queued",
+            "manga": [{"title": title, "url": url} for title, url in manga.items()],
+            "results": [],
+            "attempts": 0,
+            "created_at": _now(),
+        })
+        return result.inserted_id
+
+    async def wait(self, job_id, timeout: float = JOB_TIMEOUT, poll_interval: float = 2.0,
+                   on_result=None, details: dict | None = None) -> dict:
+        """Чекає завершення задачі. Після таймауту повертає те що встигли перевірити.
+        on_result(title, глава) викликається для кожного нового результату воркера,
+        details заповнюється як в check_all."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        seen = 0
+        while True:
+            job = await self.col.find_one({"_id": job_id})
+            for r in (job or {}).get("results", [])[seen:]:
+                if details is not None and "method" in r:
+                    details[r["title"]] = {"method": r["method"], "latency": r.get("latency")}
+                if on_result is not None:
+                    await on_result(r["title"], r["chapter"])
+            if job is not None:
+                seen = len(job.get("results", []))
+            if job is None or job["status"] in ("done", "failed"):
+                return job or {}
+            if asyncio.get_running_loop().time() > deadline:
+                log(f"⚠️ Задача {job_id} не завершилась за {timeout} сек")
+                # Ще не взята жодним воркером - знімаємо, результат вже нікому не потрібен
+                await self.col.update_one(
+                    {"_id": job_id, "status": "queued"},
+                    {"$set": {"status": "failed", "finished_at": _now(), "error": "таймаут очікування"}},
+                )
+                return job
+            await asyncio.sleep(poll_interval)
+
+    # Сторона воркера
+
+    async def claim(self, worker: str) -> dict | None:
+        """Атомарно забирає найстарішу вільну задачу або задачу з простроченою орендою."""
+        now = _now()
+        return await self.col.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "lease_expires": {"$lt": now}},
+                ],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {"status": "running", "worker": worker, "lease_expires": now + self.lease},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def heartbeat(self, job_id, worker: str) -> bool:
+        """Продовжує оренду. False - задачу вже забрав інший воркер."""
+        result = await self.col.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$set": {"lease_expires": _now() + self.lease}},
+        )
+        return result.matched_count == 1
+
+    async def add_results(self, job_id, worker: str, results: dict[str, str], details: dict | None = None) -> bool:
+        """details - {title: {"method", "latency"}} з check_all, зберігаються разом з результатом."""
+        if not results:
+            return True
+        details = details or {}
+        result = await self.col.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$push": {"results": {"$each": [
+                {"title": title, "chapter": chapter, **details.get(title, {})} for title, chapter in results.items()
+            ]}}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id, worker: str, timings: list[dict] | None = None) -> bool:
+        update = {"status": "done", "finished_at": _now()}
+        if timings is not None:
+            update["timings"] = timings
+        result = await self.col.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$set": update},
+        )
+        return result.matched_count == 1
+
+    async def release(self, job_id, worker: str) -> None:
+        """Повертає задачу в чергу (зупинка воркера) - її одразу забере інший воркер."""
+        await self.col.update_one(
+            {"_id": job_id, "worker": worker, "status": "running"},
+            {"$set": {"status": "queued"}, "$inc": {"attempts": -1}},
+        )
+
+    async def cancel(self, job_id) -> None:
+        """Знімає задачу (бот перестав чекати результат) - воркер побачить це heartbeat'ом і зупиниться."""
+        await self.col.update_one(
+            {"_id": job_id, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"status": "failed", "finished_at": _now(), "error": "скасовано"}},
+        )
+
+    async def fail_exhausted(self) -> int:
+        """Позначає failed задачі з простроченою орендою після всіх спроб."""
+        now = _now()
+        result = await self.col.update_many(
+            {"status": "running", "lease_expires": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "finished_at": now, "error": "вичерпано спроби"}},
+        )
+        return result.modified_count
+
+
+def get_job_queue() -> JobQueue:
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        raise ValueError("MONGODB_URI не вказано в .env")
+    db = get_mongo_client(uri)[os.getenv("MONGODB_DB", "Manga")]
+    return JobQueue(db[os.getenv("JOBS_COLLECTION", "jobs")])
+
+
+async def remote_check_all(queue: JobQueue, manga_dict: dict, on_result=None, details: dict | None = None) -> dict[str, str]:
+    """Замінник check_all для бота - ставить задачу воркерам і чекає результат.
+    Таймінги фаз воркера додаються до збору бота (core.timing)."""
+    job_id = await queue.enqueue(manga_dict)
+    log(f"📤 Задача {job_id}: {len(manga_dict)} манг передано воркерам")
+    try:
+        job = await queue.wait(job_id, on_result=on_result, details=details)
+    except asyncio.CancelledError:
+        # Перевірку скасовано (втрачено блокування) - воркери не мають продовжувати її
+        try:
+            await queue.cancel(job_id)
+            log(f"🛑 Задача {job_id} скасована")
+        except Exception as e:
+            log(f"⚠️ Задачу {job_id} не вдалось скасувати: {e}")
+        raise
+    timings = timing.current()
+    if timings is not None:
+        timings.merge(job.get("timings"))
+    results = {title: "невідомо" for title in manga_dict}
+    results.update({r["title"]: r["chapter"] for r in job.get("results", [])})
+    if job.get("status") != "done":
+        log(f"⚠️ Задача {job_id}: статус {job.get('status')}, результати часткові")
+    return results
@@ -0,0 +1,155 @@
+"""
+Пошук витоків пам'яті між перевірками (LEAK_WATCH=true).
+
+До і після кожної перевірки (run_check / run_check_many) знімається
+tracemalloc snapshot і кількість об'єктів кожного типу (gc.get_objects).
+Стан після перевірки зберігається для останніх LEAK_WATCH_RUNS перевірок:
+  місця виділення - LEAK_TOP_SITES найбільших (файл:рядок -> байти)
+  типи об'єктів   - LEAK_TOP_TYPES найчисленніших (тип -> кількість)
+Підозра на витік - місце або тип, що зростали після КОЖНОЇ з останніх
+перевірок (монотонно) і сумарно більше за поріг. Кеші, які заповнюються
+на першій перевірці і далі стоять, під це не потрапляють.
+Підозри пишуться в лог після перевірки і показуються в /stats -> «🧪 Витоки».
+
+Перевірки, що йдуть одночасно, вимірюються разом - знімки робляться на
+початку першої і в кінці останньої.
+"""
+import asyncio
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
+from collections import Counter, deque
+
+from core.logger import get_logger
+from core.profiler import short_path
+
+log = get_logger("leakwatch").info
+
+LEAK_WATCH = os.getenv("LEAK_WATCH", "false").lower() == "true"
+LEAK_WATCH_RUNS = int(os.getenv("LEAK_WATCH_RUNS", "5"))
+LEAK_TRACE_FRAMES = int(os.getenv("LEAK_TRACE_FRAMES", "1"))
+LEAK_TOP_SITES = 500
+LEAK_TOP_TYPES = 200
+# Мінімальне сумарне зростання за останні перевірки, щоб вважати витоком
+LEAK_MIN_BYTES = 64 * 1024
+LEAK_MIN_OBJECTS = 200
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+# Стани після перевірок, старі першими:
+# {"at", "traced_mb", "sites": {місце: байти}, "types": {тип: кількість},
+#  "site_diff": [(місце, байти)], "type_diff": [(тип, кількість)]}
+_RUNS: deque[dict] = deque(maxlen=max(2, LEAK_WATCH_RUNS))
+_active = 0
+_before: dict | None = None
+
+
+def _type_name(cls: type) -> str:
+    module = getattr(cls, "__module__", "") or ""
+    return cls.__qualname__ if module == "builtins" else f"{module}.{cls.__qualname__}"
+
+
+def _measure() -> dict | None:
+    """Знімок пам'яті і типів. Блокує на десятки мс - викликається через asyncio.to_thread.
+    None - tracemalloc щойно (пере)запущено, порівнювати ще нема з чим."""
+    if not tracemalloc.is_tracing():
+        # Вимкнено профілем /profile, який його запускав - починаємо заново
+        tracemalloc.start(LEAK_TRACE_FRAMES)
+        _RUNS.clear()
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    sites = {}
+    for stat in snapshot.statistics("lineno")[:LEAK_TOP_SITES]:
+        frame = stat.traceback[0]
+        sites[f"{short_path(frame.filename)}:{frame.lineno}"] = stat.size
+    types = Counter(map(type, gc.get_objects()))
+    return {
+        "at": time.time(),
+        "traced_mb": tracemalloc.get_traced_memory()[0] / 1024 / 1024,
+        "sites": sites,
+        "types": {_type_name(cls): count for cls, count in types.most_common(LEAK_TOP_TYPES)},
+    }
+
+
+def _diff(after: dict[str, float], before: dict[str, float], limit: int = 10) -> list[tuple[str, float]]:
+    growth = ((key, value - before.get(key, 0)) for key, value in after.items())
+    return sorted((item for item in growth if item[1] > 0), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def _monotonic(field: str, minimum: float) -> list[tuple[str, float]]:
+    """[(ключ, сумарне зростання)] - зростало після кожної з останніх перевірок."""
+    runs = list(_RUNS)
+    if len(runs) < 3:
+        return []
+    suspects = []
+    for key, last in runs[-1][field].items():
+        values = [run[field].get(key, 0) for run in runs]
+        if all(a < b for a, b in zip(values, values[1:])) and last - values[0] >= minimum:
+            suspects.append((key, last - values[0]))
+    return sorted(suspects, key=lambda item: item[1], reverse=True)
+
+
+def suspects() -> dict[str, list[tuple[str, float]]]:
+    return {
+        "sites": _monotonic("sites", LEAK_MIN_BYTES),
+        "types": _monotonic("types", LEAK_MIN_OBJECTS),
+    }
+
+
+def runs() -> list[dict]:
+    return list(_RUNS)
+
+
+def _record(before: dict | None, after: dict | None) -> None:
+    if after is None:
+        log("🧪 Витоки: tracemalloc запущено, порівняння з наступної перевірки")
+        return
+    if before is not None:
+        after["site_diff"] = _diff(after["sites"], before["sites"])
+        after["type_diff"] = _diff(after["types"], before["types"])
+        growth = after["traced_mb"] - before["traced_mb"]
+    else:
+        after["site_diff"], after["type_diff"], growth = [], [], 0.0
+    _RUNS.append(after)
+    log(f"🧪 Пам'ять Python після перевірки: {after['traced_mb']:.1f} MB ({growth:+.1f} MB за перевірку)")
+    found = suspects()
+    for site, size in found["sites"][:5]:
+        log(f"  🧪 Можливий витік: {site} зростає після кожної з {len(_RUNS)} останніх перевірок, +{size / 1024:.0f} KB")
+    for name, count in found["types"][:5]:
+        log(f"  🧪 Можливий витік: об'єктів {name} більшає після кожної з {len(_RUNS)} останніх перевірок, +{count}")
+
+
+@contextlib.asynccontextmanager
+async def watching():
+    """Обгортка перевірки. Без LEAK_WATCH нічого не робить."""
+    global _active, _before
+    if not LEAK_WATCH:
+        yield
+        return
+    _active += 1
+    try:
+        if _active == 1:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(LEAK_TRACE_FRAMES)
+            try:
+                _before = await asyncio.to_thread(_measure)
+            except Exception as e:
+                log(f"⚠️ Витоки: помилка знімку до перевірки: {e}")
+                _before = None
+        yield
+    finally:
+        _active -= 1
+        if _active == 0:
+            try:
+                _record(_before, await asyncio.to_thread(_measure))
+            except Exception as e:
+                log(f"⚠️ Витоки: помилка знімку після перевірки: {e}")
+            _before = None
@@ -1,26 +1,260 @@
 """
 Централізоване логування для всього проекту.
 Імпортуй get_logger в будь-якому файлі замість print().
+
+Запис у лог не блокує цикл подій: обробник логера "manga" тільки кладе запис
+в чергу (QueueHandler), форматування і запис в stdout виконує окремий потік
+(QueueListener). Повна черга (LOG_QUEUE_SIZE) відкидає нові записи і рахує їх,
+замість того щоб чекати повільний stdout контейнера.
+
+  LOG_FORMAT=text|json  - рядок "час повідомлення" або JSON з полями запису
+  LOG_LEVEL=DEBUG       - рівень логера "manga"
+  LOG_LEVELS=parser=WARNING,sampler=ERROR - рівні окремих логерів
+  LOG_RATE_LIMIT=20     - однакових повідомлень нижче WARNING (цифри не враховуються) за
+                          LOG_RATE_WINDOW секунд, решта пропускається; після вікна -
+                          підсумок "повторено ще N разів"
+
+Аргументи в гарячих місцях - %-стилем: log("✅ %s: %s", title, result). Тоді рядок
+форматує потік запису, а повідомлення вимкненого рівня (LOG_LEVELS) нічого не коштує.
+
+Структуровані поля для JSON: extra={"phase": ..., "duration": ...} у виклику
+або bind(title=..., domain=...) - діють на всі записи поточної задачі asyncio.
 """
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import re
 import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(_BASE_DIR, ".env"))
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_WINDOW = float(os.getenv("LOG_RATE_WINDOW", "60"))
+
+# Поля, що потрапляють в JSON з extra= або bind()
+FIELDS = ("title", "domain", "phase", "duration", "user_id")
+
+_CONTEXT: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+
+
+def bind(**fields) -> None:
+    """Додає поля до всіх записів поточної задачі (і задач, створених з неї)."""
+    _CONTEXT.set({**_CONTEXT.get(), **fields})
+
+
+class _JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _RateLimit(logging.Filter):
+    """Пропускає не більше limit однакових повідомлень за window секунд.
+    WARNING і вище проходять завжди. Підсумок "повторено ще N разів" пише потік
+    _sweep, коли вікно закінчилось, - навіть якщо повідомлення більше не з'являлось."""
+
+    _DIGITS = re.compile(r"\d+")
+
+    def __init__(self, limit: int, window: float, report):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # report(record) - запис підсумку в обхід фільтрів (в чергу логера)
+        self._report = report
+        # {(логер, шаблон): [початок вікна, записів, пропущено, останній пропущений запис]}
+        self._seen: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="log-rate-limit", daemon=True).start()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, self._DIGITS.sub("#", str(record.msg)), *map(self._arg_key, self._args(record)))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] > self.window:
+                if state is not None:
+                    self._summary(state)
+                self._seen[key] = [now, 1, 0, None]
+                return True
+            state[1] += 1
+            if state[1] <= self.limit:
+                return True
+            state[2] += 1
+            state[3] = record
+            return False
+
+    @staticmethod
+    def _args(record: logging.LogRecord) -> tuple:
+        if isinstance(record.args, tuple):
+            return record.args
+        return () if record.args is None else (record.args,)
+
+    def _arg_key(self, arg) -> str:
+        # Без форматування аргументів у потоці, що логує: рядки (назви) розрізняються,
+        # числа і решта об'єктів (помилки, списки) - тільки за типом
+        if isinstance(arg, str):
+            return self._DIGITS.sub("#", arg)
+        if isinstance(arg, (int, float)):
+            return "#"
+        return type(arg).__name__
+
+    def _summary(self, state: list) -> None:
+        skipped, record = state[2], state[3]
+        if not skipped:
+            return
+        summary = logging.makeLogRecord(record.__dict__)
+        summary.msg = f"{record.getMessage()} (повторено ще {skipped} разів за {self.window:g} с)"
+        summary.args = None
+        self._report(summary)
+
+    def sweep(self, force: bool = False) -> None:
+        """Пише підсумки і забуває повідомлення, вікно яких закінчилось."""
+        now = time.monotonic()
+        with self._lock:
+            for key, state in list(self._seen.items()):
+                if force or now - state[0] > self.window:
+                    self._summary(state)
+                    del self._seen[key]
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(max(1.0, self.window / 2))
+            self.sweep()
+
+
+class _ContextFilter(logging.Filter):
+    """Поля bind() - в записі, поки він ще в потоці задачі, що логує."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field, value in _CONTEXT.get().items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Форматування в потоці слухача; при повній черзі запис відкидається."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Черга в межах процесу - запис з аргументами передається як є,
+        # getMessage() і форматування виконуються в потоці слухача
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _QueueHandler.dropped += 1
+
+
+class _DropReporter(logging.Handler):
+    """Після відкинутих записів пише в stdout, скільки їх було."""
+
+    def __init__(self, target: logging.Handler):
+        super().__init__()
+        self.target = target
+        self._reported = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        dropped = _QueueHandler.dropped
+        if dropped > self._reported:
+            notice = logging.makeLogRecord({
+                "name": record.name, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"⚠️ Черга логів переповнена - відкинуто {dropped - self._reported} записів",
+            })
+            self._reported = dropped
+            self.target.handle(notice)
+        self.target.handle(record)
+
+
+def _apply_levels(spec: str) -> None:
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level:
+            logging.getLogger(f"manga.{name.strip()}").setLevel(level.strip().upper())
+
+
+_listener: logging.handlers.QueueListener | None = None
+_rate_limit: _RateLimit | None = None
+
 
 def _setup_logger() -> logging.Logger:
+    global _listener, _rate_limit
     logger = logging.getLogger("manga")
 
     if logger.handlers:
         return logger
 
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(LOG_LEVEL)
+    _apply_levels(LOG_LEVELS)
+
+    stream = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream.setFormatter(_JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
 
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setFormatter(logging.Formatter("%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
-    logger.addHandler(ch)
+    records: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = _QueueHandler(records)
+    handler.addFilter(_ContextFilter())
+    if LOG_RATE_LIMIT > 0:
+        _rate_limit = _RateLimit(LOG_RATE_LIMIT, LOG_RATE_WINDOW, handler.enqueue)
+        handler.addFilter(_rate_limit)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, _DropReporter(stream))
+    _listener.start()
+    atexit.register(flush)
 
     return logger
 
+
+_flush_lock = threading.Lock()
+
+
+def flush() -> None:
+    """Дописує чергу в stdout і зупиняє потік запису (при завершенні процесу)."""
+    global _listener
+    with _flush_lock:
+        if _rate_limit is not None:
+            _rate_limit.sweep(force=True)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
 logger = _setup_logger()
 
 
 def get_logger(name: str = "manga") -> logging.Logger:
-    return logging.getLogger(f"manga.{name}") if name != "manga" else logger
\ No newline at end of file
+    return logging.getLogger(f"manga.{name}") if name != "manga" else logger
@@ -0,0 +1,180 @@
+"""
+Лаг циклу подій, повільні колбеки і час обробників Telegram.
+
+Пульс у циклі подій прокидається кожні SLOW_CALLBACK_MS / 2 мс і записує,
+на скільки пізніше запланованого прокинувся (лаг). Сторожовий потік перевіряє
+пульс: якщо цикл не прокидався довше SLOW_CALLBACK_MS, значить якийсь колбек
+блокує цикл - потік знімає стек потоку циклу (sys._current_frames) в цей момент.
+Коли цикл відпускає, блокування записується під місцем зі стеку:
+  bot.py:850 _get_stats_process -> psutil/_pslinux.py:1800 memory_info
+
+Обробники Telegram обгортаються instrument(app) - час кожного виклику
+йде в гістограму за назвою обробника. /stats -> «🐢 Повільне» показує
+найгірші місця блокування і найповільніші обробники.
+"""
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import traceback
+
+from core import metrics
+from core.logger import get_logger
+from core.timing import Histogram
+
+log = get_logger("loopwatch").info
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Блокування циклу довше цього порогу записується зі стеком (мілісекунди)
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", "200"))
+LOOP_WATCH = os.getenv("LOOP_WATCH", "true").lower() == "true"
+# Кадрів стеку в одному знімку і різних місць блокування, що зберігаються
+STACK_DEPTH = 8
+STALL_KEEP = 50
+
+LOOP_LAG = metrics.Histogram(
+    "manga_loop_lag_seconds", "Запізнення пульсу циклу подій",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_STALLS = metrics.Counter("manga_loop_stalls_total", "Блокування циклу подій довше SLOW_CALLBACK_MS")
+HANDLER_CALLBACK = metrics.Histogram("manga_handler_callback_seconds", "Час обробників Telegram", ("handler",))
+
+
+def _frame_label(entry: traceback.FrameSummary) -> str:
+    path = entry.filename
+    if path.startswith(_BASE_DIR) and "site-packages" not in path:
+        path = os.path.relpath(path, _BASE_DIR)
+    else:
+        # Бібліотеки: пакет/файл - повний шлях до site-packages нічого не додає
+        path = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{path}:{entry.lineno} {entry.name}"
+
+
+def _is_own(entry: traceback.FrameSummary) -> bool:
+    return entry.filename.startswith(_BASE_DIR) and "site-packages" not in entry.filename
+
+
+def _location(stack: list[traceback.FrameSummary]) -> str:
+    """Найглибший кадр проекту і найглибший кадр взагалі (якщо це бібліотека)."""
+    own = next((entry for entry in reversed(stack) if _is_own(entry)), None)
+    inner = stack[-1]
+    if own is None:
+        return _frame_label(inner)
+    if own is inner:
+        return _frame_label(own)
+    return f"{_frame_label(own)} -> {_frame_label(inner)}"
+
+
+class LoopWatch:
+
+    def __init__(self, threshold_ms: float = SLOW_CALLBACK_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 2
+        self.lag = Histogram()
+        # {місце: {"count", "total", "max", "stack"}}
+        self.stalls: dict[str, dict] = {}
+        self.handlers: dict[str, Histogram] = {}
+        self._beat = time.monotonic()
+        # Знімок стеку від сторожового потоку, забирається пульсом після блокування
+        self._sample: list[traceback.FrameSummary] | None = None
+        self._loop_thread: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # Лаг і блокування
+
+    def _watch(self) -> None:
+        """Сторожовий потік - працює, коли цикл подій заблокований."""
+        while not self._stop.wait(self.interval):
+            if self._sample is not None or time.monotonic() - self._beat <= self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._sample = traceback.extract_stack(frame)[-STACK_DEPTH:]
+            del frame
+
+    def _record(self, stack: list[traceback.FrameSummary], seconds: float) -> None:
+        location = _location(stack)
+        stall = self.stalls.get(location)
+        if stall is None:
+            if len(self.stalls) >= STALL_KEEP:
+                del self.stalls[min(self.stalls, key=lambda key: self.stalls[key]["total"])]
+            stall = self.stalls[location] = {"count": 0, "total": 0.0, "max": 0.0, "stack": []}
+        stall["count"] += 1
+        stall["total"] += seconds
+        stall["max"] = max(stall["max"], seconds)
+        stall["stack"] = [_frame_label(entry) for entry in stack]
+        LOOP_STALLS.inc()
+        log(f"🐢 Цикл подій заблоковано на {seconds * 1000:.0f} мс: {location}")
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loopwatch", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - expected)
+                self._beat = time.monotonic()
+                self.lag.observe(lag)
+                LOOP_LAG.observe(lag)
+                stack, self._sample = self._sample, None
+                if stack is not None and lag >= self.threshold:
+                    self._record(stack, lag)
+        finally:
+            self._stop.set()
+
+    # Обробники
+
+    def observe_handler(self, name: str, seconds: float) -> None:
+        if name not in self.handlers:
+            self.handlers[name] = Histogram()
+        self.handlers[name].observe(seconds)
+        HANDLER_CALLBACK.observe(seconds, handler=name)
+
+    def timed(self, func, name: str | None = None):
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.observe_handler(name, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, app) -> int:
+        """Обгортає колбеки всіх обробників Application, включно зі станами діалогів."""
+        count = 0
+
+        def wrap(handler) -> None:
+            nonlocal count
+            nested = getattr(handler, "entry_points", None)
+            if nested is not None:
+                for inner in (*nested, *handler.fallbacks, *(h for hs in handler.states.values() for h in hs)):
+                    wrap(inner)
+                return
+            if asyncio.iscoroutinefunction(handler.callback):
+                handler.callback = self.timed(handler.callback)
+                count += 1
+
+        for handlers in app.handlers.values():
+            for handler in handlers:
+                wrap(handler)
+        return count
+
+    # Звіт
+
+    def worst_stalls(self, limit: int = 5) -> list[tuple[str, dict]]:
+        return sorted(self.stalls.items(), key=lambda item: item[1]["total"], reverse=True)[:limit]
+
+    def slowest_handlers(self, limit: int = 5) -> list[tuple[str, Histogram]]:
+        return sorted(self.handlers.items(), key=lambda item: item[1].quantile(0.95), reverse=True)[:limit]
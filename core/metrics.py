@@ -0,0 +1,257 @@
+"""
+Метрики у текстовому форматі Prometheus (/metrics).
+
+Лічильники і гістограми в пам'яті процесу - запис метрики це кілька операцій
+над словником без блокувань (все виконується в одному циклі подій).
+HTTP сервер метрик запускається в циклі подій бота, якщо задано METRICS_PORT.
+Без METRICS_PORT метрики все одно рахуються, але ніде не віддаються,
+а репозиторії і обробники Telegram не обгортаються вимірюванням.
+
+Приклад scrape конфігурації:
+  - job_name: manga-bot
+    static_configs: [{targets: ["bot:9100"]}]
+"""
+import asyncio
+import functools
+import inspect
+import os
+import time
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from core.logger import get_logger
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(_BASE_DIR, ".env"))
+
+log = get_logger("metrics").info
+
+# Порт HTTP сервера метрик (0 - вимкнено)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+ENABLED = METRICS_PORT > 0
+
+# Межі кошиків за замовчуванням в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # {labels: [кошики..., сума, кількість]}
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state[-1]}")
+        return lines
+
+
+class _Timer:
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+
+REGISTRY: list[_Metric] = []
+# Функції, що оновлюють метрики перед кожним scrape (виконуються в потоці)
+_COLLECTORS: list[Callable[[], None]] = []
+
+
+def register_collector(func: Callable[[], None]) -> None:
+    _COLLECTORS.append(func)
+
+
+# Метрики бота і перевірки
+
+CHECK_DURATION = Histogram(
+    "manga_check_duration_seconds", "Тривалість перевірки (run_check / run_check_many)", ("kind",),
+)
+CHECK_PHASE = Histogram(
+    "manga_check_phase_seconds", "Тривалість фаз перевірки манги (core.timing)", ("domain", "phase"),
+)
+TITLE_CHECKS = Counter(
+    "manga_title_checks_total", "Перевірки манг за доменом, способом і результатом", ("domain", "method", "result"),
+)
+PAGES_OPENED = Counter("manga_browser_pages_total", "Відкриті вкладки браузера", ("domain",))
+PAGES_REUSED = Counter("manga_browser_pages_reused_total", "Манги, перевірені вкладкою з пулу", ("domain",))
+BROWSER_LAUNCHES = Counter("manga_browser_launches_total", "Запуски Chromium")
+FETCHED_BYTES = Counter(
+    "manga_fetched_bytes_total", "Завантажені байти (браузер - за Content-Length)", ("domain", "method"),
+)
+CACHE_REQUESTS = Counter("manga_cache_requests_total", "Звернення до кешів бота", ("cache", "result"))
+DB_OPERATION = Histogram("manga_db_operation_seconds", "Тривалість операцій репозиторію", ("op",))
+HANDLER_LATENCY = Histogram("manga_handler_seconds", "Обробка оновлень Telegram", ("update_type",))
+RAM_BYTES = Gauge("manga_ram_bytes", "Пам'ять: process - процес бота, total - разом з Chromium", ("scope",))
+
+
+def collect() -> None:
+    for collector in _COLLECTORS:
+        try:
+            collector()
+        except Exception as e:
+            log(f"⚠️ Метрики: помилка збору {getattr(collector, '__name__', collector)}: {e}")
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# Репозиторій
+
+class _TimedRepository:
+    """Проксі репозиторію, що вимірює кожен async метод в DB_OPERATION."""
+
+    def __init__(self, repo):
+        self._repo = repo
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._repo, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await attr(*args, **kwargs)
+            finally:
+                DB_OPERATION.observe(time.perf_counter() - start, op=name)
+
+        # Обгортка кешується в проксі - наступні звернення без __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+def timed_repository(repo):
+    return _TimedRepository(repo) if ENABLED else repo
+
+
+# HTTP сервер
+
+async def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Запускає /metrics в поточному циклі подій, повертає AppRunner для зупинки."""
+    from aiohttp import web
+
+    async def handle(request):
+        # Колектори можуть ходити по дереву процесів (psutil) - не в циклі подій.
+        # Сам текст формується в циклі, де метрики змінюються
+        await asyncio.to_thread(collect)
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
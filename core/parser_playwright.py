@@ -1,14 +1,20 @@
 import asyncio
 import re
-import json
 import os
 import functools
+import logging
+import time
+from typing import Awaitable, Callable
 
 import aiohttp
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright, BrowserContext, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
+from core import browser_cache, metrics, recorder, timing
+from core.governor import PageGovernor
+from core.shutdown import shutdown_event
 from core.logger import get_logger
+from core.parsing import parse, comx_chapter, honeymanga_chapter, zenko_chapter, mangainua_hash, mangainua_chapter
 
 _BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(_BASE_DIR, ".env"))
@@ -18,8 +24,13 @@ MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT_PAGES", "10"))
 MAX_CONCURRENT_API = int(os.getenv("MAX_CONCURRENT_API", "5"))
 PAGE_TIMEOUT = int(os.getenv("PAGE_TIMEOUT", "120"))
 BROWSER_BATCH_SIZE = int(os.getenv("BROWSER_BATCH_SIZE", "10"))
+# Скільки манг перевіряє одна вкладка до закриття (1 - нова вкладка на кожну мангу)
+PAGE_MAX_USES = int(os.getenv("PAGE_MAX_USES", "20"))
+# Вкладка закривається, якщо JS heap після скидання виріс на стільки MB від першого використання
+PAGE_RECYCLE_MB = float(os.getenv("PAGE_RECYCLE_MB", "100"))
 
-log = get_logger("parser").info
+_logger = get_logger("parser")
+log = _logger.info
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
@@ -33,6 +44,13 @@ MANGAINUA_HEADERS = {
     "Accept-Language": "uk-UA,uk;q=0.9",
 }
 
+# Адреси API - константи модуля, бенчмарк (benchmarks/standin.py) підставляє локальний сервер
+HONEYMANGA_API_URL = "https://data.api.honey-manga.com.ua/v2/chapter/cursor-list"
+ZENKO_API_URL = "https://api.zenko.online"
+MANGAINUA_AJAX_URL = "https://manga.in.ua/engine/ajax/controller.php"
+# Записуються разом з перевіркою (core.recorder) - відтворення використовує ті самі адреси
+RECORDED_API_URLS = ("HONEYMANGA_API_URL", "ZENKO_API_URL", "MANGAINUA_AJAX_URL")
+
 BLOCKED_RESOURCES = {"image", "media", "font", "stylesheet", "manifest", "other"}
 
 BLOCKED_DOMAINS = {
@@ -57,9 +75,11 @@ BLOCKED_DOMAINS = {
 
 SITE_PARSERS = {}
 
+# Викликається для кожної манги як тільки її результат готовий (чекпоінти перевірки)
+ResultCallback = Callable[[str, str], Awaitable[None]]
+
 API_DOMAINS = {"honey-manga.com.ua", "zenko.online", "manga.in.ua"}
 
-_shutdown_event = asyncio.Event()
 
 
 def register_parser(domain: str):
@@ -84,6 +104,18 @@ def _find_last_chapter(text: str) -> float | None:
     return None
 
 
+async def _notify(on_result: ResultCallback | None, title: str, result: str) -> None:
+    if on_result is None:
+        return
+    # "невідомо" під час зупинки бота - перервана перевірка, а не результат
+    if result == "невідомо" and shutdown_event.is_set():
+        return
+    try:
+        await on_result(title, result)
+    except Exception as e:
+        log("  ⚠️ Не вдалось зберегти результат %s: %s", title, e)
+
+
 def _chunks(lst: list, n: int):
     """Ділить список на батчі по n елементів"""
     for i in range(0, len(lst), n):
@@ -102,13 +134,13 @@ def retry(times: int = 3, delay: float = 2.0):
                     return await func(page, url, *args, **kwargs)
                 except Exception as e:
                     last_error = e
-                    if _shutdown_event.is_set():
-                        log(f"  ⚠️ Зупинка бота - перериваємо retry для {url}")
+                    if shutdown_event.is_set():
+                        log("  ⚠️ Зупинка бота - перериваємо retry для %s", url)
                         return "невідомо"
                     if attempt < times:
-                        log(f"  ⚠️ Спроба {attempt}/{times} невдала: {e}. Повтор через {delay}с...")
+                        log("  ⚠️ Спроба %s/%s невдала: %s. Повтор через %sс...", attempt, times, e, delay)
                         await asyncio.sleep(delay)
-            log(f"  ❌ Всі {times} спроби невдалі: {last_error}")
+            log("  ❌ Всі %s спроби невдалі: %s", times, last_error)
             return "невідомо"
         return wrapper
     return decorator
@@ -116,19 +148,6 @@ def retry(times: int = 3, delay: float = 2.0):
 
 #Допоміжні функції
 
-def _extract_comx_chapters(html: str) -> list[int]:
-    m = re.search(r'window\.__DATA__\s*=\s*({.*?})\s*(?:;|</script>)', html, re.DOTALL)
-    if not m:
-        nums = re.findall(r'"posi"\s*:\s*(\d+)', html)
-        return [int(n) for n in nums]
-    try:
-        data = json.loads(m.group(1))
-        return [ch["posi"] for ch in data.get("chapters", []) if ch.get("posi")]
-    except (json.JSONDecodeError, KeyError):
-        nums = re.findall(r'"posi"\s*:\s*(\d+)', m.group(1))
-        return [int(n) for n in nums]
-
-
 async def _extract_comx_chapters_js(page: Page) -> list[int]:
     try:
         data = await page.evaluate(
@@ -138,7 +157,7 @@ async def _extract_comx_chapters_js(page: Page) -> list[int]:
             chapters = data.get("chapters", [])
             return [ch["posi"] for ch in chapters if ch.get("posi")]
     except Exception as e:
-        log(f"  ⚠️ JS evaluate не спрацював: {e}, використовую regex fallback")
+        log("  ⚠️ JS evaluate не спрацював: %s, використовую regex fallback", e)
     return []
 
 
@@ -149,37 +168,27 @@ async def _parse_honeymanga_api(url: str, session: aiohttp.ClientSession) -> str
     if not m:
         return None
     manga_id = m.group(1)
-    api_url = "https://data.api.honey-manga.com.ua/v2/chapter/cursor-list"
-    log(f"  -> API запит: {api_url}")
+    api_url = HONEYMANGA_API_URL
+    log("  -> API запит: %s", api_url)
     try:
         # Спочатку отримуємо загальну кількість глав щоб знайти останню
-        async with session.post(
-            api_url,
-            json={"mangaId": manga_id, "page": 1, "pageSize": 1, "sortOrder": "DESC"},
-            timeout=aiohttp.ClientTimeout(total=20)
-        ) as r:
-            r.raise_for_status()
-            data = await r.json()
-            items = data.get("list", []) or data.get("data", []) or data.get("items", [])
-            if not items and isinstance(data, list):
-                items = data
-            if items:
-                # DESC порядок перший елемент найновіший
-                first = items[0]
-                # Номер глави може бути в різних полях
-                chapter = (
-                    first.get("chapterNum") or
-                    first.get("number") or
-                    first.get("chapter") or
-                    first.get("index")
-                )
-                if chapter is not None:
-                    result = str(int(float(chapter))) if float(chapter) == int(float(chapter)) else str(chapter)
-                    log(f"  ✅ [API] honey-manga: {result}")
-                    return result
-            log(f"  ⚠️ honey-manga API: невідома структура відповіді: {str(data)[:200]}")
+        with timing.span("api"):
+            async with session.post(
+                api_url,
+                json={"mangaId": manga_id, "page": 1, "pageSize": 1, "sortOrder": "DESC"},
+                timeout=aiohttp.ClientTimeout(total=20)
+            ) as r:
+                r.raise_for_status()
+                body = await r.read()
+        metrics.FETCHED_BYTES.inc(len(body), domain=timing.current_domain(), method="api")
+        with timing.span("extract"):
+            result = await parse(honeymanga_chapter, body)
+        if result is not None:
+            log("  ✅ [API] honey-manga: %s", result)
+            return result
+        log("  ⚠️ honey-manga API: невідома структура відповіді: %s", body[:200].decode('utf-8', errors='replace'))
     except Exception as e:
-        log(f"  ❌ honey-manga API помилка: {e}")
+        log("  ❌ honey-manga API помилка: %s", e)
     return None
 
 
@@ -189,31 +198,21 @@ async def _parse_zenko_api(url: str, session: aiohttp.ClientSession) -> str | No
     if not m:
         return None
     title_id = m.group(1)
-    api_url = f"https://api.zenko.online/titles/{title_id}/chapters"
-    log(f"  -> API запит: {api_url}")
+    api_url = f"{ZENKO_API_URL}/titles/{title_id}/chapters"
+    log("  -> API запит: %s", api_url)
     try:
-        async with session.get(api_url, timeout=aiohttp.ClientTimeout(total=20)) as r:
-            r.raise_for_status()
-            data = await r.json()
-            items = data if isinstance(data, list) else data.get("data", [])
-            chapters = []
-            for item in items:
-                name = item.get("name", "")
-                # Формат: "18@#%&;№%#&**#!@151@#%&;№%#&**#!@Назва"
-                # Другий сегмент - номер глави
-                parts = name.split("@#%&;№%#&**#!@")
-                if len(parts) >= 2:
-                    try:
-                        chapters.append(float(parts[1]))
-                    except ValueError:
-                        pass
-            if chapters:
-                last = max(chapters)
-                result = str(int(last)) if last == int(last) else str(last)
-                log(f"  ✅ [API] zenko.online: {result}")
-                return result
+        with timing.span("api"):
+            async with session.get(api_url, timeout=aiohttp.ClientTimeout(total=20)) as r:
+                r.raise_for_status()
+                body = await r.read()
+        metrics.FETCHED_BYTES.inc(len(body), domain=timing.current_domain(), method="api")
+        with timing.span("extract"):
+            result = await parse(zenko_chapter, body)
+        if result is not None:
+            log("  ✅ [API] zenko.online: %s", result)
+            return result
     except Exception as e:
-        log(f"  ❌ zenko.online API помилка: {e}")
+        log("  ❌ zenko.online API помилка: %s", e)
     return None
 
 
@@ -225,68 +224,63 @@ async def _parse_mangainua_api(url: str, session: aiohttp.ClientSession) -> str
         return None
     news_category_slug = m.group(1)
     news_id = m.group(2)
-    log(f"  -> HTTP двокроковий запит: manga.in.ua (id={news_id})")
+    log("  -> HTTP двокроковий запит: manga.in.ua (id=%s)", news_id)
     # Власна сесія з ізольованим cookie jar - cookies manga.in.ua не змішуються
     # зі спільною сесією інших API парсерів при паралельній перевірці
-    async with aiohttp.ClientSession(
+    async with recorder.client_session(
         headers=MANGAINUA_HEADERS,
         cookie_jar=aiohttp.CookieJar(),
     ) as manga_session:
         try:
             #отримуємо сторінку, витягуємо hash - cookies зберігаються в manga_session
-            async with manga_session.get(
-                url,
-                headers={"Accept": "text/html"},
-                timeout=aiohttp.ClientTimeout(total=20)
-            ) as r:
-                r.raise_for_status()
-                html = await r.text()
-                hash_match = re.search(
-                    r"""site_login_hash\s*=\s*['"]([a-f0-9]{32,64})['"]""", html
-                )
-                if not hash_match:
-                    log(f"  ⚠️ manga.in.ua: site_login_hash не знайдено")
-                    return None
-                site_login_hash = hash_match.group(1)
-
-            async with manga_session.post(
-                "https://manga.in.ua/engine/ajax/controller.php",
-                data={
-                    "mod": "load_chapters",
-                    "action": "show",
-                    "news_id": news_id,
-                    "news_category": news_category_slug,
-                    "this_link": url,
-                    "user_hash": site_login_hash,
-                },
-                headers={
-                    "Referer": url,
-                    "X-Requested-With": "XMLHttpRequest",
-                    "Accept": "application/json, text/javascript, */*",
-                },
-                timeout=aiohttp.ClientTimeout(total=20)
-            ) as r:
-                r.raise_for_status()
-                body = await r.text()
-                if not body.strip():
-                    log(f"  ⚠️ manga.in.ua: порожня відповідь")
-                    return None
-
-                chapters = re.findall(r'manga-chappter="(\d+(?:\.\d+)?)"', body)
-                if not chapters:
-                    chapters = re.findall(r"manga-chappter='(\d+(?:\.\d+)?)'", body)
-                if not chapters:
-                    chapters = re.findall(
-                        r"(?:Глава|Розділ|Chapter)\s*(\d+(?:\.\d+)?)", body, re.IGNORECASE
-                    )
-                if chapters:
-                    last = max(float(n) for n in chapters)
-                    result = str(int(last)) if last == int(last) else str(last)
-                    log(f"  ✅ [API] manga.in.ua: {result}")
-                    return result
+            with timing.span("api"):
+                async with manga_session.get(
+                    url,
+                    headers={"Accept": "text/html"},
+                    timeout=aiohttp.ClientTimeout(total=20)
+                ) as r:
+                    r.raise_for_status()
+                    html = await r.read()
+            metrics.FETCHED_BYTES.inc(len(html), domain=timing.current_domain(), method="api")
+            with timing.span("extract"):
+                site_login_hash = await parse(mangainua_hash, html)
+            if not site_login_hash:
+                log("  ⚠️ manga.in.ua: site_login_hash не знайдено")
+                return None
+
+            with timing.span("api"):
+                async with manga_session.post(
+                    MANGAINUA_AJAX_URL,
+                    data={
+                        "mod": "load_chapters",
+                        "action": "show",
+                        "news_id": news_id,
+                        "news_category": news_category_slug,
+                        "this_link": url,
+                        "user_hash": site_login_hash,
+                    },
+                    headers={
+                        "Referer": url,
+                        "X-Requested-With": "XMLHttpRequest",
+                        "Accept": "application/json, text/javascript, */*",
+                    },
+                    timeout=aiohttp.ClientTimeout(total=20)
+                ) as r:
+                    r.raise_for_status()
+                    body = await r.read()
+            metrics.FETCHED_BYTES.inc(len(body), domain=timing.current_domain(), method="api")
+            if not body.strip():
+                log("  ⚠️ manga.in.ua: порожня відповідь")
+                return None
+
+            with timing.span("extract"):
+                result = await parse(mangainua_chapter, body)
+            if result is not None:
+                log("  ✅ [API] manga.in.ua: %s", result)
+                return result
 
         except Exception as e:
-            log(f"  ❌ manga.in.ua помилка: {e}")
+            log("  ❌ manga.in.ua помилка: %s", e)
     return None
 
 #Парсери сайтів
@@ -306,66 +300,77 @@ async def _sample_links(page, limit: int = 8) -> list[str]:
     except Exception:
         return []
 
+
+async def _log_sample_links(page) -> None:
+    """Зразок посилань тільки якщо лог парсера його запише - з LOG_LEVELS=parser=WARNING
+    не робляться і запити до сторінки."""
+    if _logger.isEnabledFor(logging.INFO):
+        log("     Зразок посилань на сторінці: %s", await _sample_links(page))
+
 @register_parser("com-x.life")
 @retry(times=3, delay=2.0)
 async def _parse_comx(page, url: str) -> str:
-    await page.goto(url, timeout=40000, wait_until="domcontentloaded")
-    try:
-        await page.wait_for_selector(
-            "script:has-text('__DATA__'), .page__chapters-list",
-            timeout=10000
-        )
-    except Exception:
-        pass
-
-    chapters = await _extract_comx_chapters_js(page)
-    if not chapters:
-        html = await page.content()
-        chapters = _extract_comx_chapters(html)
-
-    if chapters:
-        result = str(max(chapters))
-        log(f"  ✅ [browser] com-x.life: {result}")
+    with timing.span("goto"):
+        await page.goto(url, timeout=40000, wait_until="domcontentloaded")
+    with timing.span("selector"):
+        try:
+            await page.wait_for_selector(
+                "script:has-text('__DATA__'), .page__chapters-list",
+                timeout=10000
+            )
+        except Exception:
+            pass
+
+    with timing.span("extract"):
+        chapters = await _extract_comx_chapters_js(page)
+        if chapters:
+            result = str(max(chapters))
+        else:
+            result = await parse(comx_chapter, await page.content())
+
+    if result is not None:
+        log("  ✅ [browser] com-x.life: %s", result)
         return result
-    sample = await _sample_links(page)
-    log(f"  ❌ com-x.life: window.__DATA__ не знайдено - сайт міг змінити структуру ({url})")
-    log(f"     Зразок посилань на сторінці: {sample}")
+    log("  ❌ com-x.life: window.__DATA__ не знайдено - сайт міг змінити структуру (%s)", url)
+    await _log_sample_links(page)
     raise Exception("главу не знайдено")
 
 
 @register_parser("mangabuff.ru")
 @retry(times=3, delay=2.0)
 async def _parse_mangabuff(page, url: str) -> str:
-    await page.goto(url, timeout=40000, wait_until="domcontentloaded")
-    try:
-        await page.wait_for_selector("a[href*='/chapter/']", timeout=10000)
-    except Exception:
-        pass
-
-    chapters = []
-    links = await page.query_selector_all("a[href*='/chapter/']")
-    for link in links:
-        href = await link.get_attribute("href") or ""
-        m = re.search(r"/chapter/(\d+(?:\.\d+)?)", href)
-        if m:
-            chapters.append(float(m.group(1)))
+    with timing.span("goto"):
+        await page.goto(url, timeout=40000, wait_until="domcontentloaded")
+    with timing.span("selector"):
+        try:
+            await page.wait_for_selector("a[href*='/chapter/']", timeout=10000)
+        except Exception:
+            pass
 
-    if not chapters:
-        links = await page.query_selector_all("a")
+    with timing.span("extract"):
+        chapters = []
+        links = await page.query_selector_all("a[href*='/chapter/']")
         for link in links:
-            text = (await link.inner_text()).strip()
-            num = _find_last_chapter(text)
-            if num is not None:
-                chapters.append(num)
+            href = await link.get_attribute("href") or ""
+            m = re.search(r"/chapter/(\d+(?:\.\d+)?)", href)
+            if m:
+                chapters.append(float(m.group(1)))
+
+        if not chapters:
+            links = await page.query_selector_all("a")
+            for link in links:
+                text = (await link.inner_text()).strip()
+                num = _find_last_chapter(text)
+                if num is not None:
+                    chapters.append(num)
 
     if chapters:
         last = max(chapters)
         result = str(int(last)) if last == int(last) else str(last)
-        log(f"  ✅ [browser] mangabuff.ru: {result}")
+        log("  ✅ [browser] mangabuff.ru: %s", result)
         return result
-    sample = await _sample_links(page)
-    log(f"  ❌ mangabuff.ru: a[href*='/chapter/'] не знайдено ({url})")
-    log(f"     Зразок посилань на сторінці: {sample}")
+    log("  ❌ mangabuff.ru: a[href*='/chapter/'] не знайдено (%s)", url)
+    await _log_sample_links(page)
     raise Exception("главу не знайдено")
 
 
@@ -375,64 +380,68 @@ async def _parse_mangalib_browser(page: Page, url: str) -> str:
     """Браузерний парсер для mangalib.me - API закритий, використовуємо Playwright."""
     if "section=chapters" not in url:
         url = url.rstrip("/") + "?section=chapters"
-    await page.goto(url, timeout=40000, wait_until="domcontentloaded")
-    try:
-        await page.wait_for_load_state("networkidle", timeout=15000)
-    except Exception:
-        pass
-    try:
-        await page.wait_for_selector("a[href*='/read/']", timeout=20000)
-    except Exception:
-        pass
+    with timing.span("goto"):
+        await page.goto(url, timeout=40000, wait_until="domcontentloaded")
+    with timing.span("selector"):
+        try:
+            await page.wait_for_load_state("networkidle", timeout=15000)
+        except Exception:
+            pass
+        try:
+            await page.wait_for_selector("a[href*='/read/']", timeout=20000)
+        except Exception:
+            pass
 
-    chapters = []
-    links = await page.query_selector_all("a[href*='/read/']")
-    for link in links:
-        text = (await link.inner_text()).strip()
-        m = re.search(r"[Гг]лава\s+(\d+(?:\.\d+)?)", text)
-        if m:
-            chapters.append(float(m.group(1)))
+    with timing.span("extract"):
+        chapters = []
+        links = await page.query_selector_all("a[href*='/read/']")
+        for link in links:
+            text = (await link.inner_text()).strip()
+            m = re.search(r"[Гг]лава\s+(\d+(?:\.\d+)?)", text)
+            if m:
+                chapters.append(float(m.group(1)))
 
     if chapters:
         last = max(chapters)
         result = str(int(last)) if last == int(last) else str(last)
-        log(f"  ✅ [browser] mangalib.me: {result}")
+        log("  ✅ [browser] mangalib.me: %s", result)
         return result
-    sample = await _sample_links(page)
-    log(f"  ❌ mangalib.me: a[href*='/read/'] не знайдено ({url})")
-    log(f"     Зразок посилань на сторінці: {sample}")
+    log("  ❌ mangalib.me: a[href*='/read/'] не знайдено (%s)", url)
+    await _log_sample_links(page)
     raise Exception(f"главу не знайдено ({url})")
 
 
 @retry(times=3, delay=2.0)
 async def _parse_fallback(page, url: str) -> str:
-    await page.goto(url, timeout=40000, wait_until="domcontentloaded")
-    try:
-        await page.wait_for_selector(
-            "a:has-text('Глава'), a:has-text('Розділ'), a:has-text('Chapter')",
-            timeout=10000
-        )
-    except Exception:
-        pass
+    with timing.span("goto"):
+        await page.goto(url, timeout=40000, wait_until="domcontentloaded")
+    with timing.span("selector"):
+        try:
+            await page.wait_for_selector(
+                "a:has-text('Глава'), a:has-text('Розділ'), a:has-text('Chapter')",
+                timeout=10000
+            )
+        except Exception:
+            pass
 
-    chapters = []
-    links = await page.query_selector_all("a")
-    for link in links:
-        text = (await link.inner_text()).strip()
-        if len(text) > 80:
-            continue
-        num = _find_last_chapter(text)
-        if num is not None:
-            chapters.append(num)
+    with timing.span("extract"):
+        chapters = []
+        links = await page.query_selector_all("a")
+        for link in links:
+            text = (await link.inner_text()).strip()
+            if len(text) > 80:
+                continue
+            num = _find_last_chapter(text)
+            if num is not None:
+                chapters.append(num)
 
     if chapters:
         last = max(chapters)
         result = str(int(last)) if last == int(last) else str(last)
-        log(f"  ✅ [browser] fallback: {result}")
+        log("  ✅ [browser] fallback: %s", result)
         return result
-    sample = await _sample_links(page)
-    log(f"  ❌ fallback: 'Глава/Розділ/Chapter N' не знайдено ({url})")
-    log(f"     Зразок посилань на сторінці: {sample}")
+    log("  ❌ fallback: 'Глава/Розділ/Chapter N' не знайдено (%s)", url)
+    await _log_sample_links(page)
     raise Exception(f"главу не знайдено ({url})")
 
 
@@ -441,7 +450,7 @@ async def _check_one_api(
     title: str,
     url: str,
 ) -> tuple[str, str]:
-    log(f"=== Перевіряємо: {title} ===")
+    log("=== Перевіряємо: %s ===", title)
 
     parser_func = None
     if "honey-manga.com.ua" in url:
@@ -452,55 +461,162 @@ async def _check_one_api(
         parser_func = _parse_mangainua_api
 
     if parser_func is None:
-        log(f"  ❌ {title} - невідомий API домен")
+        log("  ❌ %s - невідомий API домен", title)
         return title, "невідомо"
 
     result = await parser_func(url, session)
     if result is None:
-        log(f"  ⚠️ {title}: главу не знайдено")
+        log("  ⚠️ %s: главу не знайдено", title)
         return title, "невідомо"
     return title, result
 
 
+class _BatchContext:
+    """Контекст браузера батчу з пулом вкладок. Регулятор пам'яті може перезапустити
+    контекст між вкладками - пам'ять рендерерів звільняється без перезапуску всього Chromium.
+
+    Вкладка після манги скидається на about:blank і повертається в пул - таймаути,
+    маршрут блокування ресурсів і запис (core.recorder) лишаються встановленими.
+    Закривається після PAGE_MAX_USES манг або коли JS heap виріс на PAGE_RECYCLE_MB."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.context: BrowserContext | None = None
+        self._idle: list[Page] = []
+        # {вкладка: [використань, JS heap після першого скидання в байтах]}
+        self._usage: dict[Page, list] = {}
+
+    async def open(self) -> None:
+        self.context = await self.browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": 800, "height": 600},
+            locale="uk-UA",
+            extra_http_headers={"Accept-Language": "uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7"},
+        )
+        # Приховати ознаки headless браузера
+        await self.context.add_init_script("""
+            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+            Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3]});
+            window.chrome = {runtime: {}};
+        """)
+
+    async def recycle(self) -> None:
+        # Спершу закриваємо старий - під тиском пам'яті два контексти одночасно не влізуть
+        self._idle.clear()
+        self._usage.clear()
+        await self.context.close()
+        await self.open()
+
+    async def close(self) -> None:
+        if self.context is not None:
+            await self.context.close()
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def page(self, domain: str) -> Page:
+        """Вкладка з пулу або нова, налаштована для парсерів."""
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed():
+                metrics.PAGES_REUSED.inc(domain=domain)
+                return page
+        page = await self.context.new_page()
+        metrics.PAGES_OPENED.inc(domain=domain)
+        self._usage[page] = [0, None]
+        page.set_default_navigation_timeout(PAGE_TIMEOUT * 1000)
+        page.set_default_timeout(PAGE_TIMEOUT * 1000)
+        await page.route("**/*", _block_resources)
+        await recorder.attach_page(page, _is_blocked)
+        return page
+
+    async def release(self, page: Page, keep: bool) -> None:
+        """Повертає вкладку в пул або закриває. keep=False - пул вже повний."""
+        usage = self._usage.pop(page, None)
+        if page.is_closed() or usage is None:
+            return
+        usage[0] += 1
+        if keep and usage[0] < PAGE_MAX_USES:
+            try:
+                await page.goto("about:blank")
+                heap = await page.evaluate("performance.memory ? performance.memory.usedJSHeapSize : 0")
+                if usage[1] is None:
+                    usage[1] = heap
+                if heap - usage[1] < PAGE_RECYCLE_MB * 1024 * 1024:
+                    self._usage[page] = usage
+                    self._idle.append(page)
+                    return
+                log("  ♻️ Вкладка закрита: JS heap +%.0f MB за %s манг", (heap - usage[1]) / 1024 / 1024, usage[0])
+            except Exception:
+                # Вкладка, яку не вдалось скинути, в пул не повертається
+                pass
+        await page.close()
+
+
 async def _check_one(
-    semaphore: asyncio.Semaphore,
-    context: BrowserContext,
+    pages: PageGovernor,
+    contexts: _BatchContext,
     title: str,
     url: str,
+    on_result: ResultCallback | None = None,
+    details: dict | None = None,
 ) -> tuple[str, str]:
-    log(f"=== Перевіряємо: {title} ===")
+    log("=== Перевіряємо: %s ===", title)
+    timing.title_scope(url, title)
+    start = time.monotonic()
     try:
-        result = await _check_one_browser(semaphore, context, title, url)
+        result = await _check_one_browser(pages, contexts, title, url)
     except Exception as e:
-        log(f"  ❌ {title} - помилка: {e}")
+        log("  ❌ %s - помилка: %s", title, e)
         result = "невідомо"
+    if details is not None:
+        details[title] = {"method": "browser", "latency": round(time.monotonic() - start, 2)}
+    metrics.TITLE_CHECKS.inc(
+        domain=timing.current_domain(), method="browser", result="ok" if result != "невідомо" else "fail",
+    )
+    await _notify(on_result, title, result)
     return title, result
 
 
+def _is_blocked(request) -> bool:
+    if request.resource_type in BLOCKED_RESOURCES:
+        return True
+    return any(domain in request.url for domain in BLOCKED_DOMAINS)
+
+
+async def _block_resources(route):
+    try:
+        if _is_blocked(route.request):
+            await route.abort()
+            return
+        if browser_cache.cacheable(route.request):
+            await browser_cache.fulfill(route)
+            return
+        await route.continue_()
+    except Exception:
+        pass
+
+
 async def _check_one_browser(
-    semaphore: asyncio.Semaphore,
-    context: BrowserContext,
+    pages: PageGovernor,
+    contexts: _BatchContext,
     title: str,
     url: str
 ) -> str:
-    async with semaphore:
-        page = await context.new_page()
-
-        page.set_default_navigation_timeout(PAGE_TIMEOUT * 1000)
-        page.set_default_timeout(PAGE_TIMEOUT * 1000)
+    waiting = time.monotonic()
+    async with pages:
+        timing.observe("semaphore", time.monotonic() - waiting)
+        domain = timing.current_domain()
+        page = await contexts.page(domain)
 
-        async def block_resources(route):
+        def count_bytes(response):
             try:
-                if route.request.resource_type in BLOCKED_RESOURCES:
-                    await route.abort()
-                    return
-                if any(domain in route.request.url for domain in BLOCKED_DOMAINS):
-                    await route.abort()
-                    return
-                await route.continue_()
-            except Exception:
-                pass
-        await page.route("**/*", block_resources)
+                size = int(response.headers.get("content-length") or 0)
+            except ValueError:
+                return
+            metrics.FETCHED_BYTES.inc(size, domain=domain, method="browser")
+        page.on("response", count_bytes)
 
         try:
             parser = next(
@@ -509,18 +625,24 @@ async def _check_one_browser(
             )
             return await parser(page, url)
         except Exception as e:
-            log(f"  ❌ Помилка: {e}")
+            log("  ❌ Помилка: %s", e)
             return "невідомо"
         finally:
-            await page.close()
+            page.remove_listener("response", count_bytes)
+            await recorder.drain()
+            # Вкладки в пулі разом з відкритими не перевищують ліміт регулятора пам'яті
+            await contexts.release(page, keep=contexts.idle + pages.active <= pages.limit)
 
 
 async def _run_browser_batch(
-    semaphore: asyncio.Semaphore,
+    pages: PageGovernor,
     batch: list[tuple[str, str]],
+    on_result: ResultCallback | None = None,
+    details: dict | None = None,
 ) -> list[tuple[str, str]]:
     """Запускає один браузер для батчу манг, закриває після завершення."""
     async with async_playwright() as p:
+        launching = time.monotonic()
         browser = await p.chromium.launch(
             headless=HEADLESS,
             args=[
@@ -532,38 +654,66 @@ async def _run_browser_batch(
                 "--disable-blink-features=AutomationControlled",
             ]
         )
-        context = await browser.new_context(
-            user_agent=USER_AGENT,
-            viewport={"width": 800, "height": 600},
-            locale="uk-UA",
-            extra_http_headers={"Accept-Language": "uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7"},
-        )
-        # Приховати ознаки headless браузера
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-            Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3]});
-            window.chrome = {runtime: {}};
-        """)
+        contexts = _BatchContext(browser)
+        await contexts.open()
+        timing.observe("launch", time.monotonic() - launching, timing.BROWSER_DOMAIN)
+        metrics.BROWSER_LAUNCHES.inc()
+        pages.recycle = contexts.recycle
         try:
             tasks = [
-                _check_one(semaphore, context, title, url)
+                _check_one(pages, contexts, title, url, on_result, details)
                 for title, url in batch
             ]
             return list(await asyncio.gather(*tasks))
         finally:
-            await context.close()
+            pages.recycle = None
+            await contexts.close()
             await browser.close()
 
 
 
-async def check_all(manga_dict: dict) -> dict[str, str]:
-    log(f"Починаємо перевірку {len(manga_dict)} манг паралельно (макс. {MAX_CONCURRENT} одночасно)...")
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+async def check_all(
+    manga_dict: dict,
+    on_result: ResultCallback | None = None,
+    details: dict | None = None,
+) -> dict[str, str]:
+    """Перевіряє {title: url}, повертає {title: глава}.
+    on_result(title, глава) викликається одразу як готовий результат кожної манги -
+    щоб перервана перевірка не втрачала вже отримані результати.
+    details заповнюється {title: {"method": "api" | "browser", "latency": сек}}
+    до виклику on_result. Фази кожної манги вимірюються спанами core.timing.
+    З CHECK_RECORD_DIR всі відповіді перевірки записуються (core.recorder)."""
+    if recorder.RECORD_DIR and recorder.active() is None:
+        with recorder.recording(recorder.new_recording_path()):
+            return await check_all(manga_dict, on_result, details)
+
+    mode = recorder.active()
+    if isinstance(mode, recorder.Recorder):
+        mode.meta["manga"] = dict(manga_dict)
+        mode.meta["api_urls"] = {name: globals()[name] for name in RECORDED_API_URLS}
+    elif isinstance(mode, recorder.Replayer):
+        # Відповіді записані під адресами API, що діяли під час запису -
+        # відтворення шукає їх за записаними адресами, стан модуля не змінюється
+        mode.map_urls({name: globals()[name] for name in RECORDED_API_URLS})
+    results = await _check_all(manga_dict, on_result, details)
+    if isinstance(mode, recorder.Recorder):
+        mode.meta["results"] = results
+    return results
+
+
+async def _check_all(
+    manga_dict: dict,
+    on_result: ResultCallback | None,
+    details: dict | None,
+) -> dict[str, str]:
+    log("Починаємо перевірку %s манг паралельно (макс. %s одночасно)...", len(manga_dict), MAX_CONCURRENT)
+    pages = PageGovernor(MAX_CONCURRENT)
+    timing.check_started()
 
     api_manga = {t: u for t, u in manga_dict.items() if any(d in u for d in API_DOMAINS)}
     browser_manga = list({t: u for t, u in manga_dict.items() if not any(d in u for d in API_DOMAINS)}.items())
 
-    async with aiohttp.ClientSession(headers=API_HEADERS) as session:
+    async with recorder.client_session(headers=API_HEADERS) as session:
 
         async def run_api() -> list[tuple[str, str]]:
             if not api_manga:
@@ -571,12 +721,25 @@ async def check_all(manga_dict: dict) -> dict[str, str]:
             api_semaphore = asyncio.Semaphore(MAX_CONCURRENT_API)
 
             async def _limited(title, url):
+                timing.title_scope(url, title)
+                waiting = time.monotonic()
                 async with api_semaphore:
+                    timing.observe("semaphore", time.monotonic() - waiting)
+                    start = time.monotonic()
                     try:
-                        return await _check_one_api(session, title, url)
+                        title, result = await _check_one_api(session, title, url)
                     except Exception as e:
-                        log(f"  ❌ Глобальна помилка API для {title}: {e}")
+                        log("  ❌ Глобальна помилка API для %s: %s", title, e)
                         return title, "невідомо"
+                if details is not None:
+                    details[title] = {"method": "api", "latency": round(time.monotonic() - start, 2)}
+                metrics.TITLE_CHECKS.inc(
+                    domain=timing.current_domain(), method="api", result="ok" if result != "невідомо" else "fail",
+                )
+                # Невдалі API манги ще перевіряються браузером - зберігаємо тільки успішні
+                if result != "невідомо":
+                    await _notify(on_result, title, result)
+                return title, result
 
             tasks = [_limited(title, url) for title, url in api_manga.items()]
             return list(await asyncio.gather(*tasks))
@@ -588,18 +751,22 @@ async def check_all(manga_dict: dict) -> dict[str, str]:
             batches = list(_chunks(browser_manga, BROWSER_BATCH_SIZE)) if browser_manga else []
 
             if browser_manga:
-                log(f"Браузерні манги: {len(browser_manga)} шт., батчів: {len(batches)} по {BROWSER_BATCH_SIZE}")
-
-            for i, batch in enumerate(batches, 1):
-                log(f"  Батч {i}/{len(batches)} ({len(batch)} манг)...")
-                batch_results = await _run_browser_batch(semaphore, list(batch))
-                results.extend(batch_results)
+                log("Браузерні манги: %s шт., батчів: %s по %s", len(browser_manga), len(batches), BROWSER_BATCH_SIZE)
 
-            # Fallback запускається окремим браузером після закриття основних батчів
-            if fallback:
-                log(f"  Браузерний fallback для {len(fallback)} API манг...")
-                fallback_results = await _run_browser_batch(semaphore, fallback)
-                results.extend(fallback_results)
+            pages.start()
+            try:
+                for i, batch in enumerate(batches, 1):
+                    log("  Батч %s/%s (%s манг)...", i, len(batches), len(batch))
+                    batch_results = await _run_browser_batch(pages, list(batch), on_result, details)
+                    results.extend(batch_results)
+
+                # Fallback запускається окремим браузером після закриття основних батчів
+                if fallback:
+                    log("  Браузерний fallback для %s API манг...", len(fallback))
+                    fallback_results = await _run_browser_batch(pages, fallback, on_result, details)
+                    results.extend(fallback_results)
+            finally:
+                await pages.stop()
 
             return results
 
@@ -612,7 +779,7 @@ async def check_all(manga_dict: dict) -> dict[str, str]:
         ]
 
         if api_failed:
-            log(f"  ⚠️ {len(api_failed)} API манг не вдалось - буде спроба через браузер: {[t for t, _ in api_failed]}")
+            log("  ⚠️ %s API манг не вдалось - буде спроба через браузер: %s", len(api_failed), [t for t, _ in api_failed])
 
         browser_results = await run_browser(fallback=api_failed if api_failed else None)
 
@@ -0,0 +1,137 @@
+"""
+Чисті парсери відповідей сайтів і пул для їх виконання поза event loop.
+
+Парсери - функції рівня модуля без I/O: приймають тіло відповіді (bytes або str)
+і повертають номер глави рядком або None. Тому їх можна виконувати в потоці
+або окремому процесі - великі HTML/JSON не блокують цикл подій, який обслуговує
+Telegram під час великої перевірки.
+
+Модуль не імпортує Playwright і aiohttp - дочірні процеси пулу стартують швидко.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+# thread - пул потоків (за замовчуванням), process - пул процесів, off - в циклі подій
+PARSE_POOL = os.getenv("PARSE_POOL", "thread").lower()
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+# Менші відповіді парсяться одразу - передача в пул коштує більше за сам парсинг
+PARSE_OFFLOAD_BYTES = int(os.getenv("PARSE_OFFLOAD_BYTES", str(64 * 1024)))
+
+ZENKO_SEPARATOR = "@#%&;№%#&**#!@"
+
+_COMX_DATA_RE = re.compile(r'window\.__DATA__\s*=\s*({.*?})\s*(?:;|</script>)', re.DOTALL)
+_COMX_POSI_RE = re.compile(r'"posi"\s*:\s*(\d+)')
+_MANGAINUA_HASH_RE = re.compile(r"""site_login_hash\s*=\s*['"]([a-f0-9]{32,64})['"]""")
+_MANGAINUA_CHAPTER_RES = (
+    re.compile(r'manga-chappter="(\d+(?:\.\d+)?)"'),
+    re.compile(r"manga-chappter='(\d+(?:\.\d+)?)'"),
+    re.compile(r"(?:Глава|Розділ|Chapter)\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+)
+
+
+def _text(payload: bytes | str) -> str:
+    return payload.decode("utf-8", errors="replace") if isinstance(payload, bytes) else payload
+
+
+def format_chapter(num: float) -> str:
+    """151.0 -> "151", 151.5 -> "151.5" """
+    return str(int(num)) if num == int(num) else str(num)
+
+
+# Парсери
+
+def extract_comx_chapters(html: bytes | str) -> list[int]:
+    html = _text(html)
+    m = _COMX_DATA_RE.search(html)
+    if not m:
+        return [int(n) for n in _COMX_POSI_RE.findall(html)]
+    try:
+        data = json.loads(m.group(1))
+        return [ch["posi"] for ch in data.get("chapters", []) if ch.get("posi")]
+    except (json.JSONDecodeError, KeyError):
+        return [int(n) for n in _COMX_POSI_RE.findall(m.group(1))]
+
+
+def comx_chapter(html: bytes | str) -> str | None:
+    chapters = extract_comx_chapters(html)
+    return str(max(chapters)) if chapters else None
+
+
+def honeymanga_chapter(body: bytes | str) -> str | None:
+    data = json.loads(body)
+    items = []
+    if isinstance(data, dict):
+        items = data.get("list", []) or data.get("data", []) or data.get("items", [])
+    elif isinstance(data, list):
+        items = data
+    if not items:
+        return None
+    # DESC порядок - перший елемент найновіший, номер глави може бути в різних полях
+    first = items[0]
+    chapter = first.get("chapterNum") or first.get("number") or first.get("chapter") or first.get("index")
+    if chapter is None:
+        return None
+    return format_chapter(float(chapter)) if float(chapter) == int(float(chapter)) else str(chapter)
+
+
+def zenko_chapter(body: bytes | str) -> str | None:
+    data = json.loads(body)
+    items = data if isinstance(data, list) else data.get("data", [])
+    chapters = []
+    for item in items:
+        # Формат: "18@#%&;№%#&**#!@151@#%&;№%#&**#!@Назва" - другий сегмент номер глави
+        parts = item.get("name", "").split(ZENKO_SEPARATOR, 2)
+        if len(parts) >= 2:
+            try:
+                chapters.append(float(parts[1]))
+            except ValueError:
+                pass
+    return format_chapter(max(chapters)) if chapters else None
+
+
+def mangainua_hash(html: bytes | str) -> str | None:
+    m = _MANGAINUA_HASH_RE.search(_text(html))
+    return m.group(1) if m else None
+
+
+def mangainua_chapter(body: bytes | str) -> str | None:
+    body = _text(body)
+    for pattern in _MANGAINUA_CHAPTER_RES:
+        chapters = pattern.findall(body)
+        if chapters:
+            return format_chapter(max(float(n) for n in chapters))
+    return None
+
+
+# Пул
+
+_EXECUTOR: Executor | None = None
+
+
+def _get_executor() -> Executor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        if PARSE_POOL == "process":
+            # spawn - дочірній процес не успадковує потоки Motor/SQLite батьківського
+            _EXECUTOR = ProcessPoolExecutor(PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _EXECUTOR = ThreadPoolExecutor(PARSE_WORKERS, thread_name_prefix="parse")
+    return _EXECUTOR
+
+
+async def parse(func, payload: bytes | str):
+    """Виконує парсер func(payload). Великі відповіді - в пулі, малі - одразу."""
+    if PARSE_POOL == "off" or len(payload) < PARSE_OFFLOAD_BYTES:
+        return func(payload)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, payload)
+
+
+def close_parse_pool() -> None:
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
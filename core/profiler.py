@@ -0,0 +1,204 @@
+"""
+Профілювання живого бота: семплюючий профілер CPU і tracemalloc.
+
+Профілер - потік, який кожні PROFILE_INTERVAL_MS мс знімає стеки всіх
+потоків процесу (sys._current_frames) і рахує функції:
+  сумарний час (cumulative) - функція є в стеку
+  власний час (self)        - функція на вершині стеку
+Заміри потоків, що чекають (select циклу подій, черга пулу, Event.wait),
+рахуються окремо як простій і в гарячі функції не потрапляють.
+Вартість не залежить від кількості викликів у коді - тільки від частоти
+замірів і глибини стеків, тому профіль можна знімати в продакшені.
+
+tracemalloc на час профілю записує PROFILE_TRACE_FRAMES кадрів на кожне
+виділення пам'яті; звіт показує місця, де за час профілю залишилось
+найбільше нової пам'яті. Якщо tracemalloc вже увімкнено, профіль
+використовує його і не вимикає.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from core.logger import get_logger
+
+log = get_logger("profiler").info
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "600"))
+PROFILE_TRACE_FRAMES = int(os.getenv("PROFILE_TRACE_FRAMES", "5"))
+# Рядків у кожному розділі звіту
+PROFILE_TOP = 30
+
+# Файли, вершина стеку в яких означає очікування, а не роботу
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+# Обв'язка потоків і циклу подій - є в кожному стеку, в звіт не виводиться
+_INFRA_FILES = (
+    "threading.py", os.path.join("concurrent", "futures", "thread.py"),
+    os.path.join("asyncio", "base_events.py"), os.path.join("asyncio", "events.py"),
+    os.path.join("asyncio", "runners.py"),
+)
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    # Словники самого профілера
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _is_idle(code) -> bool:
+    # Вільний потік пулу чекає задачу в C-коді черги - вершина стеку _worker
+    return code.co_filename.endswith(_IDLE_FILES) or (
+        code.co_name == "_worker" and code.co_filename.endswith(_INFRA_FILES[1])
+    )
+
+
+def short_path(path: str) -> str:
+    if path.startswith(_BASE_DIR) and "site-packages" not in path:
+        return os.path.relpath(path, _BASE_DIR)
+    return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+
+def _func_label(key: tuple[str, int, str]) -> str:
+    path, line, name = key
+    return f"{short_path(path)}:{line} {name}"
+
+
+class Profiler:
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, trace_frames: int = PROFILE_TRACE_FRAMES):
+        self.interval = interval_ms / 1000
+        self.trace_frames = trace_frames
+        # {(файл, рядок початку, функція): заміри}
+        self.cumulative: dict[tuple[str, int, str], int] = {}
+        self.own: dict[tuple[str, int, str], int] = {}
+        # {назва потоку: зайняті заміри}
+        self.threads: dict[str, int] = {}
+        self.ticks = 0
+        self.busy = 0
+        self.idle = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started_tracing = False
+        self._before: tracemalloc.Snapshot | None = None
+        self._after: tracemalloc.Snapshot | None = None
+
+    def _sample(self, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            code = frame.f_code
+            if _is_idle(code):
+                self.idle += 1
+                continue
+            self.busy += 1
+            name = names.get(thread_id, str(thread_id))
+            self.threads[name] = self.threads.get(name, 0) + 1
+            top = (code.co_filename, code.co_firstlineno, code.co_name)
+            self.own[top] = self.own.get(top, 0) + 1
+            # Рекурсивна функція рахується один раз на замір
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if key not in seen:
+                    seen.add(key)
+                    self.cumulative[key] = self.cumulative.get(key, 0) + 1
+                frame = frame.f_back
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            self._sample(own_id)
+
+    def start(self) -> None:
+        """Блокує на час першого знімку пам'яті - викликати через asyncio.to_thread."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._before = tracemalloc.take_snapshot()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        log(f"🔬 Профілювання запущено (заміри кожні {self.interval * 1000:g} мс)")
+
+    def stop(self) -> str:
+        """Зупиняє профіль і повертає текстовий звіт. Блокує - через asyncio.to_thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+        self._after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracing:
+            tracemalloc.stop()
+        log(f"🔬 Профілювання завершено: {self.duration:.1f} с, {self.busy} зайнятих замірів")
+        return self.report(current, peak)
+
+    # Звіт
+
+    def _hotspots(self, counts: dict, title: str) -> list[str]:
+        lines = [title, "   cum%  self%  функція"]
+        busy = self.busy or 1
+        ranked = sorted(
+            (item for item in counts.items() if not item[0][0].endswith(_INFRA_FILES)),
+            key=lambda item: item[1], reverse=True,
+        )
+        for key, count in ranked[:PROFILE_TOP]:
+            lines.append(
+                f"  {self.cumulative.get(key, 0) / busy * 100:5.1f}  {self.own.get(key, 0) / busy * 100:5.1f}"
+                f"  {_func_label(key)}"
+            )
+        return lines
+
+    def _allocations(self, current: int, peak: int) -> list[str]:
+        lines = [
+            f"Пам'ять (tracemalloc): зараз {current / 1024 / 1024:.1f} MB, "
+            f"пік за профіль {peak / 1024 / 1024:.1f} MB",
+            "",
+            "Місця виділення (нова пам'ять за час профілю):",
+        ]
+        if self._before is None or self._after is None:
+            return lines
+        before = self._before.filter_traces(_TRACE_FILTERS)
+        after = self._after.filter_traces(_TRACE_FILTERS)
+        for stat in after.compare_to(before, "lineno")[:PROFILE_TOP]:
+            frame = stat.traceback[0]
+            lines.append(
+                f"  {stat.size_diff / 1024:+10.1f} KB  {stat.count_diff:+8d} блоків"
+                f"  {short_path(frame.filename)}:{frame.lineno}"
+            )
+        lines += ["", "Стеки найбільших виділень:"]
+        for stat in after.compare_to(before, "traceback")[:5]:
+            lines.append(f"  {stat.size_diff / 1024:+.1f} KB")
+            lines += [f"      {short_path(f.filename)}:{f.lineno}" for f in reversed(stat.traceback)]
+        return lines
+
+    def report(self, current: int, peak: int) -> str:
+        total = (self.busy + self.idle) or 1
+        threads = ", ".join(
+            f"{name} {count}" for name, count in sorted(self.threads.items(), key=lambda item: item[1], reverse=True)
+        )
+        lines = [
+            f"Тривалість: {self.duration:.1f} с, замірів: {self.ticks} кожні {self.interval * 1000:g} мс",
+            f"Стеків потоків: {self.busy + self.idle}, з них в роботі {self.busy / total * 100:.1f}%",
+            f"Потоки (заміри в роботі): {threads or 'немає'}",
+            "",
+            *self._hotspots(self.cumulative, "Гарячі функції за сумарним часом:"),
+            "",
+            *self._hotspots(self.own, "Гарячі функції за власним часом:"),
+            "",
+            *self._allocations(current, peak),
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,360 @@
+"""
+Запис і відтворення перевірок (record/replay).
+
+Запис: всі HTTP відповіді API парсерів (aiohttp) і відповіді сторінок браузера
+(Playwright) зберігаються разом з тривалістю в gzip JSON Lines файл. Розмір тіл
+обмежений max_bytes - після ліміту записуються тільки метадані відповідей.
+
+Відтворення: ті самі відповіді віддаються парсерам з оригінальною затримкою
+(поділеною на speed) без мережі - повільну або хибну перевірку з продакшну можна
+повторити локально, профілювати і порівняти результат (benchmarks/replay.py).
+
+Формат файлу - рядок на запис:
+  {"kind": "meta", "manga": {title: url}, "results": {title: глава}, "started_at": epoch,
+   "api_urls": {назва: адреса API під час запису}}
+  {"kind": "http" | "browser", "method": "GET", "url": "...", "request": "...",
+   "status": 200, "content_type": "text/html", "elapsed": 0.41, "body": base64 | null}
+  {"kind": "http", ..., "error": "ClientConnectorError: ..."} - запит без відповіді
+
+Режим вмикається контекстом recording()/replaying() - діє на check_all і всі його задачі.
+"""
+import asyncio
+import base64
+import contextlib
+import contextvars
+import gzip
+import json
+import os
+import time
+from collections import defaultdict, deque
+
+import aiohttp
+
+from core.logger import get_logger
+
+log = get_logger("recorder").info
+
+# Автоматичний запис кожної перевірки в каталог (порожньо - вимкнено)
+RECORD_DIR = os.getenv("CHECK_RECORD_DIR", "")
+RECORD_MAX_MB = float(os.getenv("CHECK_RECORD_MAX_MB", "20"))
+# Скільки останніх записів зберігати в RECORD_DIR
+RECORD_KEEP = int(os.getenv("CHECK_RECORD_KEEP", "5"))
+
+
+def _request_key(kwargs: dict) -> str:
+    """Тіло запиту як частина ключа - POST на одну адресу з різними параметрами різні записи."""
+    payload = kwargs.get("json", kwargs.get("data"))
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str) if payload is not None else ""
+
+
+class Recorder:
+
+    def __init__(self, path: str, max_bytes: int = int(RECORD_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.meta: dict = {"kind": "meta", "started_at": time.time()}
+        self.entries: list[dict] = []
+        self.body_bytes = 0
+        self.truncated = 0
+        # Задачі читання тіл відповідей браузера
+        self.pending: set[asyncio.Task] = set()
+
+    def add(self, kind: str, method: str, url: str, request: str = "", status: int | None = None,
+            content_type: str | None = None, body: bytes | None = None, elapsed: float = 0.0,
+            error: str | None = None) -> None:
+        entry = {
+            "kind": kind, "method": method, "url": url, "request": request,
+            "status": status, "content_type": content_type, "elapsed": round(elapsed, 4), "body": None,
+        }
+        if error is not None:
+            entry["error"] = error
+        if body is not None:
+            if self.body_bytes + len(body) <= self.max_bytes:
+                entry["body"] = base64.b64encode(body).decode("ascii")
+                self.body_bytes += len(body)
+            else:
+                self.truncated += 1
+        self.entries.append(entry)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for record in [self.meta, *self.entries]:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        log(
+            f"💾 Запис перевірки: {self.path} - {len(self.entries)} відповідей, "
+            f"{self.body_bytes / 1024 / 1024:.1f} MB тіл, без тіла (ліміт): {self.truncated}"
+        )
+
+
+class Replayer:
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.meta: dict = {}
+        # {(kind, method, url, request): черга записів} - одна адреса може запитуватись кілька разів
+        self._entries: dict[tuple, deque] = defaultdict(deque)
+        self.missing = 0
+        # [(поточний префікс адреси, записаний)] - адреси API, що змінились після запису
+        self._rewrites: list[tuple[str, str]] = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["kind"] == "meta":
+                    self.meta = record
+                else:
+                    key = (record["kind"], record["method"], record["url"], record.get("request", ""))
+                    self._entries[key].append(record)
+
+    def map_urls(self, current: dict[str, str]) -> None:
+        """Зіставляє поточні адреси {назва: адреса} з записаними в meta["api_urls"] -
+        запити на поточні адреси отримують відповіді, записані під старими."""
+        recorded = self.meta.get("api_urls", {})
+        self._rewrites = [
+            (url, recorded[name]) for name, url in current.items()
+            if recorded.get(name) and recorded[name] != url
+        ]
+
+    def _recorded_url(self, url: str) -> str:
+        for prefix, recorded in self._rewrites:
+            if url.startswith(prefix):
+                return recorded + url[len(prefix):]
+        return url
+
+    def take(self, kind: str, method: str, url: str, request: str = "") -> dict | None:
+        queue = self._entries.get((kind, method, self._recorded_url(url), request))
+        if not queue:
+            self.missing += 1
+            return None
+        # Останній запис лишається - повторні запити отримують ту саму відповідь
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    async def delay(self, entry: dict) -> None:
+        if self.speed > 0 and entry.get("elapsed"):
+            await asyncio.sleep(entry["elapsed"] / self.speed)
+
+
+_ACTIVE: contextvars.ContextVar[Recorder | Replayer | None] = contextvars.ContextVar("check_recorder", default=None)
+
+
+def active() -> Recorder | Replayer | None:
+    return _ACTIVE.get()
+
+
+@contextlib.contextmanager
+def recording(path: str):
+    """Записує всі відповіді check_all в межах блоку і зберігає файл при виході."""
+    recorder = Recorder(path)
+    token = _ACTIVE.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _ACTIVE.reset(token)
+        try:
+            recorder.save()
+        except Exception as e:
+            log(f"⚠️ Не вдалось зберегти запис перевірки {path}: {e}")
+
+
+@contextlib.contextmanager
+def replaying(path: str, speed: float = 1.0):
+    replayer = Replayer(path, speed)
+    token = _ACTIVE.set(replayer)
+    try:
+        yield replayer
+    finally:
+        _ACTIVE.reset(token)
+
+
+def new_recording_path() -> str:
+    """Шлях для автоматичного запису в RECORD_DIR, старі записи понад RECORD_KEEP видаляються."""
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    old = sorted(f for f in os.listdir(RECORD_DIR) if f.endswith(".jsonl.gz"))
+    for name in old[:max(0, len(old) - RECORD_KEEP + 1)]:
+        os.remove(os.path.join(RECORD_DIR, name))
+    return os.path.join(RECORD_DIR, time.strftime("check-%Y%m%d-%H%M%S") + f"-{os.getpid()}.jsonl.gz")
+
+
+# HTTP (aiohttp)
+
+class _RecordedRequest:
+    """async with session.get(...) as r - читає тіло одразу, щоб записати його з тривалістю запиту."""
+
+    def __init__(self, recorder: Recorder, request_cm, method: str, url: str, request: str):
+        self._recorder = recorder
+        self._request_cm = request_cm
+        self._method, self._url, self._request = method, url, request
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        try:
+            response = await self._request_cm.__aenter__()
+        except Exception as e:
+            self._record_error(e, start)
+            raise
+        try:
+            body = await response.read()
+        except BaseException as e:
+            # Запит вже відкрито, а __aexit__ після помилки в __aenter__ не викликається -
+            # відпускаємо відповідь і з'єднання тут
+            if isinstance(e, Exception):
+                self._record_error(e, start)
+            await self._request_cm.__aexit__(type(e), e, e.__traceback__)
+            raise
+        self._recorder.add("http", self._method, self._url, self._request, response.status,
+                           response.content_type, body, time.monotonic() - start)
+        return response
+
+    def _record_error(self, e: Exception, start: float) -> None:
+        self._recorder.add("http", self._method, self._url, self._request,
+                           elapsed=time.monotonic() - start, error=f"{type(e).__name__}: {e}")
+
+    async def __aexit__(self, *exc):
+        return await self._request_cm.__aexit__(*exc)
+
+
+class _RecordingSession:
+
+    def __init__(self, recorder: Recorder, **kwargs):
+        self._recorder = recorder
+        self._session = aiohttp.ClientSession(**kwargs)
+
+    def _request(self, method: str, url: str, **kwargs):
+        request_cm = self._session.request(method, url, **kwargs)
+        return _RecordedRequest(self._recorder, request_cm, method, str(url), _request_key(kwargs))
+
+    def get(self, url: str, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    async def __aenter__(self):
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._session.__aexit__(*exc)
+
+
+class _ReplayResponse:
+
+    def __init__(self, entry: dict):
+        self.status = entry["status"]
+        self.content_type = entry.get("content_type") or "application/octet-stream"
+        self.url = entry["url"]
+        self._body = base64.b64decode(entry["body"]) if entry.get("body") else b""
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientError(f"{self.status}, url={self.url} (запис)")
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode("utf-8", errors="replace")
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+class _ReplayRequest:
+
+    def __init__(self, replayer: Replayer, method: str, url: str, request: str):
+        self._replayer = replayer
+        self._method, self._url, self._request = method, url, request
+
+    async def __aenter__(self):
+        entry = self._replayer.take("http", self._method, self._url, self._request)
+        if entry is None:
+            raise aiohttp.ClientConnectionError(f"немає в записі: {self._method} {self._url}")
+        await self._replayer.delay(entry)
+        if "error" in entry:
+            raise aiohttp.ClientConnectionError(entry["error"])
+        if entry.get("body") is None and entry.get("status") == 200:
+            raise aiohttp.ClientConnectionError(f"тіло не записано (ліміт розміру): {self._url}")
+        return _ReplayResponse(entry)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _ReplaySession:
+
+    def __init__(self, replayer: Replayer):
+        self._replayer = replayer
+
+    def get(self, url: str, **kwargs):
+        return _ReplayRequest(self._replayer, "GET", str(url), _request_key(kwargs))
+
+    def post(self, url: str, **kwargs):
+        return _ReplayRequest(self._replayer, "POST", str(url), _request_key(kwargs))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def client_session(**kwargs):
+    """aiohttp.ClientSession для парсерів - в режимі запису/відтворення відповідна обгортка."""
+    mode = active()
+    if isinstance(mode, Recorder):
+        return _RecordingSession(mode, **kwargs)
+    if isinstance(mode, Replayer):
+        return _ReplaySession(mode)
+    return aiohttp.ClientSession(**kwargs)
+
+
+# Браузер (Playwright)
+
+async def attach_page(page, is_blocked) -> None:
+    """Підключає запис або відтворення до сторінки. is_blocked(request) - фільтр ресурсів парсера."""
+    mode = active()
+    if isinstance(mode, Recorder):
+        async def _on_finished(request):
+            try:
+                response = await request.response()
+                if response is None:
+                    return
+                body = await response.body()
+                end = request.timing.get("responseEnd", -1)
+                mode.add("browser", request.method, request.url, request.post_data or "", response.status,
+                         response.headers.get("content-type"), body, max(end, 0) / 1000)
+            except Exception:
+                # Редіректи і скасовані запити тіла не мають
+                pass
+
+        def _track(request):
+            task = asyncio.ensure_future(_on_finished(request))
+            mode.pending.add(task)
+            task.add_done_callback(mode.pending.discard)
+
+        page.on("requestfinished", _track)
+
+    elif isinstance(mode, Replayer):
+        async def _fulfill(route):
+            request = route.request
+            if is_blocked(request):
+                await route.abort()
+                return
+            entry = mode.take("browser", request.method, request.url, request.post_data or "")
+            if entry is None or entry.get("body") is None:
+                await route.abort()
+                return
+            await mode.delay(entry)
+            headers = {"content-type": entry["content_type"]} if entry.get("content_type") else {}
+            await route.fulfill(status=entry["status"], headers=headers, body=base64.b64decode(entry["body"]))
+
+        # Зареєстрований пізніше маршрут виконується першим - мережа не використовується
+        await page.route("**/*", _fulfill)
+
+
+async def drain() -> None:
+    """Чекає запису тіл відповідей браузера - викликати перед закриттям сторінки."""
+    mode = active()
+    if isinstance(mode, Recorder) and mode.pending:
+        await asyncio.gather(*list(mode.pending), return_exceptions=True)
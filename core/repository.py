@@ -4,21 +4,83 @@
 Структура БД:
   Колекція manga:
     - Кожна манга окремий документ:
-      {"_id": ObjectId, "user_id": "123", "title": "...", "url": "...", "last_chapter": "199"}
+      {"_id": ObjectId, "user_id": "123", "title": "...", "url": "...", "last_chapter": "199",
+       "released_at": [1771581600, ...], "checked_at": 1771581600, "tracked_since": 1771581600,
+       "lock_token": 7}
+    - released_at - час останніх RELEASE_HISTORY_SIZE змін глави (для core.cadence)
+    - lock_token - токен блокування перевірки, з яким документ записано востаннє (фенсинг)
 
   Колекція meta:
     - Дата перевірки окремо для кожного користувача:
       {"_id": "1431783762", "last_check_date": "2026-02-20"}
+
+  Колекція locks:
+    - Розподілені блокування (оренди) між репліками бота:
+      {"_id": "check:1431783762", "owner": "host:pid:abcd", "token": 7, "expires_at": datetime}
+
+  Колекція check_runs:
+    - Чекпоінти перевірок - результат кожної манги записується як тільки готовий,
+      перервана перевірка (перезапуск, деплой) продовжується з місця зупинки:
+      {"_id": "a1b2...", "user_id": "123", "status": "running" | "done" | "abandoned",
+       "titles": ["..."], "results": [{"title": "...", "chapter": "199"}],
+       "started_at": datetime, "finished_at": datetime, "lock_token": 7,
+       "timings": [{"domain": "zenko.online", "phase": "api", "count": 12, ...}]}
+    - timings - гістограми фаз завершеної перевірки (core.timing)
+
+  Колекція chapter_history:
+    - Історія виходу глав - один документ (бакет) на мангу на місяць, масив подій
+      обмежений HISTORY_BUCKET_SIZE, бакет видаляється TTL індексом через HISTORY_RETENTION_DAYS:
+      {"user_id": "123", "title": "...", "month": "2026-02", "count": 3, "last_at": 1771581600,
+       "events": [{"chapter": "199", "detected_at": 1771581600, "method": "api", "latency": 0.4}],
+       "expires_at": datetime}
+
+Один AsyncIOMotorClient (і один пул з'єднань) на процес - створюється при першому
+запиті репозиторію. MongoRepository - легкий "вид" користувача над спільним клієнтом,
+тому сотні користувачів коштують один пул.
 """
+import asyncio
 import os
+import socket
+import sys
+import time
+import uuid
 from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from core.logger import get_logger
+from core.metrics import timed_repository
 
 _BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(_BASE_DIR, ".env"))
 
+log = get_logger("repository").info
+
+# Ідентифікатор цього процесу як власника блокувань
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Скільки останніх змін глави зберігати для оцінки частоти виходу
+RELEASE_HISTORY_SIZE = int(os.getenv("RELEASE_HISTORY_SIZE", "12"))
+
+# Історія глав: скільки днів зберігати і максимум подій в бакеті (манга + місяць)
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "365"))
+HISTORY_BUCKET_SIZE = 100
+
+
+class LeaseLost(Exception):
+    """Запис перевірки відхилено - документ вже записав власник блокування з новішим токеном."""
+
+
 class AbstractRepository(ABC):
+    """
+    Записи перевірки (update_chapter, set_checked_at і записи check_runs) приймають
+    fence - токен блокування перевірки. Сховище записує його в документ і відхиляє
+    запис з меншим токеном: процес, що втратив блокування, не перезапише результати
+    нового власника. Mongo в такому разі кидає LeaseLost, SQLite пропускає запис мовчки.
+    """
 
     @abstractmethod
     async def setup(self) -> None:
@@ -37,7 +99,10 @@ class AbstractRepository(ABC):
         pass
 
     @abstractmethod
-    async def update_chapter(self, title: str, chapter: str) -> None:
+    async def update_chapter(
+        self, title: str, chapter: str, record_release: bool = True, fence: int | None = None,
+    ) -> None:
+        """record_release=False - перше визначення глави після додавання, а не вихід нової."""
         pass
 
     @abstractmethod
@@ -45,9 +110,125 @@ class AbstractRepository(ABC):
         pass
 
     @abstractmethod
-    def close(self) -> None:
+    async def set_checked_at(self, titles: list[str], checked_at: float, fence: int | None = None) -> None:
+        """Час успішної перевірки манг - одним запитом для всього списку."""
+        pass
+
+    @abstractmethod
+    async def list_user_ids(self) -> list[str]:
+        """Всі користувачі в сховищі - для перевірки в режимі багатьох користувачів."""
+        pass
+
+    @abstractmethod
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> int | None:
+        """Бере оренду name якщо вона вільна або прострочена (навіть той самий owner
+        не може взяти її двічі). Повертає токен (зростає з кожним захопленням) або None."""
+        pass
+
+    @abstractmethod
+    async def renew_lease(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        """Продовжує оренду. False - оренду вже захопив хтось інший."""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, name: str, owner: str, token: int) -> None:
+        pass
+
+    @abstractmethod
+    async def start_check_run(self, run_id: str, titles: list[str], fence: int | None = None) -> None:
+        """Створює запис перевірки. Попередні незавершені перевірки користувача закриваються."""
+        pass
+
+    @abstractmethod
+    async def save_check_result(self, run_id: str, title: str, chapter: str, fence: int | None = None) -> None:
         pass
 
+    @abstractmethod
+    async def finish_check_run(
+        self, run_id: str, timings: list[dict] | None = None, fence: int | None = None,
+    ) -> None:
+        """timings - гістограми фаз перевірки (core.timing.RunTimings.to_list())."""
+        pass
+
+    @abstractmethod
+    async def get_check_timings(self, limit: int = 10) -> list[list[dict]]:
+        """Таймінги останніх limit завершених перевірок користувача, нові першими."""
+        pass
+
+    @abstractmethod
+    async def get_unfinished_check_run(self) -> dict | None:
+        """Остання перервана перевірка користувача:
+        {"run_id": "...", "titles": [...], "results": {title: глава}, "started_at": datetime UTC}"""
+        pass
+
+    @abstractmethod
+    async def add_chapter_history(
+        self, title: str, chapter: str, detected_at: float,
+        method: str | None = None, latency: float | None = None,
+    ) -> None:
+        """method - як знайдено главу (api, browser), latency - тривалість перевірки в секундах."""
+        pass
+
+    @abstractmethod
+    async def get_title_history(self, title: str, limit: int = 10) -> list[dict]:
+        """Останні limit подій манги, нові першими:
+        [{"chapter", "detected_at", "method", "latency"}]"""
+        pass
+
+    @abstractmethod
+    async def get_history_feed(self, limit: int = 10) -> list[dict]:
+        """Останні limit подій по всіх мангах користувача, нові першими (з ключем "title")."""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Дописує незавершені записи - викликати до close_shared()."""
+        pass
+
+
+# Скільки зберігати завершені записи перевірок (TTL індекс)
+CHECK_RUN_RETENTION_SECONDS = 30 * 24 * 3600
+
+# Спільні клієнти: {uri: AsyncIOMotorClient}
+_MONGO_CLIENTS: dict[str, AsyncIOMotorClient] = {}
+# Колекції для яких індекси вже створені цим процесом: {(uri, db, collection)}
+_INDEXED: set[tuple[str, str, str]] = set()
+
+
+def get_mongo_client(uri: str) -> AsyncIOMotorClient:
+    """Повертає спільний клієнт для uri, створює його при першому виклику.
+    Розмір пулу налаштовується через MONGODB_MAX_POOL_SIZE / MONGODB_MIN_POOL_SIZE."""
+    client = _MONGO_CLIENTS.get(uri)
+    if client is None:
+        client = AsyncIOMotorClient(
+            uri,
+            maxPoolSize=int(os.getenv("MONGODB_MAX_POOL_SIZE", "10")),
+            minPoolSize=int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+            maxIdleTimeMS=int(os.getenv("MONGODB_MAX_IDLE_MS", "60000")),
+            serverSelectionTimeoutMS=10000,
+            connectTimeoutMS=10000,
+            socketTimeoutMS=20000,
+        )
+        _MONGO_CLIENTS[uri] = client
+    return client
+
+
+async def close_shared() -> None:
+    """Закриває спільні клієнти всіх бекендів - викликати один раз при зупинці бота."""
+    for client in _MONGO_CLIENTS.values():
+        client.close()
+    _MONGO_CLIENTS.clear()
+    _INDEXED.clear()
+    # SQLite модуль імпортується тільки якщо його вибрано в REPOSITORY_BACKEND
+    sqlite_repository = sys.modules.get("core.sqlite_repository")
+    if sqlite_repository is not None:
+        await sqlite_repository.close_stores()
+
+
+def _fenced(fence: int | None) -> dict:
+    """Умова фільтра: документ не записано власником з новішим токеном блокування."""
+    return {} if fence is None else {"lock_token": {"$not": {"$gt": fence}}}
+
 
 class MongoRepository(AbstractRepository):
     """
@@ -57,22 +238,34 @@ class MongoRepository(AbstractRepository):
     """
 
     def __init__(self, uri: str, db_name: str, user_id: str,
-                 manga_col: str = "manga", meta_col: str = "meta"):
-        self.client = AsyncIOMotorClient(
-            uri,
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=10000,
-            socketTimeoutMS=20000,
-        )
+                 manga_col: str = "manga", meta_col: str = "meta", locks_col: str = "locks",
+                 runs_col: str = "check_runs", history_col: str = "chapter_history"):
+        self.uri = uri
+        self.client = get_mongo_client(uri)
         db = self.client[db_name]
         self.manga_col = db[manga_col]
         self.meta_col = db[meta_col]
+        self.locks_col = db[locks_col]
+        self.runs_col = db[runs_col]
+        self.history_col = db[history_col]
         self.user_id = str(user_id)
 
     async def setup(self) -> None:
-        """Створює індекси при старті бота.
+        """Створює індекси - один раз на процес, навіть якщо репозиторіїв багато.
         MongoDB пропускає створення якщо індекс вже існує безпечно викликати кожен раз."""
+        key = (self.uri, self.manga_col.database.name, self.manga_col.name)
+        if key in _INDEXED:
+            return
         await self.manga_col.create_index([("user_id", 1), ("title", 1)])
+        # Прострочені блокування видаляються через добу - до того токен зберігається
+        # і продовжує зростати, тож токени монотонні
+        await self.locks_col.create_index("expires_at", expireAfterSeconds=24 * 3600)
+        await self.runs_col.create_index([("user_id", 1), ("status", 1), ("started_at", -1)])
+        await self.runs_col.create_index("finished_at", expireAfterSeconds=CHECK_RUN_RETENTION_SECONDS)
+        await self.history_col.create_index([("user_id", 1), ("title", 1), ("month", -1)], unique=True)
+        await self.history_col.create_index([("user_id", 1), ("last_at", -1)])
+        await self.history_col.create_index("expires_at", expireAfterSeconds=0)
+        _INDEXED.add(key)
 
     async def load(self) -> dict:
         """Завантажує всі манги і дату перевірки для поточного користувача"""
@@ -82,6 +275,9 @@ class MongoRepository(AbstractRepository):
             manga[doc["title"]] = {
                 "url": doc["url"],
                 "last_chapter": doc.get("last_chapter", "невідомо"),
+                "released_at": doc.get("released_at", []),
+                "checked_at": doc.get("checked_at"),
+                "tracked_since": doc.get("tracked_since"),
             }
 
         # Дата перевірки
@@ -98,17 +294,46 @@ class MongoRepository(AbstractRepository):
                 "title": title,
                 "url": url,
                 "last_chapter": "невідомо",
-            }},
+                "released_at": [],
+                "tracked_since": time.time(),
+            }, "$unset": {"checked_at": ""}},
             upsert=True
         )
 
     async def remove_manga(self, title: str) -> None:
         await self.manga_col.delete_one({"user_id": self.user_id, "title": title})
+        await self.history_col.delete_many({"user_id": self.user_id, "title": title})
 
-    async def update_chapter(self, title: str, chapter: str) -> None:
-        await self.manga_col.update_one(
-            {"user_id": self.user_id, "title": title},
-            {"$set": {"last_chapter": chapter}}
+    async def _check_fence(self, col, query: dict, result, fence: int | None) -> None:
+        """Запис нічого не змінив - LeaseLost, якщо причина в новішому токені, а не у відсутності документа."""
+        if fence is None or result.matched_count:
+            return
+        if await col.find_one({**query, "lock_token": {"$gt": fence}}, {"_id": 1}) is not None:
+            raise LeaseLost(f"{col.name}: документ записано з новішим токеном ніж {fence}")
+
+    async def update_chapter(
+        self, title: str, chapter: str, record_release: bool = True, fence: int | None = None,
+    ) -> None:
+        update = {"$set": {"last_chapter": chapter}}
+        if fence is not None:
+            update["$set"]["lock_token"] = fence
+        if record_release:
+            # $slice тримає масив обмеженим - документ не росте з кожною главою
+            update["$push"] = {"released_at": {"$each": [time.time()], "$slice": -RELEASE_HISTORY_SIZE}}
+        query = {"user_id": self.user_id, "title": title}
+        result = await self.manga_col.update_one({**query, **_fenced(fence)}, update)
+        await self._check_fence(self.manga_col, query, result, fence)
+
+    async def set_checked_at(self, titles: list[str], checked_at: float, fence: int | None = None) -> None:
+        if not titles:
+            return
+        update = {"checked_at": checked_at}
+        if fence is not None:
+            update["lock_token"] = fence
+        # $min заповнює tracked_since для манг доданих до появи цього поля
+        await self.manga_col.update_many(
+            {"user_id": self.user_id, "title": {"$in": titles}, **_fenced(fence)},
+            {"$set": update, "$min": {"tracked_since": checked_at}},
         )
 
     async def set_last_check_date(self, date: str) -> None:
@@ -118,23 +343,311 @@ class MongoRepository(AbstractRepository):
             upsert=True
         )
 
-    def close(self) -> None:
-        self.client.close()
+    async def list_user_ids(self) -> list[str]:
+        return [str(uid) for uid in await self.manga_col.distinct("user_id")]
 
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> int | None:
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await self.locks_col.find_one_and_update(
+                {"_id": name, "expires_at": {"$lt": now}},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}, "$inc": {"token": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Документ існує і не підходить під фільтр - оренда зайнята
+            return None
+        return doc["token"]
 
-def get_repository(user_id: str | None = None) -> AbstractRepository:
+    async def renew_lease(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        result = await self.locks_col.update_one(
+            {"_id": name, "owner": owner, "token": token},
+            {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl)}},
+        )
+        return result.matched_count == 1
+
+    async def release_lease(self, name: str, owner: str, token: int) -> None:
+        # Документ не видаляється - токен має продовжувати зростати
+        await self.locks_col.update_one(
+            {"_id": name, "owner": owner, "token": token},
+            {"$set": {"expires_at": datetime.now(timezone.utc)}},
+        )
+
+    async def start_check_run(self, run_id: str, titles: list[str], fence: int | None = None) -> None:
+        now = datetime.now(timezone.utc)
+        # Перевірку нового власника блокування старий не закриває
+        await self.runs_col.update_many(
+            {"user_id": self.user_id, "status": "running", **_fenced(fence)},
+            {"$set": {"status": "abandoned", "finished_at": now}},
+        )
+        doc = {
+            "_id": run_id,
+            "user_id": self.user_id,
+            "status": "running",
+            "titles": titles,
+            "results": [],
+            "started_at": now,
+        }
+        if fence is not None:
+            doc["lock_token"] = fence
+        await self.runs_col.insert_one(doc)
+
+    async def save_check_result(self, run_id: str, title: str, chapter: str, fence: int | None = None) -> None:
+        update = {"$push": {"results": {"title": title, "chapter": chapter}}}
+        if fence is not None:
+            # Новий власник, що продовжує перервану перевірку, піднімає токен запису
+            update["$set"] = {"lock_token": fence}
+        # Масив, а не словник - назви можуть містити "." і "$"
+        query = {"_id": run_id, "status": "running"}
+        result = await self.runs_col.update_one({**query, **_fenced(fence)}, update)
+        await self._check_fence(self.runs_col, query, result, fence)
+
+    async def finish_check_run(
+        self, run_id: str, timings: list[dict] | None = None, fence: int | None = None,
+    ) -> None:
+        update = {"status": "done", "finished_at": datetime.now(timezone.utc)}
+        if timings is not None:
+            update["timings"] = timings
+        if fence is not None:
+            update["lock_token"] = fence
+        query = {"_id": run_id}
+        result = await self.runs_col.update_one({**query, **_fenced(fence)}, {"$set": update})
+        await self._check_fence(self.runs_col, query, result, fence)
+
+    async def get_check_timings(self, limit: int = 10) -> list[list[dict]]:
+        cursor = self.runs_col.find(
+            {"user_id": self.user_id, "status": "done", "timings": {"$exists": True}},
+            {"timings": 1},
+        ).sort("started_at", -1).limit(limit)
+        return [doc["timings"] async for doc in cursor]
+
+    async def add_chapter_history(
+        self, title: str, chapter: str, detected_at: float,
+        method: str | None = None, latency: float | None = None,
+    ) -> None:
+        detected = datetime.fromtimestamp(detected_at, timezone.utc)
+        event = {"chapter": chapter, "detected_at": detected_at, "method": method, "latency": latency}
+        await self.history_col.update_one(
+            {"user_id": self.user_id, "title": title, "month": detected.strftime("%Y-%m")},
+            {
+                "$push": {"events": {"$each": [event], "$slice": -HISTORY_BUCKET_SIZE}},
+                "$inc": {"count": 1},
+                "$max": {"last_at": detected_at},
+                "$set": {"expires_at": detected + timedelta(days=HISTORY_RETENTION_DAYS)},
+            },
+            upsert=True,
+        )
+
+    async def get_title_history(self, title: str, limit: int = 10) -> list[dict]:
+        # Кожен бакет містить хоча б одну подію - limit бакетів по limit подій завжди досить
+        cursor = self.history_col.find(
+            {"user_id": self.user_id, "title": title},
+            {"events": {"$slice": -limit}},
+        ).sort("month", -1).limit(limit)
+        events = []
+        async for doc in cursor:
+            events.extend(reversed(doc["events"]))
+            if len(events) >= limit:
+                break
+        return events[:limit]
+
+    async def get_history_feed(self, limit: int = 10) -> list[dict]:
+        # limit бакетів з найновішими подіями гарантовано містять limit найновіших подій
+        cursor = self.history_col.find(
+            {"user_id": self.user_id},
+            {"title": 1, "events": {"$slice": -limit}},
+        ).sort("last_at", -1).limit(limit)
+        events = [{"title": doc["title"], **event} async for doc in cursor for event in doc["events"]]
+        events.sort(key=lambda e: e["detected_at"], reverse=True)
+        return events[:limit]
+
+    async def get_unfinished_check_run(self) -> dict | None:
+        doc = await self.runs_col.find_one(
+            {"user_id": self.user_id, "status": "running"},
+            sort=[("started_at", -1)],
+        )
+        if doc is None:
+            return None
+        # Motor повертає naive datetime в UTC
+        return {
+            "run_id": doc["_id"],
+            "titles": doc["titles"],
+            "results": {r["title"]: r["chapter"] for r in doc.get("results", [])},
+            "started_at": doc["started_at"].replace(tzinfo=timezone.utc),
+        }
+
+    async def close(self) -> None:
+        """Вид користувача не володіє клієнтом - спільний пул закриває close_shared()."""
+        pass
+
+
+class Lease:
+    """
+    Розподілене блокування з TTL поверх AbstractRepository.
+    Поки блокування утримується, heartbeat продовжує його кожну третину TTL.
+    valid стає False, якщо блокування забрала інша репліка або з останнього
+    успішного продовження минуло ttl - margin (сховище недоступне, процес завис) -
+    раніше, ніж документ блокування прострочиться і його зможе взяти інша репліка.
+    Токен зростає з кожним захопленням і служить фенсинг-токеном: записи перевірки
+    передають його як fence, і сховище відхиляє запис процесу, що завис довше TTL,
+    якщо документ вже записав новий власник (LeaseLost).
+
+        lease = Lease(repo, f"check:{user_id}")
+        if await lease.acquire():
+            try: ...
+            finally: await lease.release()
+    """
+
+    def __init__(self, repo: AbstractRepository, name: str, ttl: float = 120, owner: str = PROCESS_OWNER,
+                 margin: float | None = None):
+        self.repo = repo
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner
+        # Запас на розбіжність годинників і затримку запиту до сховища
+        self.margin = ttl / 6 if margin is None else margin
+        self.token: int | None = None
+        self.lost = False
+        # Помилка сховища при останньому acquire() - блокування не зайняте, а недоступне
+        self.error: Exception | None = None
+        # time.monotonic() початку останнього успішного захоплення або продовження
+        self._renewed_at = 0.0
+        self._heartbeat_task: asyncio.Task | None = None
+
+    @property
+    def remaining(self) -> float:
+        """Секунд до моменту, коли блокування вважається втраченим без продовження."""
+        return self._renewed_at + self.ttl - self.margin - time.monotonic()
+
+    @property
+    def valid(self) -> bool:
+        # Перевірка часу - і на випадок, коли heartbeat не встиг виконатись (завис цикл подій)
+        return self.token is not None and not self.lost and self.remaining > 0
+
+    async def acquire(self) -> bool:
+        started = time.monotonic()
+        self.error = None
+        try:
+            self.token = await self.repo.acquire_lease(self.name, self.owner, self.ttl)
+        except Exception as e:
+            log(f"⚠️ Блокування {self.name}: не вдалось захопити: {e!r}")
+            self.token = None
+            self.error = e
+        if self.token is None:
+            return False
+        self.lost = False
+        self._renewed_at = started
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return True
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(max(0.0, min(self.ttl / 3, self.remaining)))
+            if self.remaining <= 0:
+                log(f"⚠️ Блокування {self.name} (токен {self.token}) давно не продовжено - вважаємо втраченим")
+                self.lost = True
+                return
+            # Сховище продовжує від моменту обробки запиту - відлік від його початку з запасом
+            started = time.monotonic()
+            try:
+                renewed = await asyncio.wait_for(
+                    self.repo.renew_lease(self.name, self.owner, self.token, self.ttl), self.remaining
+                )
+            except Exception as e:
+                log(f"⚠️ Блокування {self.name}: heartbeat не вдався: {e!r}")
+                continue
+            if not renewed:
+                log(f"⚠️ Блокування {self.name} (токен {self.token}) втрачено")
+                self.lost = True
+                return
+            self._renewed_at = started
+
+    async def release(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        if self.token is None:
+            return
+        try:
+            await self.repo.release_lease(self.name, self.owner, self.token)
+        except Exception as e:
+            log(f"⚠️ Блокування {self.name}: не вдалось звільнити (звільниться через TTL): {e}")
+        self.token = None
+
+
+class LeaderElector:
+    """
+    Вибір лідера між репліками - тільки лідер виконує фонові задачі (планувальник).
+    Лідерство - це та сама оренда: лідер продовжує її heartbeat'ом, інші репліки
+    пробують захопити її при кожному виклику is_leader() і стають лідером
+    коли попередній зник (оренда прострочилась).
+    """
+
+    def __init__(self, repo: AbstractRepository, name: str = "leader:scheduler", ttl: float = 60):
+        self._lease = Lease(repo, name, ttl)
+
+    async def is_leader(self) -> bool:
+        if self._lease.valid:
+            return True
+        if self._lease.token is not None:
+            # Лідерство втрачено - зупиняємо heartbeat перед новою спробою
+            await self._lease.release()
+        return await self._lease.acquire()
+
+    async def resign(self) -> None:
+        await self._lease.release()
+
+
+def _get_mongo_repository(user_id: str) -> MongoRepository:
     uri = os.getenv("MONGODB_URI")
     if not uri:
         raise ValueError("MONGODB_URI не вказано в .env")
     db_name = os.getenv("MONGODB_DB", "Manga")
     manga_col = os.getenv("MONGODB_MANGA_COLLECTION", "manga")
     meta_col = os.getenv("MONGODB_META_COLLECTION", "meta")
-    if user_id is None:
-        raise ValueError("user_id не вказано - передай явно або перевір TELEGRAM_CHAT_ID в .env")
+    locks_col = os.getenv("MONGODB_LOCKS_COLLECTION", "locks")
+    runs_col = os.getenv("MONGODB_RUNS_COLLECTION", "check_runs")
+    history_col = os.getenv("MONGODB_HISTORY_COLLECTION", "chapter_history")
     return MongoRepository(
         uri=uri,
         db_name=db_name,
         user_id=user_id,
         manga_col=manga_col,
         meta_col=meta_col,
-    )
\ No newline at end of file
+        locks_col=locks_col,
+        runs_col=runs_col,
+        history_col=history_col,
+    )
+
+
+def get_repository(user_id: str | None = None) -> AbstractRepository:
+    """Створює репозиторій за REPOSITORY_BACKEND з .env:
+    mongo  - MongoDB Atlas (за замовчуванням)
+    sqlite - локальна БД SQLite
+    mirror - Atlas + локальна копія SQLite для читання
+    З METRICS_PORT тривалість кожної операції йде в метрики (core.metrics).
+    """
+    if user_id is None:
+        raise ValueError("user_id не вказано - передай явно або перевір TELEGRAM_CHAT_ID в .env")
+    return timed_repository(_create_repository(user_id))
+
+
+def _create_repository(user_id: str) -> AbstractRepository:
+    backend = os.getenv("REPOSITORY_BACKEND", "mongo").lower()
+    if backend == "mongo":
+        return _get_mongo_repository(user_id)
+
+    from core.sqlite_repository import SqliteRepository, MirroredRepository
+
+    local = SqliteRepository(
+        path=os.getenv("SQLITE_PATH", os.path.join(_BASE_DIR, "data", "manga.db")),
+        user_id=user_id,
+        batch_size=int(os.getenv("SQLITE_BATCH_SIZE", "50")),
+        flush_interval=float(os.getenv("SQLITE_FLUSH_INTERVAL", "0.5")),
+    )
+    if backend == "sqlite":
+        return local
+    if backend == "mirror":
+        return MirroredRepository(remote=_get_mongo_repository(user_id), local=local)
+    raise ValueError(f"Невідомий REPOSITORY_BACKEND: {backend} (mongo, sqlite або mirror)")
@@ -0,0 +1,194 @@
+"""
+Фоновий збір показників процесу в кільцевий буфер фіксованого розміру.
+
+Одна задача кожні SAMPLE_INTERVAL секунд записує:
+  rss_mb      - RAM процесу бота
+  total_mb    - RAM разом з дочірніми процесами (Chromium)
+  cpu         - CPU процесу з попереднього заміру (%), без очікування
+  connections - відкриті мережеві з'єднання процесу
+  lag_ms      - затримка циклу подій: на скільки пізніше запланованого прокинувся sleep
+
+Останню годину зберігає кожен замір, останню добу - агрегати по хвилинах
+(максимум, для CPU - середнє). Буфери - array('d') фіксованої довжини,
+пам'ять не росте з часом роботи. /stats будується з історії без замірів на вимогу.
+"""
+import asyncio
+import functools
+import math
+import os
+import time
+from array import array
+
+from core.logger import get_logger
+
+log = get_logger("sampler").info
+
+SAMPLE_INTERVAL = float(os.getenv("SAMPLE_INTERVAL", "5"))
+
+FIELDS = ("rss_mb", "total_mb", "cpu", "connections", "lag_ms")
+# Поля, які в хвилинних агрегатах усереднюються (інші - максимум)
+_MEAN_FIELDS = {"cpu"}
+
+HOUR = 3600
+DAY = 24 * 3600
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+
+@functools.cache
+def process():
+    """psutil.Process цього процесу - psutil імпортується і процес відкривається
+    при першому замірі, а не при імпорті бота."""
+    import psutil
+    return psutil.Process()
+
+
+def total_ram_mb() -> float:
+    """RAM Python процесу + всі дочірні процеси (Chromium тощо)."""
+    import psutil
+    try:
+        total = process().memory_info().rss
+        for child in process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total / 1024 / 1024
+    except Exception:
+        return process().memory_info().rss / 1024 / 1024
+
+
+class RingBuffer:
+    """Кільцевий буфер на capacity записів: час і по масиву на кожне поле."""
+
+    def __init__(self, capacity: int, fields: tuple[str, ...] = FIELDS):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in fields}
+        self.size = 0
+        self._next = 0
+
+    def append(self, ts: float, values: dict[str, float]) -> None:
+        i = self._next
+        self.times[i] = ts
+        for field, column in self.columns.items():
+            column[i] = values.get(field, 0.0)
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _indices(self):
+        start = (self._next - self.size) % self.capacity
+        for k in range(self.size):
+            yield (start + k) % self.capacity
+
+    def window(self, field: str, since: float) -> list[tuple[float, float]]:
+        """[(час, значення)] від since, старі першими."""
+        column = self.columns[field]
+        return [(self.times[i], column[i]) for i in self._indices() if self.times[i] >= since]
+
+    def last(self, field: str) -> float | None:
+        if not self.size:
+            return None
+        return self.columns[field][(self._next - 1) % self.capacity]
+
+
+class Sampler:
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.started_at = time.time()
+        self.recent = RingBuffer(max(1, math.ceil(HOUR / interval)))
+        self.daily = RingBuffer(DAY // 60)
+        self._minute: list[dict[str, float]] = []
+        self._minute_start = 0.0
+
+    def _measure(self) -> dict[str, float]:
+        """Виконується в потоці - обхід дерева процесів не блокує цикл подій."""
+        import psutil
+        rss = process().memory_info().rss / 1024 / 1024
+        try:
+            connections = len(process().net_connections())
+        except psutil.Error:
+            connections = 0
+        return {
+            "rss_mb": rss,
+            "total_mb": total_ram_mb(),
+            "cpu": process().cpu_percent(None),
+            "connections": connections,
+        }
+
+    def add(self, ts: float, values: dict[str, float]) -> None:
+        self.recent.append(ts, values)
+        if self._minute and ts - self._minute_start >= 60:
+            self._flush_minute()
+        if not self._minute:
+            self._minute_start = ts
+        self._minute.append(values)
+
+    def _flush_minute(self) -> None:
+        aggregate = {}
+        for field in FIELDS:
+            samples = [values.get(field, 0.0) for values in self._minute]
+            aggregate[field] = sum(samples) / len(samples) if field in _MEAN_FIELDS else max(samples)
+        self.daily.append(self._minute_start, aggregate)
+        self._minute = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Перший виклик cpu_percent(None) повертає 0 - далі CPU від попереднього заміру.
+        # Тут, а не в конструкторі - бот створює семплер при імпорті
+        process().cpu_percent(None)
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            try:
+                values = await asyncio.to_thread(self._measure)
+            except Exception as e:
+                log(f"⚠️ Семплер: помилка заміру: {e}")
+                continue
+            values["lag_ms"] = lag * 1000
+            self.add(time.time(), values)
+
+    # Читання історії
+
+    def latest(self, field: str) -> float | None:
+        return self.recent.last(field)
+
+    def series(self, field: str, seconds: float) -> list[tuple[float, float]]:
+        since = time.time() - seconds
+        if seconds <= HOUR:
+            return self.recent.window(field, since)
+        # Незакрита хвилина ще не в добовому буфері - додаємо заміри з години
+        daily = self.daily.window(field, since)
+        tail_since = daily[-1][0] + 60 if daily else since
+        return daily + self.recent.window(field, tail_since)
+
+    def summary(self, field: str, seconds: float) -> dict[str, float] | None:
+        values = sorted(value for _, value in self.series(field, seconds))
+        if not values:
+            return None
+        return {
+            "min": values[0],
+            "avg": sum(values) / len(values),
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "peak": values[-1],
+        }
+
+    def sparkline(self, field: str, seconds: float, width: int = 24) -> str:
+        """Максимум кожного з width відрізків вікна, порожні відрізки - пробіл."""
+        now = time.time()
+        start = now - seconds
+        slots: list[float | None] = [None] * width
+        for ts, value in self.series(field, seconds):
+            slot = min(width - 1, int((ts - start) / seconds * width))
+            slots[slot] = value if slots[slot] is None else max(slots[slot], value)
+        present = [v for v in slots if v is not None]
+        if not present:
+            return ""
+        low, high = min(present), max(present)
+        span = (high - low) or 1.0
+        return "".join(
+            " " if v is None else _SPARK[min(len(_SPARK) - 1, int((v - low) / span * len(_SPARK)))]
+            for v in slots
+        )
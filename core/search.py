@@ -0,0 +1,193 @@
+"""
+Індекс для inline пошуку по назвах манг.
+
+Будується один раз з даних репозиторію і оновлюється інкрементально
+при додаванні/видаленні манги - без проходу по всіх назвах на кожен символ.
+
+Ключ пошуку - "скелет" назви: casefold -> транслітерація кирилиці в латиницю ->
+згортання неоднозначних літер (г/g/h, и/y/i, х/kh/h, подвоєні літери).
+Тому "ван піс", "van pis" і "Ван Пис" дають однаковий ключ.
+
+Постинги:
+  - триграми ключа -> id документів (підрядковий і нечіткий пошук з опечатками)
+  - префікси слів довжиною 1-2 -> id документів (короткі запити)
+"""
+import bisect
+import heapq
+import re
+from collections import Counter
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "ё": "e", "є": "e", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "i",
+    "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e",
+    "ю": "iu", "я": "ia", "'": "", "ʼ": "", "’": "",
+})
+
+# Порядок важливий: довші сполучення замінюються першими
+_DIGRAPHS = (("shch", "sh"), ("sch", "sh"), ("kh", "h"), ("ph", "f"), ("ck", "k"))
+_LETTERS = str.maketrans({"y": "i", "j": "i", "w": "v", "g": "h", "q": "k", "x": "ks"})
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_C_RE = re.compile(r"c(?!h)")
+_DOUBLE_RE = re.compile(r"(.)\1+")
+
+# Частка триграм запиту яка має збігтися з назвою щоб вважати її нечітким збігом
+FUZZY_THRESHOLD = 0.6
+
+
+def search_key(text: str) -> str:
+    """Нормалізує текст в ключ пошуку.
+
+    "Ван Піс" -> "van pis", "Гінтама" -> "hintama", "Gintama" -> "hintama"
+    """
+    key = text.casefold().translate(_TRANSLIT)
+    key = _NON_WORD_RE.sub(" ", key).strip()
+    for src, dst in _DIGRAPHS:
+        key = key.replace(src, dst)
+    key = _C_RE.sub("k", key).translate(_LETTERS)
+    return _DOUBLE_RE.sub(r"\1", key)
+
+
+def _trigrams(key: str, partial: bool = False) -> set[str]:
+    # Для запиту (partial=True) кінець не доповнюється - користувач ще друкує слово
+    padded = f" {key}" if partial else f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefixes(key: str) -> set[str]:
+    return {word[:n] for word in key.split() for n in (1, 2) if len(word) >= n}
+
+
+class SearchIndex:
+    """Індекс назв одного користувача."""
+
+    def __init__(self, titles=()):
+        self._ids: dict[str, int] = {}
+        self._titles: dict[int, str] = {}
+        self._keys: dict[int, str] = {}
+        self._order: dict[int, str] = {}
+        self._grams: dict[str, set[int]] = {}
+        self._prefix: dict[str, set[int]] = {}
+        # Відсортований список (casefold, title) - порядок для порожнього запиту
+        self._sorted: list[tuple[str, str]] = []
+        self._all: list[str] | None = None
+        self._next_id = 0
+        for title in titles:
+            if title not in self._ids:
+                self._add(title)
+        self._sorted = sorted((self._order[i], t) for i, t in self._titles.items())
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, title: str) -> bool:
+        return title in self._ids
+
+    def add(self, title: str) -> None:
+        if title in self._ids:
+            return
+        self._add(title)
+        bisect.insort(self._sorted, (title.casefold(), title))
+
+    def _add(self, title: str) -> None:
+        doc_id = self._next_id
+        self._next_id += 1
+        key = search_key(title)
+        self._ids[title] = doc_id
+        self._titles[doc_id] = title
+        self._keys[doc_id] = key
+        self._order[doc_id] = title.casefold()
+        self._all = None
+        for gram in _trigrams(key):
+            self._grams.setdefault(gram, set()).add(doc_id)
+        for prefix in _prefixes(key):
+            self._prefix.setdefault(prefix, set()).add(doc_id)
+
+    def sync(self, titles) -> None:
+        """Приводить індекс до переданого набору назв - індексує тільки різницю."""
+        titles = set(titles)
+        for title in [t for t in self._ids if t not in titles]:
+            self.remove(title)
+        for title in titles:
+            if title not in self._ids:
+                self.add(title)
+
+    def remove(self, title: str) -> None:
+        doc_id = self._ids.pop(title, None)
+        if doc_id is None:
+            return
+        del self._titles[doc_id]
+        order = self._order.pop(doc_id)
+        self._all = None
+        key = self._keys.pop(doc_id)
+        for postings, tokens in ((self._grams, _trigrams(key)), (self._prefix, _prefixes(key))):
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[token]
+        pos = bisect.bisect_left(self._sorted, (order, title))
+        if pos < len(self._sorted) and self._sorted[pos][1] == title:
+            del self._sorted[pos]
+
+    def search(self, query: str, limit: int | None = None) -> list[str]:
+        """Повертає назви за спаданням релевантності.
+
+        Рівні: повний збіг > початок назви > початок слова > підрядок > нечіткий збіг.
+        Порожній запит - всі назви за алфавітом.
+        """
+        q = search_key(query)
+        if not q:
+            if self._all is None:
+                self._all = [title for _, title in self._sorted]
+            return self._all[:limit] if limit is not None else list(self._all)
+
+        if len(q) < 3:
+            scored = [(self._tier(self._keys[i], q), 1.0, i) for i in self._prefix.get(q, ())]
+            return self._rank(scored, limit)
+
+        # Підрядкові збіги - перетин постингів всіх триграм запиту без доповнення
+        postings = sorted((self._grams.get(q[i:i + 3], set()) for i in range(len(q) - 2)), key=len)
+        exact = set.intersection(*postings)
+        scored = [(tier, 1.0, i) for i in exact if (tier := self._tier(self._keys[i], q))]
+
+        # Нечіткі збіги завжди нижче підрядкових - якщо підрядкових вистачає на limit,
+        # рахувати їх не потрібно
+        if limit is None or len(scored) < limit:
+            grams = _trigrams(q, partial=True)
+            counts = Counter()
+            for gram in grams:
+                ids = self._grams.get(gram)
+                if ids:
+                    counts.update(ids)
+            need = len(grams) * FUZZY_THRESHOLD
+            scored.extend(
+                (0, hits / len(grams), i)
+                for i, hits in counts.items() if hits >= need and i not in exact
+            )
+        return self._rank(scored, limit)
+
+    def _rank(self, scored: list[tuple[int, float, int]], limit: int | None) -> list[str]:
+        order = self._order
+        rank = lambda s: (-s[0], -s[1], order[s[2]])
+        if limit is not None and limit < len(scored):
+            scored = heapq.nsmallest(limit, scored, key=rank)
+        else:
+            scored.sort(key=rank)
+        return [self._titles[i] for _, _, i in scored]
+
+    @staticmethod
+    def _tier(key: str, q: str) -> int:
+        if key == q:
+            return 4
+        if key.startswith(q):
+            return 3
+        if f" {q}" in key:
+            return 2
+        if q in key:
+            return 1
+        return 0
@@ -0,0 +1,10 @@
+"""
+Подія зупинки процесу (SIGINT / SIGTERM).
+
+Окремий легкий модуль: бот і воркер встановлюють подію з обробника сигналу,
+перевірка (core.checker, парсери) дивиться на неї між мангами - і для цього
+боту не потрібно імпортувати Playwright при старті.
+"""
+import asyncio
+
+shutdown_event = asyncio.Event()
@@ -0,0 +1,805 @@
+"""
+Локальний репозиторій SQLite - вбудоване сховище без мережевих запитів.
+
+Структура БД:
+  Таблиця manga:
+    (user_id, title, url, last_chapter, released_at JSON, checked_at, tracked_since, lock_token),
+    первинний ключ (user_id, title)
+    індекс (user_id, title COLLATE UK_NOCASE) - сортування як в MongoDB (locale uk, strength 2)
+
+  Таблиця meta:
+    (user_id, last_check_date)
+
+  Таблиця leases:
+    (name, owner, token, expires_at) - блокування між процесами на одному диску
+
+  Таблиці check_runs і check_results:
+    чекпоінти перевірок - (run_id, user_id, status, titles JSON, started_at, finished_at,
+    timings JSON, lock_token) і результати (run_id, title, chapter)
+    lock_token - токен блокування перевірки останнього запису (фенсинг, як в MongoDB)
+
+  Таблиця chapter_history:
+    (user_id, title, chapter, detected_at, method, latency) - тільки додавання,
+    старіші за HISTORY_RETENTION_DAYS рядки видаляються при записі
+
+  Таблиця outbox:
+    (id, user_id, method, args JSON) - записи MirroredRepository, ще не підтверджені Atlas
+
+Одне з'єднання і буфер записів на файл (SqliteStore) спільні для всіх користувачів.
+Записи буферизуються і комітяться пачкою в одній транзакції (WAL режим),
+читання спочатку скидає буфер - тому завжди бачить власні записи.
+
+MirroredRepository - MongoDB Atlas як основне сховище + локальна копія:
+при старті дані копіюються з Atlas, читання йдуть з SQLite,
+записи - в SQLite одразу і в Atlas через чергу outbox у фоні.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from core.logger import get_logger
+from core.repository import (
+    AbstractRepository, CHECK_RUN_RETENTION_SECONDS, RELEASE_HISTORY_SIZE, HISTORY_RETENTION_DAYS,
+)
+
+log = get_logger("repository").info
+
+# Максимальна пауза між повторами запису пачки, яку SQLite не прийняв
+FLUSH_MAX_DELAY = 30.0
+
+# Українська абетка в порядку словника (+ російські літери) - літери переносяться
+# в Private Use Area, щоб ґ стояла після г, є після е, і/ї після и (в Unicode вони після я)
+_UK_ALPHABET = "абвгґдеєёжзиіїйклмнопрстуфхцчшщъыьэюя"
+_UK_ORDER = str.maketrans({ch: chr(0xE000 + i) for i, ch in enumerate(_UK_ALPHABET)})
+
+
+def _uk_sort_key(value: str) -> str:
+    return value.casefold().translate(_UK_ORDER)
+
+
+def _uk_nocase(a: str, b: str) -> int:
+    a, b = _uk_sort_key(a), _uk_sort_key(b)
+    return (a > b) - (a < b)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manga (
+    user_id      TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    last_chapter TEXT NOT NULL DEFAULT 'невідомо',
+    released_at  TEXT NOT NULL DEFAULT '[]',
+    checked_at   REAL,
+    tracked_since REAL,
+    lock_token   INTEGER,
+    PRIMARY KEY (user_id, title)
+);
+CREATE INDEX IF NOT EXISTS manga_user_title ON manga (user_id, title COLLATE UK_NOCASE);
+CREATE TABLE IF NOT EXISTS meta (
+    user_id         TEXT PRIMARY KEY,
+    last_check_date TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    token      INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS check_runs (
+    run_id      TEXT PRIMARY KEY,
+    user_id     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    titles      TEXT NOT NULL,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    timings     TEXT,
+    lock_token  INTEGER
+);
+CREATE INDEX IF NOT EXISTS check_runs_user_status ON check_runs (user_id, status, started_at);
+CREATE TABLE IF NOT EXISTS check_results (
+    run_id  TEXT NOT NULL,
+    title   TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    PRIMARY KEY (run_id, title)
+);
+CREATE TABLE IF NOT EXISTS chapter_history (
+    user_id     TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    chapter     TEXT NOT NULL,
+    detected_at REAL NOT NULL,
+    method      TEXT,
+    latency     REAL
+);
+CREATE INDEX IF NOT EXISTS chapter_history_title ON chapter_history (user_id, title, detected_at);
+CREATE INDEX IF NOT EXISTS chapter_history_feed ON chapter_history (user_id, detected_at);
+CREATE TABLE IF NOT EXISTS outbox (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    method  TEXT NOT NULL,
+    args    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_user ON outbox (user_id, id);
+"""
+
+# Колонки додані після першої версії схеми - для існуючих файлів БД
+_MIGRATIONS = {
+    ("manga", "released_at"): "ALTER TABLE manga ADD COLUMN released_at TEXT NOT NULL DEFAULT '[]'",
+    ("manga", "checked_at"): "ALTER TABLE manga ADD COLUMN checked_at REAL",
+    ("manga", "tracked_since"): "ALTER TABLE manga ADD COLUMN tracked_since REAL",
+    ("check_runs", "timings"): "ALTER TABLE check_runs ADD COLUMN timings TEXT",
+    ("manga", "lock_token"): "ALTER TABLE manga ADD COLUMN lock_token INTEGER",
+    ("check_runs", "lock_token"): "ALTER TABLE check_runs ADD COLUMN lock_token INTEGER",
+}
+
+# Фенсинг записів перевірки: параметри (fence) для SET і (fence, fence) для WHERE.
+# Без fence (None) токен не змінюється і не перевіряється
+_FENCE_SET = "lock_token = COALESCE(?, lock_token)"
+_FENCE_WHERE = "(? IS NULL OR lock_token IS NULL OR lock_token <= ?)"
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    columns = {}
+    for (table, column), sql in _MIGRATIONS.items():
+        if table not in columns:
+            columns[table] = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns[table]:
+            conn.execute(sql)
+
+
+class SqliteStore:
+    """
+    Одне з'єднання і буфер записів на файл БД - спільні для всіх користувачів.
+    Всі операції виконуються в одному потоці - sqlite3.Connection не потокобезпечний.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn: sqlite3.Connection | None = None
+        self._pending: list[tuple[str, tuple]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # Задачі скидання буфера за таймером - посилання, щоб close() їх дочекався
+        self._flush_tasks: set[asyncio.Task] = set()
+        # Один коміт буфера за раз - пачка, що не записалась, повертається в початок буфера
+        # раніше, ніж наступний flush забере новіші записи
+        self._flush_lock = asyncio.Lock()
+        # Пауза до повтору після невдалого коміту (0 - останній коміт вдався)
+        self._retry_delay = 0.0
+
+    # Робота з з'єднанням (тільки в потоці executor)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.create_collation("UK_NOCASE", _uk_nocase)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _migrate(conn)
+            self._conn = conn
+        return self._conn
+
+    def _commit_batch(self, batch: list[tuple[str, tuple]]) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            for sql, params in batch:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        return self._connect().execute(sql, params).fetchall()
+
+    def _transaction(self, func, *args):
+        # IMMEDIATE - блокує запис одразу, інший процес не вклиниться між SELECT і UPDATE
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn, *args)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def connect(self) -> None:
+        await self.run(self._connect)
+
+    async def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Читання - спочатку скидає буфер, щоб бачити власні записи."""
+        await self.flush()
+        return await self.run(self._query, sql, params)
+
+    async def transaction(self, func, *args):
+        """Виконує func(conn, *args) в окремій транзакції (після вже буферизованих записів)."""
+        await self.flush()
+        return await self.run(self._transaction, func, *args)
+
+    async def commit(self, batch: list[tuple[str, tuple]]) -> None:
+        """Негайний коміт пачки в одній транзакції (після вже буферизованих записів)."""
+        await self.flush()
+        await self.run(self._commit_batch, batch)
+
+    # Буфер записів
+
+    async def write(self, sql: str, params: tuple) -> None:
+        """Запис в буфер. Невдалий коміт не губить запис - він залишається в буфері до повтору."""
+        self._pending.append((sql, params))
+        # Поки SQLite не приймає записи, повторює тільки таймер - без спроби на кожен запис
+        if len(self._pending) >= self.batch_size and not self._retry_delay:
+            await self._flush_logged()
+        else:
+            self._schedule_flush(self.flush_interval)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(delay, self._flush_in_background)
+
+    def _flush_in_background(self) -> None:
+        self._flush_handle = None
+        task = asyncio.get_running_loop().create_task(self._flush_logged())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            log(
+                f"❌ SQLite {self.path}: {len(self._pending)} записів не збережено ({e!r}) - "
+                f"повтор через {self._retry_delay:.0f} с"
+            )
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                await self.run(self._commit_batch, batch)
+            except Exception:
+                # database is locked, диск заповнений - пачка повертається перед новішими записами
+                self._pending[:0] = batch
+                self._retry_delay = min(max(self._retry_delay * 2, 1.0), FLUSH_MAX_DELAY)
+                self._schedule_flush(self._retry_delay)
+                raise
+            if self._retry_delay:
+                log(f"✅ SQLite {self.path}: записи знову зберігаються")
+                self._retry_delay = 0.0
+
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def aclose(self) -> None:
+        """Дописує буфер і закриває з'єднання - в потоці сховища, без блокування циклу подій."""
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception as e:
+            log(f"❌ SQLite {self.path}: {len(self._pending)} записів втрачено при закритті ({e!r})")
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = []
+        await self.run(self._close_conn)
+        # Всі задачі executor вже виконані - shutdown не чекає
+        self._executor.shutdown(wait=False)
+
+
+# Спільні сховища: {абсолютний шлях: SqliteStore}
+_STORES: dict[str, SqliteStore] = {}
+
+
+def get_store(path: str, batch_size: int = 50, flush_interval: float = 0.5) -> SqliteStore:
+    path = os.path.abspath(path)
+    store = _STORES.get(path)
+    if store is None:
+        store = _STORES[path] = SqliteStore(path, batch_size, flush_interval)
+    return store
+
+
+async def close_stores() -> None:
+    stores = list(_STORES.values())
+    _STORES.clear()
+    await asyncio.gather(*(store.aclose() for store in stores))
+
+
+class SqliteRepository(AbstractRepository):
+    """
+    SQLite для локального запуску і як швидка копія Atlas.
+    Вид користувача над спільним SqliteStore.
+    """
+
+    def __init__(self, path: str, user_id: str, batch_size: int = 50, flush_interval: float = 0.5):
+        self.store = get_store(path, batch_size, flush_interval)
+        self.user_id = str(user_id)
+
+    async def setup(self) -> None:
+        await self.store.connect()
+
+    async def load(self) -> dict:
+        """Завантажує всі манги і дату перевірки для поточного користувача"""
+        rows = await self.store.query(
+            "SELECT title, url, last_chapter, released_at, checked_at, tracked_since FROM manga "
+            "WHERE user_id = ? ORDER BY title COLLATE UK_NOCASE",
+            (self.user_id,),
+        )
+        manga = {
+            title: {
+                "url": url,
+                "last_chapter": chapter,
+                "released_at": json.loads(released_at),
+                "checked_at": checked_at,
+                "tracked_since": tracked_since,
+            }
+            for title, url, chapter, released_at, checked_at, tracked_since in rows
+        }
+        meta = await self.store.query("SELECT last_check_date FROM meta WHERE user_id = ?", (self.user_id,))
+        return {"manga": manga, "last_check_date": meta[0][0] if meta else ""}
+
+    async def add_manga(self, title: str, url: str) -> None:
+        await self.store.write(
+            "INSERT INTO manga (user_id, title, url, last_chapter, tracked_since) VALUES (?, ?, ?, 'невідомо', ?) "
+            "ON CONFLICT (user_id, title) DO UPDATE SET url = excluded.url, last_chapter = 'невідомо', "
+            "released_at = '[]', checked_at = NULL, tracked_since = excluded.tracked_since",
+            (self.user_id, title, url, time.time()),
+        )
+
+    async def remove_manga(self, title: str) -> None:
+        await self.store.write("DELETE FROM manga WHERE user_id = ? AND title = ?", (self.user_id, title))
+        await self.store.write("DELETE FROM chapter_history WHERE user_id = ? AND title = ?", (self.user_id, title))
+
+    async def update_chapter(
+        self, title: str, chapter: str, record_release: bool = True, fence: int | None = None,
+    ) -> None:
+        if not record_release:
+            await self.store.write(
+                f"UPDATE manga SET last_chapter = ?, {_FENCE_SET} WHERE user_id = ? AND title = ? AND {_FENCE_WHERE}",
+                (chapter, fence, self.user_id, title, fence, fence),
+            )
+            return
+        # Додаємо час в кінець JSON масиву, найстаріший відкидаємо понад RELEASE_HISTORY_SIZE
+        await self.store.write(
+            "UPDATE manga SET last_chapter = ?, released_at = json_insert("
+            "CASE WHEN json_array_length(released_at) >= ? THEN json_remove(released_at, '$[0]') "
+            f"ELSE released_at END, '$[#]', ?), {_FENCE_SET} WHERE user_id = ? AND title = ? AND {_FENCE_WHERE}",
+            (chapter, RELEASE_HISTORY_SIZE, time.time(), fence, self.user_id, title, fence, fence),
+        )
+
+    async def set_checked_at(self, titles: list[str], checked_at: float, fence: int | None = None) -> None:
+        for title in titles:
+            await self.store.write(
+                f"UPDATE manga SET checked_at = ?, tracked_since = COALESCE(tracked_since, ?), {_FENCE_SET} "
+                f"WHERE user_id = ? AND title = ? AND {_FENCE_WHERE}",
+                (checked_at, checked_at, fence, self.user_id, title, fence, fence),
+            )
+
+    async def set_last_check_date(self, date: str) -> None:
+        await self.store.write(
+            "INSERT INTO meta (user_id, last_check_date) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET last_check_date = excluded.last_check_date",
+            (self.user_id, date),
+        )
+
+    async def replace_all(self, data: dict) -> None:
+        """Замінює всі дані користувача - використовується для синхронізації з Atlas."""
+        batch = [("DELETE FROM manga WHERE user_id = ?", (self.user_id,))]
+        batch.extend(
+            (
+                "INSERT INTO manga (user_id, title, url, last_chapter, released_at, checked_at, tracked_since) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.user_id, title, info["url"], info.get("last_chapter", "невідомо"),
+                    json.dumps(info.get("released_at", [])), info.get("checked_at"), info.get("tracked_since"),
+                ),
+            )
+            for title, info in data["manga"].items()
+        )
+        batch.append((
+            "INSERT INTO meta (user_id, last_check_date) VALUES (?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET last_check_date = excluded.last_check_date",
+            (self.user_id, data.get("last_check_date", "")),
+        ))
+        await self.store.commit(batch)
+
+    async def list_user_ids(self) -> list[str]:
+        return [uid for (uid,) in await self.store.query("SELECT DISTINCT user_id FROM manga")]
+
+    @staticmethod
+    def _acquire_lease(conn: sqlite3.Connection, name: str, owner: str, ttl: float) -> int | None:
+        now = time.time()
+        row = conn.execute("SELECT owner, token, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        if row and row[2] >= now:
+            return None
+        token = (row[1] if row else 0) + 1
+        conn.execute(
+            "INSERT INTO leases (name, owner, token, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, token = excluded.token, "
+            "expires_at = excluded.expires_at",
+            (name, owner, token, now + ttl),
+        )
+        return token
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> int | None:
+        return await self.store.transaction(self._acquire_lease, name, owner, ttl)
+
+    async def renew_lease(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        def _renew(conn):
+            cursor = conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ? AND token = ?",
+                (time.time() + ttl, name, owner, token),
+            )
+            return cursor.rowcount == 1
+        return await self.store.transaction(_renew)
+
+    async def release_lease(self, name: str, owner: str, token: int) -> None:
+        def _release(conn):
+            conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE name = ? AND owner = ? AND token = ?",
+                (time.time(), name, owner, token),
+            )
+        await self.store.transaction(_release)
+
+    async def start_check_run(self, run_id: str, titles: list[str], fence: int | None = None) -> None:
+        now = time.time()
+        expired = now - CHECK_RUN_RETENTION_SECONDS
+        await self.store.commit([
+            (
+                "DELETE FROM check_results WHERE run_id IN "
+                "(SELECT run_id FROM check_runs WHERE user_id = ? AND finished_at < ?)",
+                (self.user_id, expired),
+            ),
+            ("DELETE FROM check_runs WHERE user_id = ? AND finished_at < ?", (self.user_id, expired)),
+            (
+                "UPDATE check_runs SET status = 'abandoned', finished_at = ? "
+                f"WHERE user_id = ? AND status = 'running' AND {_FENCE_WHERE}",
+                (now, self.user_id, fence, fence),
+            ),
+            (
+                "INSERT INTO check_runs (run_id, user_id, status, titles, started_at, lock_token) "
+                "VALUES (?, ?, 'running', ?, ?, ?)",
+                (run_id, self.user_id, json.dumps(titles, ensure_ascii=False), now, fence),
+            ),
+        ])
+
+    async def save_check_result(self, run_id: str, title: str, chapter: str, fence: int | None = None) -> None:
+        await self.store.write(
+            f"UPDATE check_runs SET {_FENCE_SET} WHERE run_id = ? AND {_FENCE_WHERE}",
+            (fence, run_id, fence, fence),
+        )
+        # Буфер скидається кожні flush_interval сек і при закритті - втрачається не більше пачки
+        await self.store.write(
+            "INSERT INTO check_results (run_id, title, chapter) SELECT ?, ?, ? WHERE EXISTS "
+            f"(SELECT 1 FROM check_runs WHERE run_id = ? AND {_FENCE_WHERE}) "
+            "ON CONFLICT (run_id, title) DO UPDATE SET chapter = excluded.chapter",
+            (run_id, title, chapter, run_id, fence, fence),
+        )
+
+    async def finish_check_run(
+        self, run_id: str, timings: list[dict] | None = None, fence: int | None = None,
+    ) -> None:
+        await self.store.write(
+            f"UPDATE check_runs SET status = 'done', finished_at = ?, timings = ?, {_FENCE_SET} "
+            f"WHERE run_id = ? AND {_FENCE_WHERE}",
+            (
+                time.time(), json.dumps(timings, ensure_ascii=False) if timings is not None else None,
+                fence, run_id, fence, fence,
+            ),
+        )
+
+    async def get_check_timings(self, limit: int = 10) -> list[list[dict]]:
+        rows = await self.store.query(
+            "SELECT timings FROM check_runs WHERE user_id = ? AND status = 'done' AND timings IS NOT NULL "
+            "ORDER BY started_at DESC LIMIT ?",
+            (self.user_id, limit),
+        )
+        return [json.loads(timings) for timings, in rows]
+
+    async def add_chapter_history(
+        self, title: str, chapter: str, detected_at: float,
+        method: str | None = None, latency: float | None = None,
+    ) -> None:
+        await self.store.write(
+            "INSERT INTO chapter_history (user_id, title, chapter, detected_at, method, latency) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self.user_id, title, chapter, detected_at, method, latency),
+        )
+        await self.store.write(
+            "DELETE FROM chapter_history WHERE user_id = ? AND title = ? AND detected_at < ?",
+            (self.user_id, title, detected_at - HISTORY_RETENTION_DAYS * 24 * 3600),
+        )
+
+    async def get_title_history(self, title: str, limit: int = 10) -> list[dict]:
+        rows = await self.store.query(
+            "SELECT chapter, detected_at, method, latency FROM chapter_history "
+            "WHERE user_id = ? AND title = ? ORDER BY detected_at DESC LIMIT ?",
+            (self.user_id, title, limit),
+        )
+        return [
+            {"chapter": chapter, "detected_at": detected_at, "method": method, "latency": latency}
+            for chapter, detected_at, method, latency in rows
+        ]
+
+    async def get_history_feed(self, limit: int = 10) -> list[dict]:
+        rows = await self.store.query(
+            "SELECT title, chapter, detected_at, method, latency FROM chapter_history "
+            "WHERE user_id = ? ORDER BY detected_at DESC LIMIT ?",
+            (self.user_id, limit),
+        )
+        return [
+            {"title": title, "chapter": chapter, "detected_at": detected_at, "method": method, "latency": latency}
+            for title, chapter, detected_at, method, latency in rows
+        ]
+
+    async def get_unfinished_check_run(self) -> dict | None:
+        rows = await self.store.query(
+            "SELECT run_id, titles, started_at FROM check_runs WHERE user_id = ? AND status = 'running' "
+            "ORDER BY started_at DESC LIMIT 1",
+            (self.user_id,),
+        )
+        if not rows:
+            return None
+        run_id, titles, started_at = rows[0]
+        results = await self.store.query("SELECT title, chapter FROM check_results WHERE run_id = ?", (run_id,))
+        return {
+            "run_id": run_id,
+            "titles": json.loads(titles),
+            "results": dict(results),
+            "started_at": datetime.fromtimestamp(started_at, timezone.utc),
+        }
+
+    async def close(self) -> None:
+        """Вид користувача не володіє з'єднанням - спільне сховище закриває close_stores()."""
+        pass
+
+
+def _transient(e: Exception) -> bool:
+    """Помилка мережі або Atlas, після якої запис варто повторити."""
+    if isinstance(e, (asyncio.TimeoutError, OSError, ConnectionFailure)):
+        return True
+    return isinstance(e, PyMongoError) and e.has_error_label("RetryableWriteError")
+
+
+class MirroredRepository(AbstractRepository):
+    """
+    Atlas - джерело правди, SQLite - локальна копія для читання.
+    Якщо Atlas повільний або недоступний при старті - бот працює з локальною копією.
+
+    Записи йдуть в SQLite і в чергу outbox того самого файлу. Один фоновий відправник
+    на користувача передає їх в Atlas строго по черзі і видаляє запис тільки після
+    підтвердження; помилки мережі повторюються з паузою до OUTBOX_MAX_DELAY, тому
+    записи переживають і недоступний Atlas, і перезапуск бота.
+    """
+
+    OUTBOX_BATCH = 100
+    OUTBOX_MAX_DELAY = 60.0
+
+    def __init__(self, remote: AbstractRepository, local: SqliteRepository, sync_timeout: float = 15.0):
+        self.remote = remote
+        self.local = local
+        self.sync_timeout = sync_timeout
+        self._wake = asyncio.Event()
+        self._sender: asyncio.Task | None = None
+
+    async def setup(self) -> None:
+        await self.local.setup()
+        self._sender = asyncio.create_task(self._send_outbox())
+        try:
+            await asyncio.wait_for(self.remote.setup(), self.sync_timeout)
+            # Незаписані в Atlas зміни новіші за його копію - спочатку відправляємо їх
+            pending = await self._drain(self.sync_timeout)
+            if pending:
+                log(f"⚠️ Atlas: {pending} локальних змін ще не записано - локальну копію не перезаписуємо")
+                return
+            data = await asyncio.wait_for(self.remote.load(), self.sync_timeout)
+            await self.local.replace_all(data)
+            log(f"🔄 Локальна копія синхронізована з Atlas: {len(data['manga'])} манг")
+        except Exception as e:
+            log(f"⚠️ Не вдалось синхронізувати з Atlas ({e!r}) - працюємо з локальною копією")
+
+    async def load(self) -> dict:
+        return await self.local.load()
+
+    async def list_user_ids(self) -> list[str]:
+        # Локальна копія містить тільки користувачів, синхронізованих цим процесом
+        try:
+            return await asyncio.wait_for(self.remote.list_user_ids(), self.sync_timeout)
+        except Exception as e:
+            log(f"⚠️ Atlas: список користувачів недоступний ({e!r}) - беремо з локальної копії")
+            return await self.local.list_user_ids()
+
+    # Блокування мають бути спільні для всіх реплік - беруться тільки в Atlas.
+    # Atlas недоступний - блокування немає: локальне дало б його кожній репліці одночасно.
+    # Помилка захоплення не приховується за None - Lease відрізняє її від зайнятого блокування
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> int | None:
+        return await asyncio.wait_for(self.remote.acquire_lease(name, owner, ttl), self.sync_timeout)
+
+    async def renew_lease(self, name: str, owner: str, token: int, ttl: float) -> bool:
+        try:
+            return await asyncio.wait_for(self.remote.renew_lease(name, owner, token, ttl), self.sync_timeout)
+        except Exception as e:
+            # Не вдалось підтвердити в Atlas - вважаємо втраченим, інша репліка могла його забрати
+            log(f"⚠️ Atlas: блокування {name} не продовжено ({e!r}) - вважаємо втраченим")
+            return False
+
+    async def release_lease(self, name: str, owner: str, token: int) -> None:
+        await asyncio.wait_for(self.remote.release_lease(name, owner, token), self.sync_timeout)
+
+    # Черга записів в Atlas
+
+    async def _write_remote(self, method: str, *args) -> None:
+        # Запис в чергу раніше за локальну зміну: після збою між ними Atlas отримає
+        # зміну, якої немає локально, а не навпаки (локальну копію перезапише Atlas)
+        await self.local.store.write(
+            "INSERT INTO outbox (user_id, method, args) VALUES (?, ?, ?)",
+            (self.local.user_id, method, json.dumps(args, ensure_ascii=False)),
+        )
+        self._wake.set()
+
+    async def _pending(self) -> int:
+        rows = await self.local.store.query("SELECT COUNT(*) FROM outbox WHERE user_id = ?", (self.local.user_id,))
+        return rows[0][0]
+
+    async def _send_outbox(self) -> None:
+        delay, down = 1.0, False
+        while True:
+            self._wake.clear()
+            try:
+                rows = await self.local.store.query(
+                    "SELECT id, method, args FROM outbox WHERE user_id = ? ORDER BY id LIMIT ?",
+                    (self.local.user_id, self.OUTBOX_BATCH),
+                )
+            except Exception as e:
+                # Локальний файл тимчасово недоступний (database is locked) - черга чекає, а не зупиняється
+                log(f"❌ Черга Atlas: SQLite недоступний ({e!r}) - повтор через {delay:.0f} с")
+                await asyncio.sleep(delay)
+                continue
+            if not rows:
+                await self._wake.wait()
+                continue
+            for row_id, method, args in rows:
+                try:
+                    await asyncio.wait_for(getattr(self.remote, method)(*json.loads(args)), self.sync_timeout)
+                except Exception as e:
+                    if _transient(e):
+                        if not down:
+                            log(f"⚠️ Atlas недоступний ({e!r}) - записи чекають в черзі")
+                            down = True
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, self.OUTBOX_MAX_DELAY)
+                        break
+                    # Повтор не допоможе (помилка даних) - не блокуємо решту черги
+                    log(f"❌ Atlas: {method} відхилено ({e!r}) - запис пропущено")
+                else:
+                    if down:
+                        log("✅ Atlas знову доступний - відправляємо чергу записів")
+                        delay, down = 1.0, False
+                await self.local.store.write("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    async def _drain(self, timeout: float) -> int:
+        """Чекає поки черга користувача спорожніє. Повертає кількість невідправлених записів."""
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = await self._pending()
+            if not pending or time.monotonic() >= deadline:
+                return pending
+            self._wake.set()
+            await asyncio.sleep(0.1)
+
+    async def add_manga(self, title: str, url: str) -> None:
+        await self._write_remote("add_manga", title, url)
+        await self.local.add_manga(title, url)
+
+    async def remove_manga(self, title: str) -> None:
+        await self._write_remote("remove_manga", title)
+        await self.local.remove_manga(title)
+
+    async def update_chapter(
+        self, title: str, chapter: str, record_release: bool = True, fence: int | None = None,
+    ) -> None:
+        await self._write_remote("update_chapter", title, chapter, record_release, fence)
+        await self.local.update_chapter(title, chapter, record_release, fence)
+
+    async def set_checked_at(self, titles: list[str], checked_at: float, fence: int | None = None) -> None:
+        await self._write_remote("set_checked_at", titles, checked_at, fence)
+        await self.local.set_checked_at(titles, checked_at, fence)
+
+    async def set_last_check_date(self, date: str) -> None:
+        await self._write_remote("set_last_check_date", date)
+        await self.local.set_last_check_date(date)
+
+    # Чекпоінти пишуться в обидва сховища: локальна копія переживає збій мережі,
+    # Atlas - перезапуск на платформі без постійного диску
+
+    async def start_check_run(self, run_id: str, titles: list[str], fence: int | None = None) -> None:
+        # Через ту саму чергу - в Atlas запис перевірки з'явиться раніше за її результати
+        await self._write_remote("start_check_run", run_id, titles, fence)
+        await self.local.start_check_run(run_id, titles, fence)
+
+    async def save_check_result(self, run_id: str, title: str, chapter: str, fence: int | None = None) -> None:
+        await self._write_remote("save_check_result", run_id, title, chapter, fence)
+        await self.local.save_check_result(run_id, title, chapter, fence)
+
+    async def finish_check_run(
+        self, run_id: str, timings: list[dict] | None = None, fence: int | None = None,
+    ) -> None:
+        await self._write_remote("finish_check_run", run_id, timings, fence)
+        await self.local.finish_check_run(run_id, timings, fence)
+
+    # Історія не копіюється при старті - читаємо з Atlas, локальна копія тільки як запасна
+
+    async def add_chapter_history(
+        self, title: str, chapter: str, detected_at: float,
+        method: str | None = None, latency: float | None = None,
+    ) -> None:
+        await self._write_remote("add_chapter_history", title, chapter, detected_at, method, latency)
+        await self.local.add_chapter_history(title, chapter, detected_at, method, latency)
+
+    async def get_title_history(self, title: str, limit: int = 10) -> list[dict]:
+        try:
+            return await asyncio.wait_for(self.remote.get_title_history(title, limit), self.sync_timeout)
+        except Exception as e:
+            log(f"⚠️ Atlas: історія недоступна ({e!r}) - беремо з локальної копії")
+            return await self.local.get_title_history(title, limit)
+
+    async def get_history_feed(self, limit: int = 10) -> list[dict]:
+        try:
+            return await asyncio.wait_for(self.remote.get_history_feed(limit), self.sync_timeout)
+        except Exception as e:
+            log(f"⚠️ Atlas: історія недоступна ({e!r}) - беремо з локальної копії")
+            return await self.local.get_history_feed(limit)
+
+    async def get_check_timings(self, limit: int = 10) -> list[list[dict]]:
+        try:
+            return await asyncio.wait_for(self.remote.get_check_timings(limit), self.sync_timeout)
+        except Exception as e:
+            log(f"⚠️ Atlas: таймінги перевірок недоступні ({e!r}) - беремо з локальної копії")
+            return await self.local.get_check_timings(limit)
+
+    async def get_unfinished_check_run(self) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.remote.get_unfinished_check_run(), self.sync_timeout)
+        except Exception as e:
+            log(f"⚠️ Atlas: перервана перевірка недоступна ({e!r}) - беремо з локальної копії")
+            return await self.local.get_unfinished_check_run()
+
+    async def close(self) -> None:
+        """Дописує чергу в Atlas (не довше sync_timeout) - викликати до close_shared().
+        Невідправлені записи лишаються в outbox і відправляються після наступного старту."""
+        if self._sender is None:
+            return
+        try:
+            pending = await self._drain(self.sync_timeout)
+        except Exception as e:
+            log(f"❌ Черга Atlas: не вдалось дочекатись відправки ({e!r})")
+            pending = 0
+        self._sender.cancel()
+        try:
+            await self._sender
+        except asyncio.CancelledError:
+            pass
+        self._sender = None
+        if pending:
+            log(f"⚠️ Atlas: {pending} записів не відправлено - залишились в черзі до наступного запуску")
@@ -0,0 +1,222 @@
+"""
+Таймінги фаз перевірки манг.
+
+Кожна фаза перевірки манги (черга, семафор, запуск браузера, page.goto,
+wait_for_selector, витяг глави, API запит, запис в БД) вимірюється спаном
+і додається в гістограму свого домену. Гістограми однієї перевірки
+зберігаються разом з її записом (check_runs), /stats показує найповільніші
+домени і фази останніх перевірок.
+
+Збір вмикається контекстом collecting() - діє на check_all і всі його задачі.
+Домен манги задається title_scope(url) на початку перевірки манги, спани
+всередині (парсери, запис чекпоінта) беруть його з контексту.
+
+Формат збереження - список гістограм (назви доменів містять "." і не можуть
+бути ключами документа MongoDB):
+  [{"domain": "zenko.online", "phase": "api", "count": 12, "sum": 4.1, "max": 0.9,
+    "buckets": [0, 3, ...]}]
+"""
+import contextlib
+import contextvars
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+from core import logger, metrics
+
+# Межі кошиків гістограми в секундах, останній кошик - все що більше
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PHASE_LABELS = {
+    "queue": "черга",
+    "semaphore": "семафор",
+    "launch": "запуск браузера",
+    "goto": "page.goto",
+    "selector": "wait_for_selector",
+    "extract": "витяг глави",
+    "api": "API запит",
+    "db": "запис в БД",
+}
+
+# Домен для фаз, що не належать одній манзі (запуск браузера на батч)
+BROWSER_DOMAIN = "браузер"
+
+
+def domain_of(url: str) -> str:
+    """https://www.com-x.life/123.html -> com-x.life"""
+    host = urlsplit(url).netloc.lower().removeprefix("www.")
+    return host or "?"
+
+
+# Зовнішнє відображення адреси в домен (None - адреса не його, береться хост)
+_DOMAIN_RESOLVER: Callable[[str], str | None] | None = None
+
+
+def set_domain_resolver(resolver: Callable[[str], str | None] | None) -> None:
+    """Задає відображення адреси в домен для гістограм (напр. сервер-замінник бенчмарків).
+    None - прибрати."""
+    global _DOMAIN_RESOLVER
+    _DOMAIN_RESOLVER = resolver
+
+
+def resolve_domain(url: str) -> str:
+    """Домен манги для спанів: відображення set_domain_resolver або хост адреси."""
+    if _DOMAIN_RESOLVER is not None:
+        domain = _DOMAIN_RESOLVER(url)
+        if domain:
+            return domain
+    return domain_of(url)
+
+
+class Histogram:
+    __slots__ = ("count", "sum", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def merge(self, item: dict) -> None:
+        self.count += item["count"]
+        self.sum += item["sum"]
+        self.max = max(self.max, item["max"])
+        for i, n in enumerate(item["buckets"][:len(self.buckets)]):
+            self.buckets[i] += n
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Верхня межа кошика з q-тим значенням (для останнього кошика - максимум)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class RunTimings:
+    """Гістограми однієї або кількох перевірок: {(домен, фаза): Histogram}."""
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, domain: str, phase: str, seconds: float) -> None:
+        key = (domain, phase)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    def merge(self, items: list[dict]) -> None:
+        for item in items or []:
+            key = (item["domain"], item["phase"])
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].merge(item)
+
+    def to_list(self) -> list[dict]:
+        return [
+            {"domain": domain, "phase": phase, "count": h.count, "sum": round(h.sum, 3),
+             "max": round(h.max, 3), "buckets": h.buckets}
+            for (domain, phase), h in self.histograms.items()
+        ]
+
+    def domains(self) -> list[tuple[str, float, int]]:
+        """[(домен, сумарний час без черги, манг)], найповільніші першими."""
+        totals: dict[str, float] = {}
+        titles: dict[str, int] = {}
+        for (domain, phase), h in self.histograms.items():
+            if phase == "queue":
+                titles[domain] = h.count
+            else:
+                totals[domain] = totals.get(domain, 0.0) + h.sum
+        return sorted(
+            ((domain, total, titles.get(domain, 0)) for domain, total in totals.items()),
+            key=lambda item: item[1], reverse=True,
+        )
+
+    def slowest(self, limit: int = 5) -> list[tuple[str, str, Histogram]]:
+        """Фази з найбільшим p95: [(домен, фаза, гістограма)]."""
+        items = sorted(self.histograms.items(), key=lambda item: item[1].quantile(0.95), reverse=True)
+        return [(domain, phase, h) for (domain, phase), h in items[:limit]]
+
+
+_RUN: contextvars.ContextVar[RunTimings | None] = contextvars.ContextVar("check_timings", default=None)
+_DOMAIN: contextvars.ContextVar[str] = contextvars.ContextVar("check_domain", default="?")
+_CHECK_START: contextvars.ContextVar[float | None] = contextvars.ContextVar("check_start", default=None)
+
+
+def current() -> RunTimings | None:
+    return _RUN.get()
+
+
+@contextlib.contextmanager
+def collecting():
+    """Збирає таймінги всіх спанів в межах блоку. Вкладений виклик використовує зовнішній збір."""
+    timings = _RUN.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RunTimings()
+    token = _RUN.set(timings)
+    try:
+        yield timings
+    finally:
+        _RUN.reset(token)
+
+
+def current_domain() -> str:
+    return _DOMAIN.get()
+
+
+def observe(phase: str, seconds: float, domain: str | None = None) -> None:
+    timings = _RUN.get()
+    if timings is not None:
+        domain = domain or _DOMAIN.get()
+        timings.observe(domain, phase, seconds)
+        metrics.CHECK_PHASE.observe(seconds, domain=domain, phase=phase)
+
+
+@contextlib.contextmanager
+def span(phase: str, domain: str | None = None):
+    if _RUN.get() is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(phase, time.monotonic() - start, domain)
+
+
+def check_started() -> None:
+    """Початок перевірки - від нього рахується час манги в черзі."""
+    _CHECK_START.set(time.monotonic())
+
+
+def title_scope(url: str, title: str | None = None) -> None:
+    """Задає домен для спанів поточної задачі і записує час очікування в черзі.
+    Викликається на початку задачі манги - зміна контексту не виходить за її межі.
+    Назва і домен додаються до структурованих полів логу (core.logger.bind)."""
+    domain = resolve_domain(url)
+    _DOMAIN.set(domain)
+    logger.bind(title=title, domain=domain)
+    started = _CHECK_START.get()
+    if started is not None:
+        observe("queue", time.monotonic() - started)
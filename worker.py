@@ -0,0 +1,139 @@
+"""
+Manga Tracker Worker - окремий процес перевірки манг без Telegram.
+
+Забирає задачі з колекції jobs в MongoDB, виконує check_all і записує результати.
+Бот з CHECK_WORKERS=true тільки ставить задачі і формує звіти.
+Воркерів може бути скільки завгодно - на одній або різних машинах.
+
+Запуск:
+  python worker.py
+"""
+
+import sys
+import os
+import signal
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import metrics, timing
+from core.jobs import get_job_queue, worker_id, JobQueue
+from core.logger import get_logger
+from core.parser_playwright import check_all
+from core.shutdown import shutdown_event
+from core.parsing import close_parse_pool
+from core.repository import close_shared
+
+log = get_logger("worker").info
+
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
+
+
+async def _heartbeat(queue: JobQueue, job_id, worker: str, check_task: asyncio.Task):
+    """Продовжує оренду поки йде перевірка. Оренду втрачено - перевірку зупиняємо."""
+    while True:
+        await asyncio.sleep(queue.lease.total_seconds() / 3)
+        try:
+            if not await queue.heartbeat(job_id, worker):
+                log(f"⚠️ Задача {job_id}: оренду втрачено - зупиняємо перевірку")
+                check_task.cancel()
+                return
+        except Exception as e:
+            log(f"⚠️ Задача {job_id}: heartbeat не вдався: {e}")
+
+
+async def _run_job(queue: JobQueue, job: dict, worker: str):
+    job_id = job["_id"]
+    done = {r["title"] for r in job.get("results", [])}
+    pending = {m["title"]: m["url"] for m in job["manga"] if m["title"] not in done}
+    log(f"📥 Задача {job_id} (спроба {job['attempts']}): {len(pending)} з {len(job['manga'])} манг")
+
+    details: dict[str, dict] = {}
+
+    async def _save(title: str, chapter: str):
+        # Кожен результат одразу в задачу - після падіння воркера його не перевірятимуть знову
+        if not await queue.add_results(job_id, worker, {title: chapter}, details):
+            log(f"⚠️ Задача {job_id}: оренду втрачено, результат {title} не записано")
+
+    # Задача перевірки копіює контекст при створенні - збір таймінгів вмикається до неї
+    with timing.collecting() as timings:
+        check_task = asyncio.create_task(check_all(pending, on_result=_save, details=details))
+    heartbeat_task = asyncio.create_task(_heartbeat(queue, job_id, worker, check_task))
+    try:
+        await check_task
+    except asyncio.CancelledError:
+        if shutdown_event.is_set():
+            raise
+        return
+    finally:
+        heartbeat_task.cancel()
+
+    if shutdown_event.is_set():
+        # Готові результати вже записані, решту перевірить інший воркер
+        await queue.release(job_id, worker)
+        log(f"🛑 Задача {job_id} повернута в чергу")
+        return
+
+    if await queue.complete(job_id, worker, timings.to_list()):
+        log(f"✅ Задача {job_id} виконана")
+    else:
+        log(f"⚠️ Задача {job_id}: оренду втрачено, результати не записано")
+
+
+async def run_worker():
+    queue = get_job_queue()
+    await queue.setup()
+    worker = worker_id()
+    log(f"👷 Воркер {worker} запущено")
+    metrics_runner = None
+    if metrics.ENABLED:
+        try:
+            metrics_runner = await metrics.start_server()
+        except OSError as e:
+            log(f"⚠️ Сервер метрик не запущено: {e}")
+
+    while not shutdown_event.is_set():
+        try:
+            failed = await queue.fail_exhausted()
+            if failed:
+                log(f"⚠️ {failed} задач позначено failed - вичерпано спроби")
+            job = await queue.claim(worker)
+        except Exception as e:
+            log(f"❌ Черга недоступна: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(shutdown_event.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await _run_job(queue, job, worker)
+        except Exception as e:
+            log(f"❌ Задача {job['_id']}: помилка {e} - оренда закінчиться і задачу забере інший воркер")
+
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await close_shared()
+    close_parse_pool()
+    log("🛑 Воркер зупинено")
+
+
+def main():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    def _handle_signal(sig, frame):
+        log(f"⚠️ Отримано сигнал {sig} - завершуємо поточну задачу...")
+        loop.call_soon_threadsafe(shutdown_event.set)
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+    try:
+        loop.run_until_complete(run_worker())
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()